@@ -0,0 +1,92 @@
+"""
+Benchmark of the vectorized analytics on a large synthetic history
+
+Builds the column arrays of one user directly (no storage round trips, as
+when they are served from the analytics cache) and reports the best and
+median time of each /analytics metric against the 100 ms budget.
+
+Usage:
+    python -m benchmarks.analytics [rows] [iterations]
+"""
+
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from services.analytics_service import (
+    TransactionColumns,
+    compute_category_breakdown,
+    compute_trends,
+    date_mask,
+    find_anomalies,
+)
+
+BUDGET_MS = 100.0
+CATEGORIES = ["food", "rent", "transport", "salary", "fun", "health", "travel"]
+START = datetime(2015, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_columns(rows: int, seed: int = 7) -> TransactionColumns:
+    """Ten years of transactions with a few large outliers"""
+    rng = np.random.default_rng(seed)
+    amounts = rng.lognormal(mean=3.5, sigma=0.6, size=rows).round(2)
+    outliers = rng.random(rows) < 0.0005
+    amounts[outliers] *= 25
+    return TransactionColumns(
+        ids=np.char.encode(np.char.mod("tx%018d", np.arange(rows)), "ascii"),
+        amounts=amounts,
+        timestamps=rng.integers(START.timestamp(), END.timestamp(), size=rows),
+        category_codes=rng.integers(0, len(CATEGORIES), size=rows, dtype=np.int32),
+        expense=rng.random(rows) < 0.8,
+        categories=list(CATEGORIES),
+    )
+
+
+def time_ms(function, iterations: int) -> tuple:
+    """Best and median wall time of a call in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+def run_benchmark(rows: int = 1_000_000, iterations: int = 20):
+    """Time every analytics metric over ``rows`` transactions"""
+    columns = synthetic_columns(rows)
+    year_start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    cases = {
+        "date mask (1 year)": lambda: date_mask(columns, year_start, END),
+        "trends by month": lambda: compute_trends(columns, date_mask(columns), "month"),
+        "trends by week": lambda: compute_trends(columns, date_mask(columns), "week"),
+        "category breakdown": lambda: compute_category_breakdown(
+            columns, date_mask(columns), "expense"
+        ),
+        "anomalies (3σ)": lambda: find_anomalies(columns, date_mask(columns)),
+        "anomalies (1 year)": lambda: find_anomalies(
+            columns, date_mask(columns, year_start, END)
+        ),
+    }
+
+    print(f"📊 {rows:,} transactions, {iterations} iterations per metric")
+    failed = False
+    for name, function in cases.items():
+        function()
+        best, median = time_ms(function, iterations)
+        verdict = "✅" if median < BUDGET_MS else "❌"
+        failed |= median >= BUDGET_MS
+        print(f"{verdict} {name:<22} best {best:7.2f}ms  median {median:7.2f}ms")
+
+    print(f"Budget: {BUDGET_MS:.0f}ms per metric")
+    return not failed
+
+
+if __name__ == "__main__":
+    rows_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sys.exit(0 if run_benchmark(rows_arg, iterations_arg) else 1)
@@ -0,0 +1,58 @@
+"""
+Microbenchmark for the auth dependency with and without the token cache
+
+Calls AuthMiddleware.verify_token directly with locally signed RS256 tokens,
+the way FastAPI resolves it for every authenticated request, and reports the
+per-call cost for a cold (uncached) and a warm (cached) verifier.
+
+Usage:
+    python -m benchmarks.auth_cache [iterations] [distinct_tokens]
+"""
+
+import sys
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from benchmarks.local_tokens import install_local_verifier, sign_token
+from middleware.auth import AuthMiddleware, token_cache
+
+
+def time_calls(credentials: list, iterations: int) -> float:
+    """Return the mean cost of one verify_token call in microseconds"""
+    started = time.perf_counter()
+    for i in range(iterations):
+        AuthMiddleware.verify_token(credentials[i % len(credentials)])
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def run_benchmark(iterations: int = 5000, distinct_tokens: int = 10):
+    """Compare verification cost with the cache disabled and enabled"""
+    install_local_verifier()
+    credentials = [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=sign_token(f"user-{i}")
+        )
+        for i in range(distinct_tokens)
+    ]
+
+    maxsize = token_cache.maxsize
+    token_cache.maxsize = 0
+    token_cache.clear()
+    uncached = time_calls(credentials, iterations)
+
+    token_cache.maxsize = maxsize or 10000
+    token_cache.clear()
+    cached = time_calls(credentials, iterations)
+    stats = token_cache.stats()
+
+    print(f"🔐 {iterations} calls over {distinct_tokens} tokens")
+    print(f"Without cache:  {uncached:.1f}µs/call")
+    print(f"With cache:     {cached:.1f}µs/call")
+    print(f"Speedup:        {uncached / cached:.1f}x")
+    print(f"Cache hits:     {stats['hits']}  misses: {stats['misses']}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run_benchmark(*args)
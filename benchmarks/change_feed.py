@@ -0,0 +1,97 @@
+"""
+Benchmark of the /transactions/stream fan-out with many idle connections
+
+Opens ``connections`` change streams spread over ``users`` users on the
+in-memory backend (one shared listener per user), measures the memory an
+idle connection costs, then creates ``writes`` transactions and reports how
+long their events take to reach every connection of the writing user.
+
+Usage:
+    python -m benchmarks.change_feed [connections] [users] [writes]
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from models.transaction import Transaction  # noqa: E402
+from services import transaction_service  # noqa: E402
+from services.change_feed_service import READY_EVENT, change_feed  # noqa: E402
+
+# Idle connections only see keep-alives; keep them out of the measurement
+HEARTBEAT_SECONDS = 3600
+
+
+async def consume(user_id: str, ready: asyncio.Event, received: dict) -> None:
+    """Read one connection's events, recording when each transaction arrives"""
+    async for event in change_feed.stream(user_id, heartbeat=HEARTBEAT_SECONDS):
+        if event == READY_EVENT:
+            ready.set()
+            continue
+        received.setdefault(user_id, []).append(time.perf_counter())
+
+
+async def run_benchmark(connections: int = 5000, users: int = 1000, writes: int = 200):
+    """Open idle streams, then time the delivery of ``writes`` changes"""
+    received: dict = {}
+    readiness = [asyncio.Event() for _ in range(connections)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [
+        asyncio.create_task(consume(f"user-{index % users}", ready, received))
+        for index, ready in enumerate(readiness)
+    ]
+    await asyncio.gather(*(ready.wait() for ready in readiness))
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / connections
+    tracemalloc.stop()
+
+    print(f"📡 {change_feed.connections:,} connections, {users:,} users")
+    print(f"   idle memory per connection: {per_connection / 1024:.1f} KiB")
+
+    rng = random.Random(7)
+    latencies = []
+    for _ in range(writes):
+        user_id = f"user-{rng.randrange(users)}"
+        expected = len(received.get(user_id, [])) + (
+            connections // users + (int(user_id[5:]) < connections % users)
+        )
+        started = time.perf_counter()
+        await transaction_service.create_transaction(
+            Transaction(
+                user_id=user_id,
+                type="expense",
+                amount=12.5,
+                category="food",
+                date=datetime.now(timezone.utc),
+            )
+        )
+        while len(received.get(user_id, [])) < expected:
+            await asyncio.sleep(0)
+        latencies.append((received[user_id][-1] - started) * 1000)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies.sort()
+    print(
+        f"   write to last delivery over {writes} writes: "
+        f"p50 {statistics.median(latencies):.2f}ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f}ms"
+    )
+    print(f"   after close: {change_feed.connections} connections")
+
+
+if __name__ == "__main__":
+    connections_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    users_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    writes_arg = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    asyncio.run(run_benchmark(connections_arg, users_arg, writes_arg))
@@ -0,0 +1,66 @@
+"""
+Load benchmark for concurrent GET /transactions/ requests
+
+Fires a burst of list requests at a running API and compares the wall-clock
+time of the burst with the sum of the individual request latencies. When the
+Firestore data path blocks the event loop the requests run one after another
+and the overlap factor stays close to 1.0; with the async client it grows
+towards the concurrency level.
+
+Usage:
+    API_TOKEN=<bearer token> python benchmarks/concurrent_list.py [concurrency] [requests]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+
+
+def timed_get(session: requests.Session, headers: dict) -> float:
+    """Issue one list request and return its latency in seconds"""
+    started = time.perf_counter()
+    response = session.get(f"{BASE_URL}/transactions/", headers=headers, timeout=60)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def run_benchmark(concurrency: int = 20, total_requests: int = 100):
+    """Run the burst and print latency and overlap statistics"""
+    token = os.getenv("API_TOKEN")
+    if not token:
+        print("Set API_TOKEN to a valid bearer token first")
+        sys.exit(1)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    session = requests.Session()
+
+    # Warm up connection pool and server-side clients
+    timed_get(session, headers)
+
+    print(f"🚀 {total_requests} requests, concurrency {concurrency}")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(
+            pool.map(lambda _: timed_get(session, headers), range(total_requests))
+        )
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    serial = sum(latencies)
+    print(f"Wall time:       {wall:.3f}s")
+    print(f"Sum of latency:  {serial:.3f}s")
+    print(f"p50 latency:     {latencies[len(latencies) // 2] * 1000:.1f}ms")
+    print(f"p95 latency:     {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms")
+    print(f"Throughput:      {total_requests / wall:.1f} req/s")
+    # ~1.0 means requests were serialized, ~concurrency means full overlap
+    print(f"Overlap factor:  {serial / wall:.2f}x")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run_benchmark(*args)
@@ -0,0 +1,94 @@
+"""
+Benchmark of converting many transactions to a reporting currency
+
+Writes a synthetic daily rate table (ten years, 30 currencies, with gaps) to
+a temporary CSV, loads it through ``fx_service`` and times the vectorized
+conversion of ``rows`` amounts in mixed currencies, then the same rows
+converted one at a time for comparison.
+
+Usage:
+    python -m benchmarks.fx_conversion [rows] [iterations]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from services.fx_service import RateTable
+
+CURRENCIES = [f"C{index:02d}" for index in range(29)] + ["USD"]
+START = date(2015, 1, 1)
+DAYS = 3653
+
+
+def write_rate_table(path: str, seed: int = 7) -> None:
+    """Business-day rates per EUR, with a few N/A gaps"""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("Date," + ",".join(CURRENCIES) + "\n")
+        for offset in range(DAYS):
+            day = START + timedelta(days=offset)
+            if day.weekday() >= 5:
+                continue
+            cells = [
+                "N/A" if rng.random() < 0.01 else f"{rate:.4f}"
+                for rate in rng.uniform(0.5, 150, len(CURRENCIES))
+            ]
+            handle.write(day.isoformat() + "," + ",".join(cells) + "\n")
+
+
+def time_ms(function, iterations: int) -> float:
+    """Median wall time of a call in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(rows: int = 100_000, iterations: int = 20) -> None:
+    """Time the bulk conversion of ``rows`` amounts"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rates.csv")
+        write_rate_table(path)
+        started = time.perf_counter()
+        table = RateTable.from_csv(path)
+        load_ms = (time.perf_counter() - started) * 1000
+
+    rng = np.random.default_rng(11)
+    amounts = rng.lognormal(mean=3.5, sigma=0.6, size=rows).round(2)
+    codes = rng.integers(0, len(CURRENCIES) + 1, size=rows)
+    currencies = CURRENCIES + ["EUR"]
+    days = (START - date(1970, 1, 1)).days + rng.integers(0, DAYS, size=rows)
+
+    bulk_ms = time_ms(
+        lambda: table.convert(amounts, codes, currencies, days, "USD"), iterations
+    )
+    sample = min(rows, 2000)
+    single_ms = time_ms(
+        lambda: [
+            table.convert_one(amounts[i], currencies[codes[i]], days[i], "USD")
+            for i in range(sample)
+        ],
+        max(1, iterations // 10),
+    ) * (rows / sample)
+
+    converted = table.convert(amounts, codes, currencies, days, "USD")
+    print(f"💱 {len(table.days):,} rate days x {len(table.currencies)} currencies")
+    print(f"   load table         {load_ms:8.2f}ms")
+    print(
+        f"   {rows:,} rows bulk   {bulk_ms:8.2f}ms  ({np.isnan(converted).sum()} without a rate)"
+    )
+    print(f"   {rows:,} rows 1-by-1 {single_ms:8.2f}ms  (extrapolated from {sample:,})")
+
+
+if __name__ == "__main__":
+    rows_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    iterations_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run_benchmark(rows_arg, iterations_arg)
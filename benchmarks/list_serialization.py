@@ -0,0 +1,116 @@
+"""
+Benchmark of the CPU cost per row of a GET /transactions/ response
+
+Serializes the same synthetic Firestore documents twice, without any
+storage round trip, the way the endpoint's ``load()`` does: build the
+transactions, fill ``converted_amount``, then ``encode_transactions``.
+
+- default: a TransactionResponse per document, encoded through FastAPI's
+  ``jsonable_encoder`` and JSONResponse
+- fast (FAST_JSON_RESPONSES): plain rows from ``response_row`` encoded
+  with orjson
+
+Usage:
+    python -m benchmarks.list_serialization [rows] [iterations]
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from config.settings import DEFAULT_CURRENCY  # noqa: E402
+from models.transaction import TransactionResponse  # noqa: E402
+from routers.transaction import encode_transactions  # noqa: E402
+from services.transaction_service import (  # noqa: E402
+    response_row,
+    with_converted_amounts,
+)
+from utils import fast_json  # noqa: E402
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+CATEGORIES = ["food", "rent", "transport", "salary", "fun"]
+
+
+def synthetic_documents(rows: int) -> List[tuple]:
+    """(document id, data) pairs shaped like Firestore snapshots"""
+    documents = []
+    for index in range(rows):
+        date = START + timedelta(minutes=37 * index)
+        documents.append(
+            (
+                f"tx{index:018d}",
+                {
+                    "user_id": "benchmark-user",
+                    "type": "expense" if index % 5 else "income",
+                    "amount": round(3.5 + (index * 7919) % 50000 / 100, 2),
+                    "category": CATEGORIES[index % len(CATEGORIES)],
+                    # Firestore returns this datetime subclass
+                    "date": DatetimeWithNanoseconds(
+                        *date.timetuple()[:6], tzinfo=timezone.utc
+                    ),
+                    "description": f"purchase {index}" if index % 3 else None,
+                    "search_terms": ["purchase", CATEGORIES[index % len(CATEGORIES)]],
+                },
+            )
+        )
+    return documents
+
+
+def default_path(documents: List[tuple]) -> bytes:
+    """What the endpoint does without the fast path"""
+    transactions = [
+        TransactionResponse(id=doc_id, **data) for doc_id, data in documents
+    ]
+    with_converted_amounts(transactions, DEFAULT_CURRENCY)
+    return encode_transactions(transactions, fast=False)
+
+
+def fast_path(documents: List[tuple]) -> bytes:
+    """What the endpoint does with FAST_JSON_RESPONSES"""
+    rows = [response_row(doc_id, data) for doc_id, data in documents]
+    with_converted_amounts(rows, DEFAULT_CURRENCY)
+    return encode_transactions(rows, fast=True)
+
+
+def time_ms(function, iterations: int) -> float:
+    """Median wall time of a call in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(rows: int = 10_000, iterations: int = 20) -> bool:
+    """Compare both serialization paths over ``rows`` documents"""
+    if not fast_json.available():
+        print("orjson is not installed; the fast path is unavailable")
+        return False
+
+    documents = synthetic_documents(rows)
+    if default_path(documents) != fast_path(documents):
+        print("❌ the two paths produce different bodies")
+        return False
+
+    default_ms = time_ms(lambda: default_path(documents), iterations)
+    fast_ms = time_ms(lambda: fast_path(documents), iterations)
+
+    print(f"📦 {rows:,} rows, median of {iterations} iterations (identical bodies)")
+    print(f"   default  {default_ms:8.2f}ms  {default_ms * 1000 / rows:6.2f}µs/row")
+    print(f"   fast     {fast_ms:8.2f}ms  {fast_ms * 1000 / rows:6.2f}µs/row")
+    print(f"   speedup  {default_ms / fast_ms:.1f}x")
+    return True
+
+
+if __name__ == "__main__":
+    rows_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    iterations_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sys.exit(0 if run_benchmark(rows_arg, iterations_arg) else 1)
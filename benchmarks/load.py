@@ -0,0 +1,413 @@
+"""
+Reproducible load benchmark for the API
+
+Boots ``main:app`` against a local storage backend (memory by default) with
+locally signed ID tokens, seeds a deterministic dataset and drives a weighted
+mix of list, create, update, delete and login requests at a fixed concurrency.
+Throughput and p50/p95/p99 latency are reported per endpoint and written to a
+JSON file so runs can be compared between commits.
+
+Usage:
+    python -m benchmarks.load run [--dataset 1k|100k|1m] [--concurrency 32]
+        [--requests 5000] [--mix list=60,create=15,update=10,delete=5,login=10]
+        [--backend memory|sqlite] [--transport asgi|http] [--output FILE]
+    python -m benchmarks.load compare BASELINE.json CANDIDATE.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+DATASETS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_MIX = "list=60,create=15,update=10,delete=5,login=10"
+CATEGORIES = ["food", "rent", "transport", "salary", "health", "leisure", "bills"]
+SEED_CHUNK = 400
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Parse ``name=weight,...`` into a weight table"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def random_transaction(rng: random.Random, user_id: str = None) -> dict:
+    """Plausible transaction spread over the last three years"""
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    transaction = {
+        "type": "income" if rng.random() < 0.2 else "expense",
+        "amount": round(rng.uniform(1, 500), 2),
+        "category": rng.choice(CATEGORIES),
+        "date": start + timedelta(seconds=rng.randrange(3 * 365 * 86400)),
+        "description": f"benchmark {rng.randrange(1_000_000)}",
+    }
+    if user_id:
+        transaction["user_id"] = user_id
+    return transaction
+
+
+class BenchmarkState:
+    """Users, their tokens and the transaction IDs the mix can act on"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.users: List[dict] = []
+        self.transaction_ids: Dict[str, List[str]] = {}
+
+    def pick_user(self) -> dict:
+        return self.rng.choice(self.users)
+
+    def pick_transaction(self, user: dict, remove: bool = False):
+        ids = self.transaction_ids[user["uid"]]
+        if not ids:
+            return None
+        index = self.rng.randrange(len(ids))
+        if remove:
+            # Swap-remove keeps deletes O(1) on million-entry pools
+            ids[index], ids[-1] = ids[-1], ids[index]
+            return ids.pop()
+        return ids[index]
+
+
+async def seed_dataset(state: BenchmarkState, users: int, per_user: int) -> float:
+    """Create profiles and ``per_user`` transactions for each benchmark user"""
+    from benchmarks.local_tokens import register_user, sign_token
+    from models.transaction import Transaction
+    from services import transaction_service, user_service
+
+    started = time.perf_counter()
+    for index in range(users):
+        uid = f"bench-user-{index}"
+        email = f"{uid}@example.com"
+        register_user(uid, email, f"Benchmark {index}")
+        await user_service.create_user_profile(
+            user_id=uid, email=email, name=f"Benchmark {index}"
+        )
+        ids = []
+        for offset in range(0, per_user, SEED_CHUNK):
+            count = min(SEED_CHUNK, per_user - offset)
+            chunk = [
+                Transaction(**random_transaction(state.rng, uid)) for _ in range(count)
+            ]
+            document_ids = [f"{uid}-{offset + i:07d}" for i in range(count)]
+            await transaction_service.create_transactions(chunk, document_ids)
+            ids.extend(document_ids)
+        state.users.append(
+            {
+                "uid": uid,
+                "email": email,
+                "headers": {"Authorization": f"Bearer {sign_token(uid)}"},
+            }
+        )
+        state.transaction_ids[uid] = ids
+    return time.perf_counter() - started
+
+
+async def op_list(client, state: BenchmarkState):
+    user = state.pick_user()
+    return await client.get("/transactions/?limit=100", headers=user["headers"])
+
+
+async def op_create(client, state: BenchmarkState):
+    user = state.pick_user()
+    body = random_transaction(state.rng)
+    body["date"] = body["date"].isoformat()
+    response = await client.post("/transactions/", json=body, headers=user["headers"])
+    if response.status_code == 201:
+        state.transaction_ids[user["uid"]].append(response.json()["id"])
+    return response
+
+
+async def op_update(client, state: BenchmarkState):
+    user = state.pick_user()
+    transaction_id = state.pick_transaction(user)
+    body = {"amount": round(state.rng.uniform(1, 500), 2)}
+    return await client.put(
+        f"/transactions/{transaction_id}", json=body, headers=user["headers"]
+    )
+
+
+async def op_delete(client, state: BenchmarkState):
+    user = state.pick_user()
+    transaction_id = state.pick_transaction(user, remove=True)
+    return await client.delete(
+        f"/transactions/{transaction_id}", headers=user["headers"]
+    )
+
+
+async def op_login(client, state: BenchmarkState):
+    user = state.pick_user()
+    return await client.post(
+        "/auth/login", json={"email": user["email"], "password": "benchmark"}
+    )
+
+
+# operation -> (endpoint label, request coroutine, expected status)
+OPERATIONS = {
+    "list": ("GET /transactions/", op_list, 200),
+    "create": ("POST /transactions/", op_create, 201),
+    "update": ("PUT /transactions/{id}", op_update, 200),
+    "delete": ("DELETE /transactions/{id}", op_delete, 204),
+    "login": ("POST /auth/login", op_login, 200),
+}
+
+
+async def drive(client, state: BenchmarkState, weights, total: int, concurrency: int):
+    """Run ``total`` requests from ``concurrency`` workers; return raw samples"""
+    names = list(weights)
+    plan = state.rng.choices(names, [weights[name] for name in names], k=total)
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < len(plan):
+            name = plan[next_index]
+            next_index += 1
+            _, operation, expected = OPERATIONS[name]
+            started = time.perf_counter()
+            response = await operation(client, state)
+            samples[name].append(time.perf_counter() - started)
+            if response.status_code != expected:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, errors, time.perf_counter() - started
+
+
+def summarize(samples, errors, elapsed: float) -> dict:
+    """Per-endpoint throughput and latency percentiles in milliseconds"""
+    endpoints = {}
+    for name, latencies in samples.items():
+        ordered = sorted(latencies)
+        endpoints[OPERATIONS[name][0]] = {
+            "requests": len(ordered),
+            "errors": errors[name],
+            "throughput_rps": len(ordered) / elapsed if elapsed else 0.0,
+            "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+        }
+    everything = sorted(value for values in samples.values() for value in values)
+    return {
+        "elapsed_s": elapsed,
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "throughput_rps": len(everything) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(everything, 0.50) * 1000,
+        "p95_ms": percentile(everything, 0.95) * 1000,
+        "p99_ms": percentile(everything, 0.99) * 1000,
+        "endpoints": endpoints,
+    }
+
+
+def git_revision() -> str:
+    """Short commit hash of the working tree (``dirty`` suffix if modified)"""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        return f"{revision}-dirty" if dirty else revision
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app):
+    """Serve the app with uvicorn on a background thread; return (server, url)"""
+    import uvicorn
+
+    port = _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run_benchmark(args) -> dict:
+    """Seed, warm up and measure one configuration"""
+    import httpx
+
+    from benchmarks.local_tokens import install_local_auth
+    from main import app
+
+    install_local_auth()
+    state = BenchmarkState(random.Random(args.seed))
+    per_user = DATASETS[args.dataset]
+    weights = parse_mix(args.mix)
+
+    print(f"🌱 Seeding {args.users} user(s) x {per_user} transactions...")
+    seed_seconds = await seed_dataset(state, args.users, per_user)
+    print(f"   done in {seed_seconds:.1f}s")
+
+    server = None
+    if args.transport == "http":
+        server, base_url = start_server(app)
+        client = httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+    try:
+        async with client:
+            await drive(client, state, weights, args.warmup, args.concurrency)
+            samples, errors, elapsed = await drive(
+                client, state, weights, args.requests, args.concurrency
+            )
+    finally:
+        if server:
+            server.should_exit = True
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "dataset": args.dataset,
+            "transactions_per_user": per_user,
+            "users": args.users,
+            "backend": os.environ["STORAGE_BACKEND"],
+            "transport": args.transport,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "mix": weights,
+            "seed": args.seed,
+        },
+        "seed_seconds": seed_seconds,
+        "results": summarize(samples, errors, elapsed),
+    }
+
+
+def print_results(report: dict) -> None:
+    results = report["results"]
+    print(
+        f"\n📊 {results['requests']} requests in {results['elapsed_s']:.2f}s "
+        f"({results['throughput_rps']:.0f} req/s, {results['errors']} errors)"
+    )
+    print(
+        f"{'endpoint':<28}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err':>6}"
+    )
+    for endpoint, stats in results["endpoints"].items():
+        print(
+            f"{endpoint:<28}{stats['throughput_rps']:>9.0f}{stats['p50_ms']:>9.2f}"
+            f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['errors']:>6}"
+        )
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    """Print per-endpoint changes between two result files"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    if baseline["config"] != candidate["config"]:
+        print("⚠️  Configurations differ; numbers may not be comparable")
+
+    def change(before: float, after: float) -> str:
+        return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+    print(f"{baseline['revision']} -> {candidate['revision']}")
+    print(f"{'endpoint':<28}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for endpoint, after in candidate["results"]["endpoints"].items():
+        before = baseline["results"]["endpoints"].get(endpoint)
+        if before is None:
+            continue
+        print(
+            f"{endpoint:<28}"
+            + "".join(
+                f"{change(before[key], after[key]):>10}"
+                for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the load benchmark")
+    run.add_argument("--dataset", choices=sorted(DATASETS), default="1k")
+    run.add_argument("--users", type=int, default=1)
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--requests", type=int, default=5000)
+    run.add_argument("--warmup", type=int, default=200)
+    run.add_argument("--mix", default=DEFAULT_MIX)
+    run.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    run.add_argument("--transport", choices=["asgi", "http"], default="asgi")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="Result file (default benchmarks/results/)")
+
+    diff = commands.add_parser("compare", help="Compare two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        compare(args.baseline, args.candidate)
+        return
+
+    # Must be set before main/storage are imported
+    os.environ["STORAGE_BACKEND"] = args.backend
+    if args.backend == "sqlite":
+        os.environ.setdefault("SQLITE_PATH", f"benchmark-{args.dataset}.db")
+        Path(os.environ["SQLITE_PATH"]).unlink(missing_ok=True)
+
+    report = asyncio.run(run_benchmark(args))
+    print_results(report)
+
+    output = Path(
+        args.output
+        or RESULTS_DIR
+        / f"{report['revision']}-{args.dataset}-{args.backend}-{args.transport}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Saved {output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
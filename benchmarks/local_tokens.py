@@ -0,0 +1,75 @@
+"""Locally signed ID tokens for offline benchmarks
+
+Mints RS256 JWTs shaped like Firebase ID tokens with a throwaway key pair and
+verifies them with the same signature check the Admin SDK performs, so auth
+cost can be measured without network access or real credentials.
+"""
+
+import time
+from types import SimpleNamespace
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+PROJECT_ID = "local-benchmark"
+
+# email -> user record for the login stand-in
+_users = {}
+
+_private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+_public_key = _private_key.public_key()
+
+
+def sign_token(uid: str, lifetime: int = 3600) -> str:
+    """Mint a signed ID token for the given user"""
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "uid": uid,
+        "iat": now,
+        "exp": now + lifetime,
+        "auth_time": now,
+    }
+    return jwt.encode(claims, _private_key, algorithm="RS256")
+
+
+def verify_token(token: str, **_kwargs) -> dict:
+    """Drop-in replacement for firebase_admin.auth.verify_id_token"""
+    return jwt.decode(token, _public_key, algorithms=["RS256"], audience=PROJECT_ID)
+
+
+def install_local_verifier() -> None:
+    """Route the auth middleware through the local verifier"""
+    from middleware import auth as auth_middleware
+
+    auth_middleware.auth.verify_id_token = verify_token
+
+
+def register_user(uid: str, email: str, display_name: str = "") -> None:
+    """Make a user known to the local Admin SDK stand-in"""
+    _users[email] = SimpleNamespace(uid=uid, email=email, display_name=display_name)
+
+
+def get_user_by_email(email: str, **_kwargs):
+    """Drop-in replacement for firebase_admin.auth.get_user_by_email"""
+    from firebase_admin import auth
+
+    if email not in _users:
+        raise auth.UserNotFoundError(f"No user record found for {email}")
+    return _users[email]
+
+
+def create_custom_token(uid: str, *_args, **_kwargs) -> bytes:
+    """Drop-in replacement for firebase_admin.auth.create_custom_token"""
+    return sign_token(uid).encode("utf-8")
+
+
+def install_local_auth() -> None:
+    """Route token verification and the login endpoint through local stand-ins"""
+    from routers import auth as auth_router
+
+    install_local_verifier()
+    auth_router.auth.get_user_by_email = get_user_by_email
+    auth_router.auth.create_custom_token = create_custom_token
@@ -0,0 +1,103 @@
+"""
+Benchmark of concurrent duplicate GET /transactions/ requests
+
+Seeds one user on the in-memory backend, then fires ``clients`` identical
+list requests at once, with and without single-flight coalescing, and
+reports the documents read and the wall time of each burst.
+
+Usage:
+    python -m benchmarks.read_coalescing [transactions] [clients]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import httpx  # noqa: E402
+
+from benchmarks.local_tokens import install_local_verifier, sign_token  # noqa: E402
+
+install_local_verifier()
+
+from main import app  # noqa: E402
+from models.transaction import Transaction  # noqa: E402
+from routers import transaction as transaction_router  # noqa: E402
+from services import transaction_service  # noqa: E402
+from utils.metrics import storage_documents  # noqa: E402
+
+USER_ID = "coalescing-user"
+SEED_CHUNK = 100
+
+
+class NoCoalescing:
+    """Runs every call, as without single-flight"""
+
+    async def do(self, key, function):
+        return await function()
+
+
+def documents_read() -> float:
+    return storage_documents._values.get(("read",), 0)
+
+
+async def seed(transactions: int) -> None:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for offset in range(0, transactions, SEED_CHUNK):
+        await transaction_service.create_transactions(
+            [
+                Transaction(
+                    user_id=USER_ID,
+                    type="expense",
+                    amount=round(1 + index % 500 / 10, 2),
+                    category="food",
+                    date=start + timedelta(hours=index),
+                )
+                for index in range(offset, min(offset + SEED_CHUNK, transactions))
+            ]
+        )
+
+
+async def burst(client: httpx.AsyncClient, clients: int) -> tuple:
+    """Documents read and milliseconds for ``clients`` identical requests"""
+    headers = {"Authorization": f"Bearer {sign_token(USER_ID)}"}
+    reads = documents_read()
+    started = time.perf_counter()
+    responses = await asyncio.gather(
+        *(client.get("/transactions/", headers=headers) for _ in range(clients))
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    assert all(response.status_code == 200 for response in responses)
+    return documents_read() - reads, elapsed
+
+
+async def run_benchmark(transactions: int = 2000, clients: int = 50) -> None:
+    await seed(transactions)
+    coalescer = transaction_router.read_coalescer
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        print(
+            f"🔁 {clients} identical list requests over {transactions:,} transactions"
+        )
+        for label, implementation in (
+            ("without", NoCoalescing()),
+            ("with", coalescer),
+        ):
+            transaction_router.read_coalescer = implementation
+            reads, elapsed = await burst(client, clients)
+            print(
+                f"   {label:8} single-flight  {reads:10,.0f} documents read"
+                f"  {elapsed:8.1f}ms"
+            )
+    transaction_router.read_coalescer = coalescer
+
+
+if __name__ == "__main__":
+    transactions_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    clients_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(run_benchmark(transactions_arg, clients_arg))
@@ -1,9 +1,32 @@
-"""Connect to Firebase Firestore"""
+"""Connect to Firebase"""
+
+import os
 
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
+from config.settings import FIREBASE_CREDENTIALS, STORAGE_BACKEND
+
+
+def _initialize_app():
+    """Initialize the Firebase app, unless running offline without credentials"""
+    if STORAGE_BACKEND != "firestore" and not os.path.exists(FIREBASE_CREDENTIALS):
+        # Local storage backends work without a key; Firebase Auth calls will not
+        return None
+
+    cred = credentials.Certificate(FIREBASE_CREDENTIALS)
+    return firebase_admin.initialize_app(cred)
+
+
+app = _initialize_app()
+
+
+def create_firestore_client():
+    """Async client: every Firestore round trip is awaited instead of blocking
+    the event loop, so a slow query no longer stalls other requests"""
+    return firestore_async.client()
 
-cred = credentials.Certificate("serviceAccountKey.json")
-firebase_admin.initialize_app(cred)
 
-db = firestore.client()
+def create_firestore_listener_client():
+    """Synchronous client, only used for snapshot listeners: the async client
+    has none, and a listener runs on its own thread anyway"""
+    return firestore.client()
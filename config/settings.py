@@ -0,0 +1,67 @@
+"""Runtime settings read from environment variables"""
+
+import os
+
+# Verified ID token cache (0 disables it)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+
+# Firebase service account key (required by the Firestore backend)
+FIREBASE_CREDENTIALS = os.getenv("FIREBASE_CREDENTIALS", "serviceAccountKey.json")
+
+# Storage backend: "firestore", "memory" or "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "finance.db")
+
+# User profile read-through cache; CACHE_REDIS_URL shares it between workers
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+
+# Column arrays behind /analytics, kept per user until their next write
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "32"))
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "900"))
+
+# Encode transaction lists with orjson from unvalidated rows (needs orjson)
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Add a Server-Timing header (app and storage time) to every response
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Seconds between re-syncs of budget spending counters (0 disables them)
+BUDGET_RESYNC_INTERVAL_SECONDS = float(
+    os.getenv("BUDGET_RESYNC_INTERVAL_SECONDS", "3600")
+)
+
+# Seconds between scheduler runs posting due recurring transactions (0 disables)
+RECURRING_INTERVAL_SECONDS = float(os.getenv("RECURRING_INTERVAL_SECONDS", "60"))
+
+# /transactions/stream: events buffered per connection before it is reset,
+# seconds between keep-alive comments, and connections allowed per worker
+CHANGE_FEED_BUFFER_SIZE = int(os.getenv("CHANGE_FEED_BUFFER_SIZE", "256"))
+CHANGE_FEED_HEARTBEAT_SECONDS = float(os.getenv("CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+CHANGE_FEED_MAX_CONNECTIONS = int(os.getenv("CHANGE_FEED_MAX_CONNECTIONS", "10000"))
+
+# Currency of transactions and profiles that do not name one
+DEFAULT_CURRENCY = os.getenv("DEFAULT_CURRENCY", "USD")
+# Daily exchange rate table (CSV: a date column, then one column per currency
+# with units per FX_BASE_CURRENCY, e.g. the ECB's eurofxref-hist.csv)
+FX_RATES_PATH = os.getenv("FX_RATES_PATH", "fx_rates.csv")
+FX_BASE_CURRENCY = os.getenv("FX_BASE_CURRENCY", "EUR")
+
+# Per-user token buckets per route, e.g. "GET /transactions/=5/20" (requests
+# per second / burst, comma-separated; empty disables limiting). Buckets are
+# shared between workers through CACHE_REDIS_URL when it is set.
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")
+
+# Identical concurrent list reads share one query; followers wait at most
+# this long for the first one (shared between workers through CACHE_REDIS_URL)
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "10"))
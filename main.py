@@ -1,15 +1,58 @@
 """Main application entry point for Personal Finance Manager API"""
 
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from routers import transaction, auth, user
-import traceback
+from middleware import MetricsMiddleware, enforce_rate_limit
+from routers import transaction, auth, user, metrics, analytics, budget, recurring
+from config.settings import BUDGET_RESYNC_INTERVAL_SECONDS, RECURRING_INTERVAL_SECONDS
+from services import budget_service, recurring_service
+from utils.background import run_periodically
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Start the periodic background jobs and stop them on shutdown"""
+    tasks = []
+    if BUDGET_RESYNC_INTERVAL_SECONDS > 0:
+        tasks.append(
+            asyncio.create_task(
+                run_periodically(
+                    "Budget re-sync",
+                    BUDGET_RESYNC_INTERVAL_SECONDS,
+                    budget_service.resync_budgets,
+                )
+            )
+        )
+
+    if RECURRING_INTERVAL_SECONDS > 0:
+        tasks.append(
+            asyncio.create_task(
+                run_periodically(
+                    "Recurring transactions",
+                    RECURRING_INTERVAL_SECONDS,
+                    recurring_service.process_due_rules,
+                )
+            )
+        )
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
 
 app = FastAPI(
     title="Personal Finance Manager API 🚀",
     description="A comprehensive API for managing personal finances with Firebase authentication",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -22,15 +65,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],  # Allow all headers including Authorization
+    expose_headers=[
+        "X-Next-Page-Token",
+        "ETag",
+        "Server-Timing",
+        "Retry-After",
+    ],  # Pagination cursor, caching, timings, rate limiting
 )
 
+# Per-route latency and storage call metrics (added last, so it wraps CORS too)
+app.add_middleware(MetricsMiddleware)
+
 
 # Add global exception handler to ensure CORS headers are always present
 @app.exception_handler(Exception)
 async def global_exception_handler(_: Request, exc: Exception):
     """Global exception handler to ensure CORS headers are included in error responses"""
-    print(f"Global exception caught: {type(exc).__name__}: {exc}")
-    print(f"Traceback: {traceback.format_exc()}")
+    logger.error(
+        "Unhandled exception: %s: %s",
+        type(exc).__name__,
+        exc,
+        exc_info=(type(exc), exc, exc.__traceback__),
+    )
 
     response = JSONResponse(
         status_code=500,
@@ -45,10 +101,15 @@ async def global_exception_handler(_: Request, exc: Exception):
     return response
 
 
-# Include routers
+# Include routers; authenticated ones are rate limited per user (RATE_LIMITS)
+rate_limited = [Depends(enforce_rate_limit)]
 app.include_router(auth.router)
-app.include_router(user.router)
-app.include_router(transaction.router)
+app.include_router(user.router, dependencies=rate_limited)
+app.include_router(transaction.router, dependencies=rate_limited)
+app.include_router(analytics.router, dependencies=rate_limited)
+app.include_router(budget.router, dependencies=rate_limited)
+app.include_router(recurring.router, dependencies=rate_limited)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -62,6 +123,10 @@ def root():
             "auth": "/auth",
             "users": "/users",
             "transactions": "/transactions",
+            "analytics": "/analytics",
+            "budgets": "/budgets",
+            "recurring": "/recurring",
+            "metrics": "/metrics",
         },
     }
 
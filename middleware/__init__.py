@@ -1,5 +1,12 @@
 """Initialize middleware package"""
 
 from .auth import get_current_user_id, AuthMiddleware
+from .metrics import MetricsMiddleware
+from .rate_limit import enforce_rate_limit
 
-__all__ = ["get_current_user_id", "AuthMiddleware"]
+__all__ = [
+    "get_current_user_id",
+    "AuthMiddleware",
+    "MetricsMiddleware",
+    "enforce_rate_limit",
+]
@@ -1,14 +1,28 @@
 """Authentication middleware for Firebase JWT validation"""
 
+import hashlib
 import logging
+import time
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth
+from config.settings import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS
+from utils.cache import TTLCache
+from utils.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
+# Decoded claims of already verified tokens, keyed on the token's SHA-256
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+REGISTRY.register_cache("auth_token", token_cache.stats)
+
+
+def _token_key(token: str) -> str:
+    """Cache key for a raw ID token (never keep the token itself in memory)"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
 
 class AuthMiddleware:
     """Middleware for Firebase JWT authentication"""
@@ -18,9 +32,18 @@ class AuthMiddleware:
         credentials: HTTPAuthorizationCredentials = Depends(security),
     ) -> dict:
         """Verify Firebase JWT token and return user claims"""
+        cache_key = _token_key(credentials.credentials)
+        cached_token = token_cache.get(cache_key)
+        if cached_token is not None:
+            return cached_token
+
         try:
             # Verify the ID token
             decoded_token = auth.verify_id_token(credentials.credentials)
+
+            # Never serve a cached token past its own expiry
+            remaining = decoded_token.get("exp", 0) - time.time()
+            token_cache.set(cache_key, decoded_token, ttl=remaining)
             return decoded_token
         except auth.ExpiredIdTokenError as exc:
             logger.error("Expired ID token")
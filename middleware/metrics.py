@@ -0,0 +1,70 @@
+"""ASGI middleware recording per-route latency and storage usage"""
+
+import time
+from config.settings import SERVER_TIMING_ENABLED
+from utils.metrics import (
+    RequestStats,
+    current_request_stats,
+    http_request_duration,
+    http_request_storage_round_trips,
+)
+
+
+def _server_timing(elapsed: float, stats: RequestStats) -> bytes:
+    """Server-Timing header value for the current request"""
+    return (
+        f"app;dur={elapsed * 1000:.1f}, "
+        f"storage;dur={stats.storage_seconds * 1000:.1f};"
+        f'desc="{stats.round_trips} calls, {stats.reads} reads, {stats.writes} writes"'
+    ).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """Time every HTTP request and attribute its storage calls to the route"""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (
+                            b"server-timing",
+                            _server_timing(time.perf_counter() - started, stats),
+                        )
+                    )
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_stats.reset(token)
+            # Label by route template so /transactions/{id} stays one series
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=method,
+                route=route_path,
+                status=status_code,
+            )
+            http_request_storage_round_trips.observe(
+                stats.round_trips, method=method, route=route_path
+            )
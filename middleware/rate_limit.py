@@ -0,0 +1,46 @@
+"""Per-user rate limiting of authenticated routes"""
+
+import math
+from fastapi import Depends, HTTPException, Request, status
+from config.settings import CACHE_REDIS_URL, RATE_LIMITS
+from middleware.auth import get_current_user_id
+from utils.metrics import REGISTRY
+from utils.rate_limit import create_rate_limiter, parse_limits
+
+# "METHOD /path/template" -> (requests per second, burst)
+route_limits = parse_limits(RATE_LIMITS)
+
+rate_limiter = create_rate_limiter("rate_limit", CACHE_REDIS_URL)
+
+rate_limited_requests = REGISTRY.counter(
+    "http_requests_rate_limited_total",
+    "Requests rejected with 429 by the per-user rate limiter",
+    ("route",),
+)
+
+
+async def enforce_rate_limit(
+    request: Request, current_user_id: str = Depends(get_current_user_id)
+) -> None:
+    """Take a token from the user's bucket for this route, or answer 429
+
+    Routes without an entry in RATE_LIMITS are not limited. Resolved before
+    the endpoint runs, so a rejected request costs no storage reads; the
+    token check reuses the endpoint's own ``get_current_user_id``.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return
+    name = f"{request.method} {route.path}"
+    limit = route_limits.get(name)
+    if limit is None:
+        return
+
+    wait = await rate_limiter.acquire(f"{current_user_id}:{name}", *limit)
+    if wait > 0:
+        rate_limited_requests.inc(route=name)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, retry later",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
@@ -0,0 +1,62 @@
+"""Analytics models: spending trends, category shares and anomalies"""
+
+from datetime import datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+
+
+class TrendPoint(BaseModel):
+    """Totals of one period and their change from the previous period"""
+
+    period: str
+    income: float
+    expense: float
+    net: float
+    income_change: Optional[float] = None
+    expense_change: Optional[float] = None
+    net_change: Optional[float] = None
+    expense_change_pct: Optional[float] = None
+
+
+class SpendingTrends(BaseModel):
+    """Income and expenses per week or month"""
+
+    interval: Literal["week", "month"]
+    points: List[TrendPoint]
+
+
+class CategoryShare(BaseModel):
+    """One category's part of the income or expenses"""
+
+    category: str
+    total: float
+    count: int
+    average: float
+    percentage: float
+
+
+class CategoryBreakdown(BaseModel):
+    """Totals per category, largest first"""
+
+    type: Literal["income", "expense"]
+    total: float
+    categories: List[CategoryShare]
+
+
+class SpendingAnomaly(BaseModel):
+    """An expense far above the usual amount for its category"""
+
+    id: str
+    category: str
+    amount: float
+    date: datetime
+    category_mean: float
+    category_std: float
+    z_score: float
+
+
+class AnomalyReport(BaseModel):
+    """Expenses more than ``threshold`` standard deviations above their mean"""
+
+    threshold: float
+    anomalies: List[SpendingAnomaly]
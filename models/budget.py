@@ -0,0 +1,64 @@
+"""Budget models: spending limits per category and period"""
+
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+from config.settings import DEFAULT_CURRENCY
+
+
+class BudgetBase(BaseModel):
+    """Base budget model"""
+
+    category: str = Field(min_length=1, description="Category the budget applies to")
+    period: Literal["week", "month"]
+    limit: float = Field(gt=0, description="Limit must be positive")
+    alert_threshold: float = Field(
+        0.8, gt=0, le=1, description="Share of the limit that triggers a warning"
+    )
+
+
+class BudgetCreate(BudgetBase):
+    """Budget creation model"""
+
+
+class BudgetUpdate(BaseModel):
+    """Budget update model (category and period are fixed once created)"""
+
+    limit: Optional[float] = Field(None, gt=0, description="Limit must be positive")
+    alert_threshold: Optional[float] = Field(None, gt=0, le=1)
+
+
+class BudgetResponse(BudgetBase):
+    """Budget response model"""
+
+    id: str
+    user_id: str
+    currency: str = Field(
+        DEFAULT_CURRENCY,
+        description="Reporting currency when the budget was created; "
+        "expenses in other currencies count at the rate of their date",
+    )
+    start_period: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class BudgetStatus(BudgetResponse):
+    """Budget with the spending of its current period"""
+
+    current_period: str
+    spent: float
+    count: int
+    remaining: float
+    percentage: float
+
+
+class BudgetAlert(BaseModel):
+    """A budget threshold crossed by a transaction write"""
+
+    budget_id: str
+    category: str
+    period: str
+    limit: float
+    spent: float
+    level: Literal["warning", "exceeded"]
@@ -0,0 +1,55 @@
+"""Recurring transaction rule models"""
+
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+from utils.money import CURRENCY_PATTERN
+
+
+class RecurringRuleBase(BaseModel):
+    """Transaction template and the schedule it repeats on"""
+
+    type: Literal["income", "expense"]
+    amount: float = Field(gt=0, description="Amount must be positive")
+    currency: Optional[str] = Field(
+        None,
+        pattern=CURRENCY_PATTERN,
+        description="ISO 4217 code; defaults to the user's reporting currency",
+    )
+    category: str = Field(min_length=1, description="Category is required")
+    description: Optional[str] = None
+    frequency: Literal["daily", "weekly", "monthly", "yearly"]
+    interval: int = Field(1, ge=1, le=366, description="Repeat every N periods")
+    day_of_month: Optional[int] = Field(
+        None,
+        ge=1,
+        le=31,
+        description="Monthly/yearly rules only; clamped to the month's last day",
+    )
+    start_date: datetime = Field(description="Date of the first occurrence")
+    end_date: Optional[datetime] = Field(None, description="No occurrence after it")
+
+
+class RecurringRuleCreate(RecurringRuleBase):
+    """Recurring rule creation model"""
+
+
+class RecurringRuleUpdate(BaseModel):
+    """Recurring rule update model (the schedule itself is fixed once created)"""
+
+    amount: Optional[float] = Field(None, gt=0, description="Amount must be positive")
+    category: Optional[str] = Field(None, min_length=1)
+    description: Optional[str] = None
+    end_date: Optional[datetime] = None
+
+
+class RecurringRuleResponse(RecurringRuleBase):
+    """Recurring rule response model"""
+
+    id: str
+    user_id: str
+    occurrences: int = Field(description="Occurrences posted so far")
+    next_run: Optional[datetime] = Field(
+        None, description="Date of the next occurrence, empty once the rule ended"
+    )
+    created_at: datetime
@@ -1,8 +1,10 @@
 """Transaction model for financial records"""
 
 from datetime import datetime
-from typing import Literal, Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+from models.budget import BudgetAlert
+from utils.money import CURRENCY_PATTERN, to_minor_units
 
 
 class TransactionBase(BaseModel):
@@ -13,6 +15,17 @@ class TransactionBase(BaseModel):
     category: str = Field(min_length=1, description="Category is required")
     date: datetime
     description: Optional[str] = None
+    currency: Optional[str] = Field(
+        None,
+        pattern=CURRENCY_PATTERN,
+        description="ISO 4217 code; defaults to the user's reporting currency",
+    )
+
+    @model_validator(mode="after")
+    def _check_minor_units(self):
+        if self.currency is not None:
+            to_minor_units(self.amount, self.currency)
+        return self
 
 
 class TransactionCreate(TransactionBase):
@@ -27,6 +40,7 @@ class TransactionUpdate(BaseModel):
     category: Optional[str] = Field(None, min_length=1)
     date: Optional[datetime] = None
     description: Optional[str] = None
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
 
 
 class Transaction(TransactionBase):
@@ -40,3 +54,105 @@ class TransactionResponse(TransactionBase):
 
     id: str
     user_id: str
+    converted_amount: Optional[float] = Field(
+        None,
+        description="Amount in the user's reporting currency at the rate of the "
+        "transaction date, when a rate is known",
+    )
+
+
+class TransactionWriteResponse(TransactionResponse):
+    """Created or updated transaction with the budget thresholds it crossed"""
+
+    budget_alerts: List[BudgetAlert] = []
+
+
+class TransactionSearchResult(TransactionResponse):
+    """Transaction matched by a search with its relevance score"""
+
+    score: float
+
+
+class SummaryBucket(BaseModel):
+    """Totals for one (period, type, category) group"""
+
+    period: Optional[str] = None
+    type: Literal["income", "expense"]
+    category: Optional[str] = None
+    total: float
+    count: int
+
+
+class TransactionSummary(BaseModel):
+    """Aggregated income/expense totals"""
+
+    period: Optional[Literal["day", "week", "month"]] = None
+    currency: Optional[str] = Field(None, description="Currency of every total")
+    total_income: float
+    total_expense: float
+    net: float
+    buckets: List[SummaryBucket]
+
+
+class BalancePoint(BaseModel):
+    """Running balance at the end of one day or month"""
+
+    period: str
+    balance: float
+    net: float
+
+
+class BalanceSeries(BaseModel):
+    """Cumulative balance over time"""
+
+    interval: Literal["day", "month"]
+    currency: Optional[str] = Field(None, description="Currency of every balance")
+    opening_balance: float
+    points: List[BalancePoint]
+
+
+class BulkRowError(BaseModel):
+    """A row rejected by a bulk import"""
+
+    row: int
+    message: str
+
+
+class BulkImportResult(BaseModel):
+    """Outcome of a bulk import"""
+
+    imported: int
+    failed: int
+    errors: List[BulkRowError]
+    replayed: bool = False
+
+
+class TransactionFilter(BaseModel):
+    """Selection of a user's transactions, as in the list endpoint"""
+
+    type: Optional[Literal["income", "expense"]] = None
+    category: Optional[List[str]] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    min_amount: Optional[float] = Field(None, ge=0)
+    max_amount: Optional[float] = Field(None, ge=0)
+
+
+class TransactionBatchRequest(BaseModel):
+    """Delete or update many transactions, chosen by ID or by filter"""
+
+    action: Literal["delete", "update"]
+    ids: Optional[List[str]] = Field(None, min_length=1, max_length=1000)
+    filter: Optional[TransactionFilter] = None
+    update: Optional[TransactionUpdate] = None
+
+
+class TransactionBatchResult(BaseModel):
+    """Outcome of a batch delete or update"""
+
+    matched: int = Field(
+        description="Existing transactions of the user selected by the request"
+    )
+    modified: int
+    not_found: List[str] = []
+    forbidden: List[str] = []
@@ -2,7 +2,8 @@
 
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+from utils.money import CURRENCY_PATTERN
 
 
 class User(BaseModel):
@@ -10,6 +11,7 @@ class User(BaseModel):
 
     email: EmailStr
     name: Optional[str] = None
+    reporting_currency: Optional[str] = None
     created_at: datetime
 
 
@@ -19,6 +21,9 @@ class UserResponse(BaseModel):
     id: str
     email: EmailStr
     name: Optional[str] = None
+    reporting_currency: Optional[str] = Field(
+        None, description="Currency summaries and lists convert to (default if unset)"
+    )
     created_at: datetime
 
 
@@ -26,6 +31,7 @@ class UserUpdate(BaseModel):
     """User update model"""
 
     name: Optional[str] = None
+    reporting_currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
 
 
 class UserCreate(BaseModel):
@@ -0,0 +1,77 @@
+"""Router for spending analytics endpoints"""
+
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from models.analytics import AnomalyReport, CategoryBreakdown, SpendingTrends
+from services import analytics_service
+from middleware.auth import get_current_user_id
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def _validate_range(start_date: Optional[datetime], end_date: Optional[datetime]):
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date",
+        )
+
+
+@router.get("/trends", response_model=SpendingTrends)
+async def get_spending_trends(
+    current_user_id: str = Depends(get_current_user_id),
+    interval: str = Query("month", regex="^(week|month)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+):
+    """Income, expenses and net per week or month with the change from the previous one"""
+    _validate_range(start_date, end_date)
+    try:
+        return await analytics_service.get_spending_trends(
+            current_user_id, interval, start_date, end_date
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+
+@router.get("/categories", response_model=CategoryBreakdown)
+async def get_category_breakdown(
+    current_user_id: str = Depends(get_current_user_id),
+    type: str = Query("expense", regex="^(income|expense)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+):
+    """Total and percentage of each category, largest first"""
+    _validate_range(start_date, end_date)
+    try:
+        return await analytics_service.get_category_breakdown(
+            current_user_id, type, start_date, end_date
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+
+@router.get("/anomalies", response_model=AnomalyReport)
+async def get_spending_anomalies(
+    current_user_id: str = Depends(get_current_user_id),
+    threshold: float = Query(3.0, gt=0, le=10),
+    min_samples: int = Query(5, ge=2),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Expenses more than ``threshold`` standard deviations above their category's mean"""
+    _validate_range(start_date, end_date)
+    try:
+        return await analytics_service.get_spending_anomalies(
+            current_user_id, threshold, min_samples, start_date, end_date, limit
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
@@ -1,6 +1,7 @@
 """Authentication router for user registration and login"""
 
 from fastapi import APIRouter, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from firebase_admin import auth, get_app
 from models.user import UserCreate, UserLogin, AuthResponse, UserResponse
 from services import user_service
@@ -14,7 +15,7 @@ async def check_firebase_status():
     """Check Firebase connection and configuration status"""
     try:
         # Try to list users to test Firebase connection
-        auth.list_users(max_results=1)
+        await run_in_threadpool(auth.list_users, max_results=1)
         return {
             "status": "connected",
             "message": "Firebase is properly configured",
@@ -36,7 +37,8 @@ async def register(user_data: UserCreate):
     try:
 
         # Create user in Firebase Auth
-        firebase_user = auth.create_user(
+        firebase_user = await run_in_threadpool(
+            auth.create_user,
             email=user_data.email,
             password=user_data.password,
             display_name=user_data.name,
@@ -48,7 +50,9 @@ async def register(user_data: UserCreate):
         )
 
         # Generate custom token for immediate login
-        custom_token = auth.create_custom_token(firebase_user.uid)
+        custom_token = await run_in_threadpool(
+            auth.create_custom_token, firebase_user.uid
+        )
 
         return AuthResponse(
             message="User registered successfully",
@@ -92,15 +96,15 @@ async def register(user_data: UserCreate):
 async def login(user_data: UserLogin):
     """Login user and return authentication token"""
     try:
-        # Check if user exists
-        user = auth.get_user_by_email(user_data.email)
+        # Check if user exists (Admin SDK calls are blocking HTTP, run off-loop)
+        user = await run_in_threadpool(auth.get_user_by_email, user_data.email)
 
         # Note: Firebase Admin SDK can't verify passwords directly
         # In a production environment, we'd use Firebase client SDK
         # For this API, we'll generate a custom token for the existing user
 
         # Generate custom token for authentication
-        custom_token = auth.create_custom_token(user.uid)
+        custom_token = await run_in_threadpool(auth.create_custom_token, user.uid)
 
         # Get user profile from Firestore
         user_profile = await user_service.get_user_profile(user.uid)
@@ -0,0 +1,96 @@
+"""Router for budget endpoints"""
+
+from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends
+from models.budget import BudgetCreate, BudgetResponse, BudgetStatus, BudgetUpdate
+from services import budget_service
+from middleware.auth import get_current_user_id
+
+router = APIRouter(prefix="/budgets", tags=["Budgets"])
+
+
+@router.post("/", response_model=BudgetStatus, status_code=status.HTTP_201_CREATED)
+async def create_budget(
+    budget_data: BudgetCreate, current_user_id: str = Depends(get_current_user_id)
+):
+    """Create a budget for one category and period"""
+    try:
+        budget = await budget_service.create_budget(current_user_id, budget_data)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+    statuses = await budget_service.get_budget_statuses([budget])
+    return statuses[0]
+
+
+@router.get("/", response_model=List[BudgetStatus])
+async def get_budgets(current_user_id: str = Depends(get_current_user_id)):
+    """All budgets of the authenticated user with their current spending"""
+    budgets = await budget_service.get_user_budgets(current_user_id)
+    return await budget_service.get_budget_statuses(budgets)
+
+
+@router.get("/{budget_id}", response_model=BudgetStatus)
+async def get_budget(
+    budget_id: str, current_user_id: str = Depends(get_current_user_id)
+):
+    """Get a single budget with its current spending (must belong to authenticated user)"""
+    budget = await budget_service.get_budget(budget_id)
+
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Budget not found"
+        )
+
+    if budget.user_id != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this budget",
+        )
+
+    statuses = await budget_service.get_budget_statuses([budget])
+    return statuses[0]
+
+
+@router.put("/{budget_id}", response_model=BudgetResponse)
+async def update_budget(
+    budget_id: str,
+    budget_update: BudgetUpdate,
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """Change a budget's limit or alert threshold (must belong to authenticated user)"""
+    try:
+        budget = await budget_service.update_budget(
+            budget_id, budget_update, user_id=current_user_id
+        )
+    except PermissionError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        ) from exc
+
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Budget not found"
+        )
+
+    return budget
+
+
+@router.delete("/{budget_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_budget(
+    budget_id: str, current_user_id: str = Depends(get_current_user_id)
+):
+    """Delete a budget (must belong to authenticated user)"""
+    try:
+        deleted = await budget_service.delete_budget(budget_id, user_id=current_user_id)
+    except PermissionError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        ) from exc
+
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Budget not found"
+        )
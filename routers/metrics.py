@@ -0,0 +1,13 @@
+"""Prometheus scrape endpoint"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from utils.metrics import REGISTRY
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Request latency, storage call and cache metrics in the Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
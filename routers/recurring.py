@@ -0,0 +1,100 @@
+"""Router for recurring transaction rules"""
+
+from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends
+from models.recurring import (
+    RecurringRuleCreate,
+    RecurringRuleResponse,
+    RecurringRuleUpdate,
+)
+from services import recurring_service
+from middleware.auth import get_current_user_id
+
+router = APIRouter(prefix="/recurring", tags=["Recurring transactions"])
+
+
+@router.post(
+    "/", response_model=RecurringRuleResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_rule(
+    rule_data: RecurringRuleCreate,
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """Create a recurring rule; due occurrences are posted in the background"""
+    try:
+        return await recurring_service.create_rule(current_user_id, rule_data)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+
+@router.get("/", response_model=List[RecurringRuleResponse])
+async def get_rules(current_user_id: str = Depends(get_current_user_id)):
+    """All recurring rules of the authenticated user, next due first"""
+    return await recurring_service.get_user_rules(current_user_id)
+
+
+@router.get("/{rule_id}", response_model=RecurringRuleResponse)
+async def get_rule(rule_id: str, current_user_id: str = Depends(get_current_user_id)):
+    """Get a single recurring rule (must belong to authenticated user)"""
+    rule = await recurring_service.get_rule(rule_id)
+
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Recurring rule not found"
+        )
+
+    if rule.user_id != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this recurring rule",
+        )
+
+    return rule
+
+
+@router.put("/{rule_id}", response_model=RecurringRuleResponse)
+async def update_rule(
+    rule_id: str,
+    rule_update: RecurringRuleUpdate,
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """Change the template or end date of a rule (must belong to authenticated user)"""
+    try:
+        rule = await recurring_service.update_rule(
+            rule_id, rule_update, user_id=current_user_id
+        )
+    except PermissionError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        ) from exc
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Recurring rule not found"
+        )
+
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_rule(
+    rule_id: str, current_user_id: str = Depends(get_current_user_id)
+):
+    """Stop a recurring rule; transactions it already posted are kept"""
+    try:
+        deleted = await recurring_service.delete_rule(rule_id, user_id=current_user_id)
+    except PermissionError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        ) from exc
+
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Recurring rule not found"
+        )
@@ -1,57 +1,515 @@
 """Router for transaction-related endpoints"""
 
+import hashlib
+import json
 from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    status,
+    Depends,
+    Header,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from models.transaction import (
+    BalanceSeries,
+    BulkImportResult,
+    TransactionBatchRequest,
+    TransactionBatchResult,
     TransactionCreate,
     TransactionUpdate,
     TransactionResponse,
+    TransactionSearchResult,
+    TransactionSummary,
+    TransactionWriteResponse,
     Transaction,
 )
-from services import transaction_service
+from services import (
+    balance_service,
+    change_feed_service,
+    export_service,
+    fx_service,
+    import_service,
+    search_service,
+    summary_service,
+    transaction_service,
+    user_service,
+)
 from middleware.auth import get_current_user_id
+from config.settings import (
+    CACHE_REDIS_URL,
+    FAST_JSON_RESPONSES,
+    SINGLE_FLIGHT_TIMEOUT_SECONDS,
+)
+from utils import fast_json
+from utils.single_flight import create_single_flight
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_PAGE_TOKEN_HEADER = "X-Next-Page-Token"
+
+# Identical concurrent reads (same ETag) share one query and one encoded body
+read_coalescer = create_single_flight(
+    "single_flight", SINGLE_FLIGHT_TIMEOUT_SECONDS, CACHE_REDIS_URL
+)
+
+
+def _etag(version: int, *parts) -> str:
+    """Strong ETag from the user's change counter and what was requested"""
+    digest = hashlib.sha256(json.dumps(parts, default=str).encode("utf-8"))
+    return f'"{version}-{digest.hexdigest()[:16]}"'
+
+
+def _matches_etag(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already names this representation"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def encode_transactions(transactions: list, fast: bool) -> bytes:
+    """JSON body of a transaction list, as the list endpoint sends it
+
+    ``fast`` takes ``response_row`` dicts and encodes them with orjson;
+    otherwise response models go through FastAPI's encoder.
+    """
+    if fast:
+        return fast_json.dumps(transactions)
+    return JSONResponse(jsonable_encoder(transactions)).body
+
+
+def _split_categories(categories: Optional[List[str]]) -> Optional[List[str]]:
+    """Accept ``?category=a&category=b`` as well as ``?category=a,b``"""
+    if not categories:
+        return None
+    values = [
+        value.strip()
+        for category in categories
+        for value in category.split(",")
+        if value.strip()
+    ]
+    return list(dict.fromkeys(values)) or None
+
+
+def _check_amount_range(min_amount: Optional[float], max_amount: Optional[float]):
+    """Reject an empty amount range with 400"""
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_amount must not exceed max_amount",
+        )
+
 
 @router.post(
-    "/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED
+    "/", response_model=TransactionWriteResponse, status_code=status.HTTP_201_CREATED
 )
 async def create_transaction(
     transaction_data: TransactionCreate,
     current_user_id: str = Depends(get_current_user_id),
 ):
-    """Create a new transaction for the authenticated user"""
+    """Create a new transaction for the authenticated user
+
+    ``budget_alerts`` lists the budgets whose warning threshold or limit the
+    new expense crosses.
+    """
     # Create transaction with user_id from auth token
     transaction = Transaction(user_id=current_user_id, **transaction_data.dict())
 
-    return await transaction_service.create_transaction(transaction)
+    try:
+        return await transaction_service.create_transaction(transaction)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_create_transactions(
+    request: Request,
+    current_user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None, max_length=200),
+):
+    """Import many transactions from a JSON array, NDJSON or CSV body
+
+    Rows are validated and written in batches; invalid rows are reported
+    individually without aborting the import. Send an ``Idempotency-Key``
+    header to make retries of the same upload safe.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type == "application/json":
+        try:
+            payload = await request.json()
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body"
+            ) from exc
+        if not isinstance(payload, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array of transactions",
+            )
+        rows = import_service.iter_json_rows(payload)
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        rows = import_service.iter_ndjson_rows(
+            import_service.iter_lines(request.stream())
+        )
+    elif content_type == "text/csv":
+        rows = import_service.iter_csv_rows(import_service.iter_lines(request.stream()))
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use application/json, application/x-ndjson or text/csv",
+        )
+
+    return await import_service.import_transactions(
+        current_user_id, rows, idempotency_key=idempotency_key
+    )
+
+
+@router.post("/batch", response_model=TransactionBatchResult)
+async def batch_modify_transactions(
+    batch_request: TransactionBatchRequest,
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """Delete or update many transactions, chosen by ``ids`` or by ``filter``
+
+    For example ``{"action": "update", "filter": {"category": ["Groceries"]},
+    "update": {"category": "Food"}}`` recategorizes every matching
+    transaction. IDs that do not exist or belong to another user are reported
+    in ``not_found`` and ``forbidden`` and left untouched.
+    """
+    try:
+        return await transaction_service.batch_modify_transactions(
+            current_user_id,
+            batch_request.action,
+            ids=batch_request.ids,
+            transaction_filter=batch_request.filter,
+            transaction_update=batch_request.update,
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
 
 
 @router.get("/", response_model=List[TransactionResponse])
 async def get_transactions(
+    request: Request,
+    response: Response,
+    current_user_id: str = Depends(get_current_user_id),
+    transaction_type: Optional[str] = Query(None, regex="^(income|expense)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    category: Optional[List[str]] = Query(
+        None, description="One or more categories (repeat or comma-separate)"
+    ),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    sort: str = Query("date", regex="^(date|amount)$"),
+    order: str = Query("desc", regex="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    page_token: Optional[str] = Query(None),
+    stream: bool = Query(False, description="Stream results as NDJSON"),
+):
+    """Get all transactions for the authenticated user with optional filters
+
+    With ``limit`` the response is a single page and the ``X-Next-Page-Token``
+    header carries the token for the following page. With ``stream=true`` the
+    documents are sent as NDJSON as they arrive from Firestore. Several
+    categories are matched with a single ``in`` query.
+
+    Responses carry an ETag derived from the user's change counter; a matching
+    ``If-None-Match`` is answered with 304 without querying transactions.
+
+    With FAST_JSON_RESPONSES (and orjson installed) rows are built straight
+    from the documents and encoded with orjson, skipping response validation.
+
+    ``converted_amount`` is each amount in the user's reporting currency at
+    the rate of its date, empty when the rate table has no rate for it.
+
+    Concurrent requests for the same ETag share one query and encoded body.
+    """
+    filters = {
+        "transaction_type": transaction_type,
+        "start_date": start_date,
+        "end_date": end_date,
+        "category": _split_categories(category),
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "sort": sort,
+        "descending": order == "desc",
+    }
+
+    # A malformed request is a 400 even when its ETag would match
+    _check_amount_range(min_amount, max_amount)
+    if page_token:
+        try:
+            transaction_service.decode_page_token(page_token, sort)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+            ) from exc
+
+    # Read the counter before the data so a concurrent write can only make the
+    # ETag older than the body, never newer
+    version = await transaction_service.get_change_version(current_user_id)
+    reporting_currency = await user_service.get_reporting_currency(current_user_id)
+    etag = _etag(
+        version,
+        current_user_id,
+        filters,
+        limit,
+        page_token,
+        stream,
+        reporting_currency,
+        fx_service.rates_version(),
+    )
+    if _matches_etag(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+
+    fast = FAST_JSON_RESPONSES and fast_json.available()
+
+    async def load() -> bytes:
+        """The next page token, a newline, then the encoded transactions"""
+        if limit is None and page_token is None:
+            transactions = await transaction_service.get_user_transactions(
+                user_id=current_user_id, rows=fast, **filters
+            )
+            next_page_token = None
+        else:
+            transactions, next_page_token = (
+                await transaction_service.get_user_transactions_page(
+                    current_user_id,
+                    limit=limit or DEFAULT_PAGE_SIZE,
+                    page_token=page_token,
+                    rows=fast,
+                    **filters,
+                )
+            )
+
+        transaction_service.with_converted_amounts(transactions, reporting_currency)
+        body = encode_transactions(transactions, fast)
+        return (next_page_token or "").encode("ascii") + b"\n" + body
+
+    try:
+        if stream:
+            transactions = transaction_service.iter_user_transactions(
+                current_user_id,
+                page_token=page_token,
+                limit=limit,
+                rows=fast,
+                **filters,
+            )
+            transactions = transaction_service.iter_with_converted_amounts(
+                transactions, reporting_currency
+            )
+            lines = (
+                (fast_json.dumps(row) + b"\n" async for row in transactions)
+                if fast
+                else (transaction.json() + "\n" async for transaction in transactions)
+            )
+            return StreamingResponse(
+                lines, media_type="application/x-ndjson", headers={"ETag": etag}
+            )
+
+        result = await read_coalescer.do(f"list:{etag}", load)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+    next_page_token, _, body = result.partition(b"\n")
+    if next_page_token:
+        response.headers[NEXT_PAGE_TOKEN_HEADER] = next_page_token.decode("ascii")
+
+    # Returned as is, so FastAPI neither re-validates it nor copies ``response``
+    return Response(body, media_type="application/json", headers=response.headers)
+
+
+@router.get("/export")
+async def export_transactions(
     current_user_id: str = Depends(get_current_user_id),
+    export_format: str = Query("csv", alias="format", regex="^(csv|ndjson|parquet)$"),
     transaction_type: Optional[str] = Query(None, regex="^(income|expense)$"),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    category: Optional[str] = Query(None),
+    category: Optional[List[str]] = Query(
+        None, description="One or more categories (repeat or comma-separate)"
+    ),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
 ):
-    """Get all transactions for the authenticated user with optional filters"""
-    return await transaction_service.get_user_transactions(
-        user_id=current_user_id,
+    """Stream the user's transactions as CSV, NDJSON or Parquet
+
+    Firestore is paged with cursors and each page is encoded as soon as it
+    arrives, so memory per export stays constant regardless of history size.
+    Filters are the same as for the transaction list.
+    """
+    if export_format == "parquet" and not export_service.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires the pyarrow package",
+        )
+    _check_amount_range(min_amount, max_amount)
+
+    pages = transaction_service.iter_user_transaction_pages(
+        current_user_id,
+        page_size=export_service.EXPORT_PAGE_SIZE,
         transaction_type=transaction_type,
         start_date=start_date,
         end_date=end_date,
-        category=category,
+        category=_split_categories(category),
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+
+    return StreamingResponse(
+        export_service.ENCODERS[export_format](pages),
+        media_type=export_service.MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{export_format}"'
+        },
+    )
+
+
+@router.get("/summary", response_model=TransactionSummary)
+async def get_transaction_summary(
+    current_user_id: str = Depends(get_current_user_id),
+    period: Optional[str] = Query(None, regex="^(day|week|month)$"),
+    group_by_category: bool = Query(False),
+    transaction_type: Optional[str] = Query(None, regex="^(income|expense)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    category: Optional[List[str]] = Query(
+        None, description="One or more categories (repeat or comma-separate)"
+    ),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+):
+    """Get income/expense totals grouped by period, type and optionally category
+
+    Filters are the same as for the transaction list. Concurrent identical
+    requests share one computation.
+    """
+    _check_amount_range(min_amount, max_amount)
+    params = {
+        "period": period,
+        "group_by_category": group_by_category,
+        "transaction_type": transaction_type,
+        "start_date": start_date,
+        "end_date": end_date,
+        "category": _split_categories(category),
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+    }
+
+    async def load() -> bytes:
+        summary = await summary_service.get_transaction_summary(
+            user_id=current_user_id, **params
+        )
+        return JSONResponse(jsonable_encoder(summary)).body
+
+    version = await transaction_service.get_change_version(current_user_id)
+    key = _etag(
+        version,
+        current_user_id,
+        params,
+        await user_service.get_reporting_currency(current_user_id),
+        fx_service.rates_version(),
+    )
+    try:
+        body = await read_coalescer.do(f"summary:{key}", load)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+    return Response(body, media_type="application/json")
+
+
+@router.get("/balance-series", response_model=BalanceSeries)
+async def get_balance_series(
+    current_user_id: str = Depends(get_current_user_id),
+    interval: str = Query("day", regex="^(day|month)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+):
+    """Running balance at the end of each day or month of the range"""
+    try:
+        return await balance_service.get_balance_series(
+            current_user_id, interval, start_date, end_date
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+
+
+@router.get("/stream")
+async def stream_transaction_changes(
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """Server-Sent Events with the user's transaction changes from any device
+
+    Wait for ``ready``, load ``GET /transactions/``, then apply ``added``,
+    ``modified`` and ``removed`` events; re-load the list on ``reset``.
+    Transactions carry ``converted_amount`` as in the list.
+    """
+    feed = change_feed_service.change_feed
+    if feed.is_full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open change streams, retry later",
+        )
+
+    reporting_currency = await user_service.get_reporting_currency(current_user_id)
+    return StreamingResponse(
+        feed.stream(current_user_id, reporting_currency),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@router.get("/search", response_model=List[TransactionSearchResult])
+async def search_transactions(
+    current_user_id: str = Depends(get_current_user_id),
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Search descriptions and categories; words match by prefix
+
+    Every word must match. Results are ranked by relevance, then recency.
+    """
+    results = await search_service.search_transactions(current_user_id, q, limit)
+    reporting_currency = await user_service.get_reporting_currency(current_user_id)
+    return transaction_service.with_converted_amounts(results, reporting_currency)
+
+
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
-    transaction_id: str, current_user_id: str = Depends(get_current_user_id)
+    transaction_id: str,
+    request: Request,
+    response: Response,
+    current_user_id: str = Depends(get_current_user_id),
 ):
     """Get a single transaction by ID (must belong to authenticated user)"""
+    # Read before the document, so the ETag never claims a newer version
+    version = await transaction_service.get_change_version(current_user_id)
     transaction = await transaction_service.get_transaction(transaction_id)
 
     if not transaction:
@@ -66,33 +524,52 @@ async def get_transaction(
             detail="Not authorized to access this transaction",
         )
 
-    return transaction
+    # Any change to the user's transactions bumps the counter, so an ETag the
+    # client got for this ID at the current version is still valid
+    reporting_currency = await user_service.get_reporting_currency(current_user_id)
+    etag = _etag(
+        version,
+        current_user_id,
+        transaction_id,
+        reporting_currency,
+        fx_service.rates_version(),
+    )
+    if _matches_etag(request, etag):
+        return _not_modified(etag)
 
+    response.headers["ETag"] = etag
+    return transaction_service.with_converted_amounts(
+        [transaction], reporting_currency
+    )[0]
 
-@router.put("/{transaction_id}", response_model=TransactionResponse)
+
+@router.put("/{transaction_id}", response_model=TransactionWriteResponse)
 async def update_transaction(
     transaction_id: str,
     transaction_update: TransactionUpdate,
     current_user_id: str = Depends(get_current_user_id),
 ):
     """Update a transaction (must belong to authenticated user)"""
-    # First check if transaction exists and belongs to user
-    existing_transaction = await transaction_service.get_transaction(transaction_id)
-
-    if not existing_transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
+    # Existence and ownership are checked inside the update transaction
+    try:
+        transaction = await transaction_service.update_transaction(
+            transaction_id, transaction_update, user_id=current_user_id
         )
+    except PermissionError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        ) from exc
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
 
-    if existing_transaction.user_id != current_user_id:
+    if not transaction:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this transaction",
+            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
         )
 
-    return await transaction_service.update_transaction(
-        transaction_id, transaction_update
-    )
+    return transaction
 
 
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -100,19 +577,23 @@ async def delete_transaction(
     transaction_id: str, current_user_id: str = Depends(get_current_user_id)
 ):
     """Delete a transaction (must belong to authenticated user)"""
-    # First check if transaction exists and belongs to user
-    existing_transaction = await transaction_service.get_transaction(transaction_id)
-
-    if not existing_transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
+    # Existence and ownership are checked inside the delete transaction
+    try:
+        deleted = await transaction_service.delete_transaction(
+            transaction_id, user_id=current_user_id
         )
+    except PermissionError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        ) from exc
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
 
-    if existing_transaction.user_id != current_user_id:
+    if not deleted:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this transaction",
+            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
         )
 
-    await transaction_service.delete_transaction(transaction_id)
     return None
@@ -0,0 +1,39 @@
+"""
+Write the Firestore composite indexes the transaction query planner relies on
+
+Usage:
+    python -m scripts.generate_indexes [path]          (default firestore.indexes.json)
+    python -m scripts.generate_indexes --check [path]  (exit 1 when out of date)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from services import query_planner
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "firestore.indexes.json"
+
+
+def render() -> str:
+    """Index file content as deployed by ``firebase deploy --only firestore:indexes``"""
+    return json.dumps(query_planner.index_definitions(), indent=2) + "\n"
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    check = "--check" in args
+    paths = [arg for arg in args if arg != "--check"]
+    target = Path(paths[0]) if paths else DEFAULT_PATH
+
+    content = render()
+    if check:
+        if not target.exists() or target.read_text() != content:
+            print(f"{target} is out of date; run python -m scripts.generate_indexes")
+            sys.exit(1)
+        print(f"{target} is up to date")
+    else:
+        target.write_text(content)
+        print(
+            f"Wrote {len(query_planner.index_definitions()['indexes'])} indexes to {target}"
+        )
@@ -0,0 +1,47 @@
+"""
+Recompute materialized monthly rollups from the transactions collection
+
+Also records the currency of every transaction, so users whose documents
+predate currencies can use the single-currency summary paths again.
+
+Usage:
+    python -m scripts.rebuild_rollups <user_id> [<user_id> ...]
+    python -m scripts.rebuild_rollups --all
+"""
+
+import asyncio
+import sys
+
+from services import (
+    balance_service,
+    rollup_service,
+    transaction_service,
+    user_service,
+)
+
+
+async def rebuild(user_ids: list) -> None:
+    """Rebuild rollups for the given users (every profile when empty)"""
+    if not user_ids:
+        user_ids = [
+            doc.id async for doc in user_service.users_collection.select([]).stream()
+        ]
+
+    for user_id in user_ids:
+        months = await rollup_service.rebuild_user_rollups(user_id)
+        # Balance checkpoints are prefix sums of the rollups
+        await balance_service.reset_checkpoints(user_id)
+        currencies = await transaction_service.rebuild_user_currencies(user_id)
+        print(
+            f"{user_id}: rebuilt {months} month(s), "
+            f"currencies: {', '.join(sorted(currencies)) or 'none'}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    targets = [] if sys.argv[1] == "--all" else sys.argv[1:]
+    asyncio.run(rebuild(targets))
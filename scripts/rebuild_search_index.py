@@ -0,0 +1,33 @@
+"""
+Recompute the search terms of existing transactions
+
+Usage:
+    python -m scripts.rebuild_search_index <user_id> [<user_id> ...]
+    python -m scripts.rebuild_search_index --all
+"""
+
+import asyncio
+import sys
+
+from services import search_service, user_service
+
+
+async def rebuild(user_ids: list) -> None:
+    """Rebuild search terms for the given users (every profile when empty)"""
+    if not user_ids:
+        user_ids = [
+            doc.id async for doc in user_service.users_collection.select([]).stream()
+        ]
+
+    for user_id in user_ids:
+        count = await search_service.rebuild_user_search_terms(user_id)
+        print(f"{user_id}: indexed {count} transaction(s)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    targets = [] if sys.argv[1] == "--all" else sys.argv[1:]
+    asyncio.run(rebuild(targets))
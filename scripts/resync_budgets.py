@@ -0,0 +1,36 @@
+"""
+Recount budget spending counters from the transactions collection
+
+The API re-syncs the current and previous period of every budget on a timer
+(BUDGET_RESYNC_INTERVAL_SECONDS); this runs the same repair on demand.
+
+Usage:
+    python -m scripts.resync_budgets [--periods N] <user_id> [<user_id> ...]
+    python -m scripts.resync_budgets [--periods N] --all
+"""
+
+import asyncio
+import sys
+
+from services import budget_service
+
+
+async def resync(user_ids: list, periods: int) -> None:
+    """Re-sync the budgets of the given users (every budget when empty)"""
+    synced = await budget_service.resync_budgets(user_ids or None, periods)
+    print(f"re-synced {synced} budget(s)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    periods = budget_service.RESYNC_PERIODS
+    if args[:1] == ["--periods"] and len(args) > 1:
+        periods = int(args[1])
+        args = args[2:]
+
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    targets = [] if args[0] == "--all" else args
+    asyncio.run(resync(targets, periods))
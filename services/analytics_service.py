@@ -0,0 +1,513 @@
+"""Vectorized spending analytics over a user's transactions
+
+A user's history is read once through the transaction query path into
+parallel NumPy arrays (amount, timestamp, epoch day, category code, type) and
+cached in-process under the user's change counter, so later requests reuse
+the arrays until the user writes again. Every metric is then a handful of
+array operations (masks, ``bincount``, ``argsort``) instead of a Python loop
+over the rows. Amounts are converted to the user's reporting currency in one
+pass over the rate table, cached on the columns per currency.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple, Union
+import numpy as np
+from config.settings import (
+    ANALYTICS_CACHE_SIZE,
+    ANALYTICS_CACHE_TTL_SECONDS,
+    DEFAULT_CURRENCY,
+)
+from models.analytics import (
+    AnomalyReport,
+    CategoryBreakdown,
+    CategoryShare,
+    SpendingAnomaly,
+    SpendingTrends,
+    TrendPoint,
+)
+from models.transaction import SummaryBucket
+from services import fx_service, summary_service, transaction_service, user_service
+from utils import money
+from utils.cache import TTLCache
+from utils.metrics import REGISTRY
+
+COLUMN_FIELDS = ("type", "amount", "category", "date", "currency")
+
+SECONDS_PER_DAY = 86400
+
+# Epoch day 0 (1970-01-01) is a Thursday; shifting by 3 starts weeks on Monday
+_WEEK_OFFSET = 3
+
+MAX_TREND_PERIODS = 1000
+
+# (change version, columns) per user; arrays cannot be shared through Redis
+column_cache = TTLCache(maxsize=ANALYTICS_CACHE_SIZE, ttl=ANALYTICS_CACHE_TTL_SECONDS)
+REGISTRY.register_cache("analytics_columns", column_cache.stats)
+
+
+class TransactionColumns:
+    """A user's transactions as parallel arrays, one entry per transaction"""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        amounts: np.ndarray,
+        timestamps: np.ndarray,
+        category_codes: np.ndarray,
+        expense: np.ndarray,
+        categories: List[str],
+        currency_codes: Optional[np.ndarray] = None,
+        currencies: Optional[List[str]] = None,
+    ):
+        self.ids = ids
+        self.amounts = amounts
+        self.timestamps = timestamps
+        self.days = (timestamps // SECONDS_PER_DAY).astype(np.int32)
+        # Calendar months are the slowest period to derive; do it once per load
+        self.months = _period_index(self.days, "month").astype(np.int32)
+        self.category_codes = category_codes
+        self.expense = expense
+        self.categories = categories
+        if currency_codes is None:
+            currency_codes = np.zeros(len(amounts), dtype=np.int32)
+        self.currency_codes = currency_codes
+        self.currencies = currencies or [DEFAULT_CURRENCY]
+        # (target, rates version) -> columns with converted amounts
+        self._converted = {}
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def converted(self, target: str) -> "TransactionColumns":
+        """The same transactions with amounts in ``target``
+
+        Raises ValueError when the rate table lacks a rate for some of them.
+        """
+        if self.currencies == [target]:
+            return self
+
+        key = (target, fx_service.rates_version())
+        columns = self._converted.get(key)
+        if columns is None:
+            amounts = fx_service.get_rate_table().convert(
+                self.amounts, self.currency_codes, self.currencies, self.days, target
+            )
+            missing = np.isnan(amounts)
+            if missing.any():
+                codes = np.unique(self.currency_codes[missing]).tolist()
+                raise ValueError(
+                    f"No exchange rate to {target} for "
+                    + ", ".join(sorted({self.currencies[code] for code in codes}))
+                    + " on some transaction dates"
+                )
+            # Rounded like each row's converted_amount in transaction lists
+            amounts = np.round(amounts, money.exponent(target))
+            columns = object.__new__(TransactionColumns)
+            columns.__dict__.update(self.__dict__, amounts=amounts, _converted={})
+            columns.currency_codes = np.zeros(len(amounts), dtype=np.int32)
+            columns.currencies = [target]
+            self._converted = {key: columns}
+        return columns
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[str, dict]]) -> "TransactionColumns":
+        """Build the arrays from (document id, transaction data) pairs"""
+        codes, currency_names = {}, {}
+        ids, amounts, timestamps, category_codes, expense = [], [], [], [], []
+        currency_codes = []
+        for doc_id, data in rows:
+            date = data["date"]
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=timezone.utc)
+            ids.append(doc_id.encode("utf-8"))
+            amounts.append(data["amount"])
+            timestamps.append(date.timestamp())
+            category_codes.append(codes.setdefault(data["category"], len(codes)))
+            expense.append(data["type"] == "expense")
+            currency_codes.append(
+                currency_names.setdefault(money.currency_of(data), len(currency_names))
+            )
+
+        return cls(
+            ids=np.array(ids, dtype=bytes),
+            amounts=np.array(amounts, dtype=np.float64),
+            timestamps=np.array(timestamps, dtype=np.float64).astype(np.int64),
+            category_codes=np.array(category_codes, dtype=np.int32),
+            expense=np.array(expense, dtype=bool),
+            categories=list(codes),
+            currency_codes=np.array(currency_codes, dtype=np.int32),
+            currencies=list(currency_names),
+        )
+
+
+async def _read_columns(user_id: str) -> TransactionColumns:
+    plan = transaction_service.plan_user_query(user_id)
+    query = transaction_service.build_filtered_query(plan).select(list(COLUMN_FIELDS))
+    rows = [(doc.id, doc.to_dict()) async for doc in query.stream()]
+    return TransactionColumns.from_rows(rows)
+
+
+async def load_columns(user_id: str) -> TransactionColumns:
+    """A user's transactions as arrays, from cache unless they changed since"""
+    # Read the version first: a write racing the load only causes a reload
+    version = await transaction_service.get_change_version(user_id)
+    cached = column_cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    columns = await _read_columns(user_id)
+    column_cache.set(user_id, (version, columns))
+    return columns
+
+
+async def load_converted_columns(user_id: str) -> TransactionColumns:
+    """load_columns with amounts in the user's reporting currency"""
+    columns = await load_columns(user_id)
+    return columns.converted(await user_service.get_reporting_currency(user_id))
+
+
+def _epoch_seconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def date_mask(
+    columns: TransactionColumns,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> np.ndarray:
+    """Which transactions fall inside the inclusive date range"""
+    mask = np.ones(len(columns), dtype=bool)
+    if start_date is not None:
+        mask &= columns.timestamps >= _epoch_seconds(start_date)
+    if end_date is not None:
+        mask &= columns.timestamps <= _epoch_seconds(end_date)
+    return mask
+
+
+def _period_index(days: np.ndarray, interval: str) -> np.ndarray:
+    """Months since 1970-01 or Monday-based weeks since 1969-12-29"""
+    if interval == "week":
+        return (days.astype(np.int64) + _WEEK_OFFSET) // 7
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _period_labels(first: int, count: int, interval: str) -> List[str]:
+    """Same labels as the summary endpoint (2024-05, 2024-W18)"""
+    if interval == "week":
+        starts = (np.arange(first, first + count) * 7 - _WEEK_OFFSET).astype(
+            "datetime64[D]"
+        )
+        return [summary_service.period_key(start.item(), "week") for start in starts]
+    months = np.arange(first, first + count).astype("datetime64[M]")
+    return np.datetime_as_string(months, unit="M").tolist()
+
+
+def _changes(values: np.ndarray) -> List[Optional[float]]:
+    """Difference from the previous period, None for the first one"""
+    return [None] + np.diff(values).tolist()
+
+
+def compute_trends(
+    columns: TransactionColumns,
+    mask: np.ndarray,
+    interval: str = "month",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> SpendingTrends:
+    """Income, expenses and net per period, with period-over-period deltas
+
+    Periods without transactions are included as zeros so deltas always
+    compare consecutive periods.
+    """
+    if interval == "month":
+        periods = columns.months[mask].astype(np.int64)
+    else:
+        periods = _period_index(columns.days[mask], interval)
+    bounds = []
+    if start_date is not None:
+        bounds.append(_epoch_seconds(start_date) // SECONDS_PER_DAY)
+    if end_date is not None:
+        bounds.append(_epoch_seconds(end_date) // SECONDS_PER_DAY)
+    limits = np.concatenate(
+        [periods, _period_index(np.array(bounds, dtype=np.int64), interval)]
+    )
+    if not len(limits):
+        return SpendingTrends(interval=interval, points=[])
+
+    first = int(limits.min())
+    count = int(limits.max()) - first + 1
+    if count > MAX_TREND_PERIODS:
+        raise ValueError(
+            f"Range too long: at most {MAX_TREND_PERIODS} {interval}s per trend"
+        )
+
+    # Slot 2p holds the income of period p, slot 2p + 1 its expenses
+    slots = (periods - first) * 2 + columns.expense[mask]
+    totals = np.bincount(slots, weights=columns.amounts[mask], minlength=2 * count)
+    income, expense = totals.reshape(count, 2).T
+    net = income - expense
+
+    previous = expense[:-1]
+    expense_pct = np.divide(
+        np.diff(expense) * 100,
+        previous,
+        out=np.full(len(previous), np.nan),
+        where=previous != 0,
+    )
+
+    points = []
+    rows = zip(
+        _period_labels(first, count, interval),
+        income.tolist(),
+        expense.tolist(),
+        net.tolist(),
+        _changes(income),
+        _changes(expense),
+        _changes(net),
+        [None] + [None if np.isnan(pct) else pct for pct in expense_pct.tolist()],
+    )
+    for label, inc, exp, net_total, inc_delta, exp_delta, net_delta, pct in rows:
+        points.append(
+            TrendPoint(
+                period=label,
+                income=inc,
+                expense=exp,
+                net=net_total,
+                income_change=inc_delta,
+                expense_change=exp_delta,
+                net_change=net_delta,
+                expense_change_pct=None if pct is None else round(pct, 2),
+            )
+        )
+    return SpendingTrends(interval=interval, points=points)
+
+
+def compute_category_breakdown(
+    columns: TransactionColumns, mask: np.ndarray, transaction_type: str = "expense"
+) -> CategoryBreakdown:
+    """Total, count, average and percentage per category, largest first"""
+    selected = mask & (columns.expense == (transaction_type == "expense"))
+    codes = columns.category_codes[selected]
+    size = len(columns.categories)
+    totals = np.bincount(codes, weights=columns.amounts[selected], minlength=size)
+    counts = np.bincount(codes, minlength=size)
+    grand_total = float(totals.sum())
+
+    order = np.argsort(-totals, kind="stable")
+    order = order[counts[order] > 0]
+    shares = [
+        CategoryShare(
+            category=columns.categories[code],
+            total=total,
+            count=count,
+            average=total / count,
+            percentage=round(total / grand_total * 100, 2) if grand_total else 0.0,
+        )
+        for code, total, count in zip(
+            order.tolist(), totals[order].tolist(), counts[order].tolist()
+        )
+    ]
+    return CategoryBreakdown(
+        type=transaction_type, total=grand_total, categories=shares
+    )
+
+
+def find_anomalies(
+    columns: TransactionColumns,
+    mask: np.ndarray,
+    threshold: float = 3.0,
+    min_samples: int = 5,
+    limit: int = 50,
+) -> AnomalyReport:
+    """Expenses more than ``threshold`` standard deviations above their mean
+
+    The mean and standard deviation of each category come from the user's
+    whole expense history; only expenses inside ``mask`` are reported.
+    Categories with fewer than ``min_samples`` expenses have no baseline.
+    """
+    expense = columns.expense
+    codes = columns.category_codes[expense]
+    amounts = columns.amounts[expense]
+    size = len(columns.categories)
+
+    counts = np.bincount(codes, minlength=size)
+    safe_counts = np.maximum(counts, 1)
+    means = np.bincount(codes, weights=amounts, minlength=size) / safe_counts
+    deviations = amounts - means[codes]
+    stds = np.sqrt(
+        np.bincount(codes, weights=deviations**2, minlength=size) / safe_counts
+    )
+
+    usable = (counts >= min_samples) & (stds > 0)
+    z_scores = np.divide(
+        deviations,
+        stds[codes],
+        out=np.zeros(len(deviations)),
+        where=usable[codes],
+    )
+    flagged = np.flatnonzero(mask[expense] & (z_scores > threshold))
+    flagged = flagged[np.argsort(-z_scores[flagged], kind="stable")[:limit]]
+
+    positions = np.flatnonzero(expense)[flagged]
+    anomalies = [
+        SpendingAnomaly(
+            id=doc_id.decode("utf-8"),
+            category=columns.categories[code],
+            amount=amount,
+            date=datetime.fromtimestamp(timestamp, timezone.utc),
+            category_mean=round(means[code], 2),
+            category_std=round(stds[code], 2),
+            z_score=round(z_score, 2),
+        )
+        for doc_id, code, amount, timestamp, z_score in zip(
+            columns.ids[positions].tolist(),
+            codes[flagged].tolist(),
+            amounts[flagged].tolist(),
+            columns.timestamps[positions].tolist(),
+            z_scores[flagged].tolist(),
+        )
+    ]
+    return AnomalyReport(threshold=threshold, anomalies=anomalies)
+
+
+async def get_spending_trends(
+    user_id: str,
+    interval: str = "month",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> SpendingTrends:
+    """Income and expenses per week or month with their changes"""
+    columns = await load_converted_columns(user_id)
+    mask = date_mask(columns, start_date, end_date)
+    return compute_trends(columns, mask, interval, start_date, end_date)
+
+
+async def get_category_breakdown(
+    user_id: str,
+    transaction_type: str = "expense",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> CategoryBreakdown:
+    """Share of each category in the user's income or expenses"""
+    columns = await load_converted_columns(user_id)
+    mask = date_mask(columns, start_date, end_date)
+    return compute_category_breakdown(columns, mask, transaction_type)
+
+
+async def get_spending_anomalies(
+    user_id: str,
+    threshold: float = 3.0,
+    min_samples: int = 5,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 50,
+) -> AnomalyReport:
+    """Unusually large expenses, most unusual first"""
+    columns = await load_converted_columns(user_id)
+    mask = date_mask(columns, start_date, end_date)
+    return find_anomalies(columns, mask, threshold, min_samples, limit)
+
+
+def _period_keys(columns: TransactionColumns, period: Optional[str]) -> np.ndarray:
+    """Index of each transaction's summary period (days, weeks or months)"""
+    if period == "month":
+        return columns.months.astype(np.int64)
+    if period == "week":
+        return _period_index(columns.days, "week")
+    if period == "day":
+        return columns.days.astype(np.int64)
+    return np.zeros(len(columns), dtype=np.int64)
+
+
+def _period_label(index: int, period: Optional[str]) -> Optional[str]:
+    if period == "month":
+        return np.datetime_as_string(np.datetime64(index, "M"), unit="M")
+    if period == "week":
+        return _period_labels(index, 1, "week")[0]
+    if period == "day":
+        return np.datetime_as_string(np.datetime64(index, "D"), unit="D")
+    return None
+
+
+def summarize_columns(
+    columns: TransactionColumns,
+    mask: np.ndarray,
+    currency: str,
+    period: Optional[str],
+    group_by_category: bool,
+    category: Optional[str],
+) -> List[SummaryBucket]:
+    """Summary buckets of the masked transactions, summed in minor units"""
+    periods = _period_keys(columns, period)[mask]
+    expense = columns.expense[mask].astype(np.int64)
+    codes = columns.category_codes[mask].astype(np.int64)
+    if not group_by_category:
+        codes = np.zeros(len(codes), dtype=np.int64)
+    minor = np.rint(columns.amounts[mask] * 10 ** money.exponent(currency))
+
+    groups, inverse = np.unique(
+        np.stack([periods, expense, codes], axis=1), axis=0, return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+    totals = np.bincount(inverse, weights=minor, minlength=len(groups))
+    counts = np.bincount(inverse, minlength=len(groups))
+
+    buckets = [
+        SummaryBucket(
+            period=_period_label(group_period, period),
+            type="expense" if group_expense else "income",
+            category=columns.categories[code] if group_by_category else category,
+            total=money.from_minor_units(int(total), currency),
+            count=count,
+        )
+        for (group_period, group_expense, code), total, count in zip(
+            groups.tolist(), totals.tolist(), counts.tolist()
+        )
+    ]
+    # Same order as the other summary paths
+    buckets.sort(key=lambda b: (b.period or "", b.type, b.category or ""))
+    return buckets
+
+
+async def summarize_converted(
+    user_id: str,
+    currency: str,
+    period: Optional[str],
+    group_by_category: bool,
+    transaction_type: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    category: Optional[Union[str, List[str]]],
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> List[SummaryBucket]:
+    """Summary buckets of transactions in several currencies, in ``currency``
+
+    The amount range applies to amounts as recorded, as in transaction lists.
+    """
+    recorded = await load_columns(user_id)
+    mask = date_mask(recorded, start_date, end_date)
+    if transaction_type:
+        mask &= recorded.expense == (transaction_type == "expense")
+    if category:
+        wanted = [category] if isinstance(category, str) else category
+        codes = [
+            recorded.categories.index(name)
+            for name in wanted
+            if name in recorded.categories
+        ]
+        mask &= np.isin(recorded.category_codes, codes)
+    if min_amount is not None:
+        mask &= recorded.amounts >= min_amount
+    if max_amount is not None:
+        mask &= recorded.amounts <= max_amount
+    return summarize_columns(
+        recorded.converted(currency),
+        mask,
+        currency,
+        period,
+        group_by_category,
+        summary_service.category_label(category),
+    )
@@ -0,0 +1,481 @@
+"""Running balance series backed by monthly balance checkpoints
+
+``balance_checkpoints/{user_id}/months/{yyyy-mm}`` holds the closing balance
+of every month with transactions, i.e. the prefix sum of the monthly rollups,
+in integer minor units so no float error carries from month to month.
+Checkpoints are computed lazily. Each write widens a stale range of months on
+the user's change-counter document to the months whose balance it changes:
+from its month on for a new, deleted or re-priced transaction, only the
+months in between when a transaction moves to another month. Only that range
+is recomputed, from the rollups, when a series next needs it. A series is
+then answered from the checkpoint before its range plus aggregation queries
+or a stream over the range itself.
+
+Checkpoints, rollups and aggregations add amounts as recorded, so they only
+serve users whose transactions are all in their reporting currency. Series
+of other users are summed from the cached analytics columns, every amount
+converted at the rate of its date.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from google.cloud.firestore import DELETE_FIELD
+from storage import db, MAX_BATCH_WRITES
+from models.transaction import BalancePoint, BalanceSeries
+from services import (
+    analytics_service,
+    rollup_service,
+    summary_service,
+    transaction_service,
+    user_service,
+)
+from utils import money
+
+checkpoints_collection = db.collection("balance_checkpoints")
+
+# Watermark value meaning every stored checkpoint is current
+ALL_CURRENT = 999999
+# Set once checkpoints were computed from scratch (legacy users start without)
+BALANCE_VALID_FIELD = "balance_checkpoints_valid"
+
+MAX_SERIES_POINTS = 1000
+
+
+def months_collection(user_id: str):
+    """Collection holding one checkpoint document per month for a user"""
+    return checkpoints_collection.document(user_id).collection("months")
+
+
+def _month_from_number(number: int) -> str:
+    return f"{number // 100:04d}-{number % 100:02d}"
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Naive datetimes are UTC, like everywhere else in the API"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _to_minor(amount: float, currency: str) -> int:
+    """A float total in minor units, rounded to the currency's minor unit"""
+    return money.to_minor_units(money.round_amount(amount, currency), currency)
+
+
+def _rollup_net(rollup: dict, currency: str, minor_units: bool) -> int:
+    """Income minus expenses of a month rollup in minor units
+
+    Rollups built before ``total_minor`` existed only have float totals.
+    """
+    totals = rollup.get("totals", {})
+    net = 0
+    for transaction_type, sign in (("income", 1), ("expense", -1)):
+        entry = totals.get(transaction_type, {})
+        if minor_units:
+            net += sign * entry.get("total_minor", 0)
+        else:
+            net += sign * _to_minor(entry.get("total", 0), currency)
+    return net
+
+
+def _checkpoint_balance(data: dict, currency: str) -> int:
+    """Closing balance of a checkpoint in minor units (older ones hold floats)"""
+    if "balance_minor" in data:
+        return data["balance_minor"]
+    return _to_minor(data["balance"], currency)
+
+
+async def _read_watermark(user_id: str) -> Tuple[int, str, str]:
+    """(change version, first and last month whose checkpoint may be stale)"""
+    doc = await transaction_service.versions_collection.document(user_id).get()
+    data = doc.to_dict() if doc.exists else {}
+    latest = _month_from_number(transaction_service.LATEST_MONTH)
+    if not data.get(BALANCE_VALID_FIELD):
+        return data.get("version", 0), "0000-00", latest
+    stale_from = data.get(transaction_service.BALANCE_STALE_FIELD, ALL_CURRENT)
+    stale_through = data.get(
+        transaction_service.BALANCE_STALE_THROUGH_FIELD,
+        transaction_service.LATEST_MONTH,
+    )
+    return (
+        data.get("version", 0),
+        _month_from_number(stale_from),
+        _month_from_number(stale_through),
+    )
+
+
+async def _checkpoint_before(
+    user_id: str, month: str, currency: str, after: Optional[str] = None
+) -> Optional[int]:
+    """Closing balance of the last checkpoint before ``month`` (None if none)
+
+    With ``after``, only checkpoints later than that month count.
+    """
+    query = months_collection(user_id).where("month", "<", month)
+    if after is not None:
+        query = query.where("month", ">", after)
+    query = query.order_by("month", direction="DESCENDING").limit(1)
+    async for doc in query.stream():
+        return _checkpoint_balance(doc.to_dict(), currency)
+    return None
+
+
+async def _persist(
+    user_id: str,
+    version: int,
+    stale_from: str,
+    stale_through: str,
+    closings: Dict[str, int],
+) -> bool:
+    """Store recomputed checkpoints unless a write landed since they were read"""
+    existing = [
+        doc.reference
+        async for doc in months_collection(user_id)
+        .where("month", ">=", stale_from)
+        .where("month", "<=", stale_through)
+        .select([])
+        .stream()
+    ]
+    stale = [ref for ref in existing if ref.id not in closings]
+
+    # One commit: the version check, deletes, sets and the new stale range
+    months = sorted(closings)[: MAX_BATCH_WRITES - len(stale) - 1]
+    if len(months) < len(closings):
+        watermark = int(sorted(closings)[len(months)].replace("-", ""))
+        through = int(stale_through.replace("-", ""))
+    else:
+        watermark, through = ALL_CURRENT, 0
+    version_ref = transaction_service.versions_collection.document(user_id)
+
+    async def _write(transaction):
+        snapshot = await version_ref.get(transaction=transaction)
+        current = snapshot.to_dict() if snapshot.exists else {}
+        if current.get("version", 0) != version:
+            return False
+
+        for ref in stale:
+            transaction.delete(ref)
+        for month in months:
+            transaction.set(
+                months_collection(user_id).document(month),
+                {"month": month, "balance_minor": closings[month]},
+            )
+        transaction.set(
+            version_ref,
+            {
+                transaction_service.BALANCE_STALE_FIELD: watermark,
+                transaction_service.BALANCE_STALE_THROUGH_FIELD: through,
+                BALANCE_VALID_FIELD: True,
+            },
+            merge=True,
+        )
+        return True
+
+    return await db.run_transaction(_write)
+
+
+def _signed_minor(data: dict) -> int:
+    minor = money.minor_units_of(data)
+    return minor if data["type"] == "income" else -minor
+
+
+async def _closing_balances_by_scan(
+    user_id: str, first_month: str, last_month: str
+) -> Tuple[int, Dict[str, int]]:
+    """closing_balances for users whose rollups are not complete yet"""
+    net_by_month: Dict[str, int] = {}
+    query = transaction_service.collection.where("user_id", "==", user_id).select(
+        ["type", "amount", "amount_minor", "currency", "date"]
+    )
+    async for doc in query.stream():
+        data = doc.to_dict()
+        key = rollup_service.month_key(data["date"])
+        net_by_month[key] = net_by_month.get(key, 0) + _signed_minor(data)
+
+    opening = running = 0
+    closings: Dict[str, int] = {}
+    for month in sorted(net_by_month):
+        running += net_by_month[month]
+        if month < first_month:
+            opening = running
+        elif month <= last_month:
+            closings[month] = running
+    return opening, closings
+
+
+async def closing_balances(
+    user_id: str, first_month: str, last_month: str, currency: str
+) -> Tuple[int, Dict[str, int]]:
+    """Balance before ``first_month`` and closing balances in the range
+
+    Balances are in minor units of ``currency``, that of every transaction.
+    Only months with transactions appear in the returned mapping. Stale
+    checkpoints up to ``last_month`` are recomputed from the monthly rollups,
+    over the stale range only, and written back.
+    """
+    marker = await rollup_service.get_rollup_marker(user_id)
+    if not marker.get("complete"):
+        return await _closing_balances_by_scan(user_id, first_month, last_month)
+    minor_units = marker.get("minor_units", False)
+
+    version, stale_from, stale_through = await _read_watermark(user_id)
+
+    # Checkpoints after the stale range stay valid: they count every
+    # transaction of the range once, wherever in it the transaction moved
+    recomputed: Dict[str, int] = {}
+    if stale_from <= last_month:
+        running = await _checkpoint_before(user_id, stale_from, currency) or 0
+        for rollup in await rollup_service.get_monthly_rollups(
+            user_id, stale_from, stale_through
+        ):
+            running += _rollup_net(rollup, currency, minor_units)
+            recomputed[rollup["month"]] = running
+        await _persist(user_id, version, stale_from, stale_through, recomputed)
+
+    closings = {
+        month: balance
+        for month, balance in recomputed.items()
+        if first_month <= month <= last_month
+    }
+    if not stale_from <= first_month <= last_month <= stale_through:
+        query = months_collection(user_id).where("month", ">=", first_month)
+        query = query.where("month", "<=", last_month)
+        async for doc in query.stream():
+            data = doc.to_dict()
+            if not stale_from <= data["month"] <= stale_through:
+                closings[data["month"]] = _checkpoint_balance(data, currency)
+
+    # The latest of: a valid checkpoint after the stale range, a recomputed
+    # one, a valid one before the stale range
+    opening = None
+    if first_month > stale_through:
+        opening = await _checkpoint_before(
+            user_id, first_month, currency, after=stale_through
+        )
+    earlier = [month for month in recomputed if month < first_month]
+    if opening is None and earlier:
+        opening = recomputed[max(earlier)]
+    if opening is None:
+        opening = await _checkpoint_before(
+            user_id, min(first_month, stale_from), currency
+        )
+
+    return opening or 0, closings
+
+
+async def _net_between(
+    user_id: str, start: datetime, end: datetime, currency: str
+) -> int:
+    """Income minus expenses in [start, end] in minor units, from two aggregations"""
+    if start > end:
+        return 0
+
+    async def total(transaction_type: str) -> int:
+        plan = transaction_service.plan_user_query(
+            user_id, transaction_type, start, end
+        )
+        query = transaction_service.build_filtered_query(plan)
+        results = await (
+            query.sum("amount_minor", alias="minor").sum("amount", alias="total").get()
+        )
+        values = {result.alias: result.value for result in results[0]}
+        minor = int(values.get("minor") or 0)
+        # Documents written before amount_minor lack it, and only then does
+        # the rounded float sum disagree with the exact one
+        recorded = _to_minor(float(values.get("total") or 0), currency)
+        return minor if recorded == minor else recorded
+
+    income, expense = await asyncio.gather(total("income"), total("expense"))
+    return income - expense
+
+
+async def _first_month(user_id: str) -> Optional[str]:
+    query = rollup_service.months_collection(user_id).order_by("month").limit(1)
+    async for doc in query.stream():
+        return doc.to_dict()["month"]
+    return None
+
+
+async def reset_checkpoints(user_id: str) -> None:
+    """Force a full recompute, e.g. after the rollups were rebuilt"""
+    await transaction_service.versions_collection.document(user_id).set(
+        {BALANCE_VALID_FIELD: DELETE_FIELD}, merge=True
+    )
+
+
+def _series_bounds(start: datetime, end: datetime, interval: str) -> List[datetime]:
+    """Start of every day or month touched by [start, end]"""
+    bounds = []
+    cursor = summary_service.period_start(start, interval)
+    while cursor <= end:
+        bounds.append(cursor)
+        if len(bounds) > MAX_SERIES_POINTS:
+            raise ValueError(
+                f"Range too long: at most {MAX_SERIES_POINTS} {interval}s per series"
+            )
+        cursor = summary_service.next_period_start(cursor, interval)
+    return bounds
+
+
+async def _converted_series(
+    user_id: str,
+    interval: str,
+    start_date: Optional[datetime],
+    end: datetime,
+    currency: str,
+) -> BalanceSeries:
+    """get_balance_series for transactions not all in ``currency``
+
+    One cumulative sum in minor units over the converted columns, sorted by
+    date; each balance is a binary search for the end of its period. Raises
+    ValueError when a rate is missing.
+    """
+    columns = (await analytics_service.load_columns(user_id)).converted(currency)
+    if start_date:
+        start = _as_utc(start_date)
+    elif len(columns):
+        first = datetime.fromtimestamp(int(columns.timestamps.min()), timezone.utc)
+        start = summary_service.period_start(first, "month")
+    else:
+        return BalanceSeries(
+            interval=interval, currency=currency, opening_balance=0, points=[]
+        )
+
+    if start > end:
+        raise ValueError("start_date must not be after end_date")
+
+    bounds = _series_bounds(start, end, interval)
+    order = np.argsort(columns.timestamps, kind="stable")
+    timestamps = columns.timestamps[order]
+    signed = np.where(columns.expense, -columns.amounts, columns.amounts)[order]
+    scale = 10 ** money.exponent(currency)
+    running = np.concatenate(
+        ([0], np.cumsum(np.round(signed * scale).astype(np.int64)))
+    )
+
+    def balance_through(moment: datetime) -> float:
+        """Balance of every transaction dated at or before ``moment``"""
+        seconds = int(moment.timestamp())
+        return int(running[np.searchsorted(timestamps, seconds, side="right")]) / scale
+
+    opening = balance_through(start - timedelta(microseconds=1))
+    points = []
+    balance = opening
+    for cursor in bounds:
+        period_end = summary_service.next_period_start(cursor, interval)
+        closing = balance_through(min(period_end - timedelta(microseconds=1), end))
+        key = (
+            rollup_service.month_key(cursor)
+            if interval == "month"
+            else summary_service.period_key(cursor, "day")
+        )
+        points.append(
+            BalancePoint(
+                period=key,
+                balance=closing,
+                net=money.round_amount(closing - balance, currency),
+            )
+        )
+        balance = closing
+
+    return BalanceSeries(
+        interval=interval, currency=currency, opening_balance=opening, points=points
+    )
+
+
+async def get_balance_series(
+    user_id: str,
+    interval: str = "day",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> BalanceSeries:
+    """Cumulative balance at the end of every day or month in the range
+
+    Balances are in the user's reporting currency. The range defaults to the
+    user's first month with transactions up to now. Monthly points come from
+    checkpoints, with an aggregation for a partial last month; daily points
+    stream only the transactions inside the range.
+    """
+    end = _as_utc(end_date) if end_date else datetime.now(timezone.utc)
+    currency = await user_service.get_reporting_currency(user_id)
+    if not await transaction_service.in_single_currency(user_id, currency):
+        return await _converted_series(user_id, interval, start_date, end, currency)
+
+    if start_date:
+        start = _as_utc(start_date)
+    else:
+        first_month = await _first_month(user_id)
+        if first_month is None:
+            return BalanceSeries(
+                interval=interval, currency=currency, opening_balance=0, points=[]
+            )
+        start = datetime.strptime(first_month, "%Y-%m").replace(tzinfo=timezone.utc)
+
+    if start > end:
+        raise ValueError("start_date must not be after end_date")
+
+    bounds = _series_bounds(start, end, interval)
+    before_start, closings = await closing_balances(
+        user_id,
+        rollup_service.month_key(start),
+        rollup_service.month_key(end),
+        currency,
+    )
+
+    # Transactions between the checkpoint and the start of the range
+    month_start = summary_service.period_start(start, "month")
+    opening = before_start + await _net_between(
+        user_id, month_start, start - timedelta(microseconds=1), currency
+    )
+
+    # Balances stay in minor units until they are reported
+    def point(key: str, balance: int, net: int) -> BalancePoint:
+        return BalancePoint(
+            period=key,
+            balance=money.from_minor_units(balance, currency),
+            net=money.from_minor_units(net, currency),
+        )
+
+    points = []
+    if interval == "month":
+        previous_closing = before_start
+        balance = opening
+        for cursor in bounds:
+            key = rollup_service.month_key(cursor)
+            month_end = summary_service.next_period_start(cursor, "month")
+            if month_end <= end:
+                closing = closings.get(key, previous_closing)
+            else:
+                closing = previous_closing + await _net_between(
+                    user_id, cursor, end, currency
+                )
+            points.append(point(key, closing, closing - balance))
+            previous_closing = balance = closing
+    else:
+        plan = transaction_service.plan_user_query(
+            user_id, start_date=start, end_date=end
+        )
+        query = transaction_service.build_filtered_query(plan).select(
+            ["type", "amount", "amount_minor", "currency", "date"]
+        )
+        net_by_day: Dict[str, int] = {}
+        async for doc in query.stream():
+            data = doc.to_dict()
+            key = summary_service.period_key(_as_utc(data["date"]), "day")
+            net_by_day[key] = net_by_day.get(key, 0) + _signed_minor(data)
+
+        balance = opening
+        for cursor in bounds:
+            key = summary_service.period_key(cursor, "day")
+            net = net_by_day.get(key, 0)
+            balance += net
+            points.append(point(key, balance, net))
+
+    return BalanceSeries(
+        interval=interval,
+        currency=currency,
+        opening_balance=money.from_minor_units(opening, currency),
+        points=points,
+    )
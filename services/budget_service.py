@@ -0,0 +1,458 @@
+"""Service layer for budgets and their incrementally maintained spending
+
+Each budget keeps one counter per period at
+``budgets/{budget_id}/periods/{period}`` holding the expenses spent so far.
+Transaction writes adjust the counters of the budgets they touch with
+Increment transforms in the same commit, so checking a budget never sums the
+user's transactions. Counters start with the period in which the budget was
+created; :func:`resync_budget` recounts recent periods to repair any drift.
+
+A budget is in the user's reporting currency at the time it was created.
+Expenses in other currencies count at the rate of their date; a write that
+needs a rate the local table lacks is rejected with ValueError rather than
+counted at a wrong value.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from google.cloud.firestore import Increment
+from storage import db, MAX_BATCH_WRITES
+from models.budget import (
+    BudgetAlert,
+    BudgetCreate,
+    BudgetResponse,
+    BudgetStatus,
+    BudgetUpdate,
+)
+from services import fx_service, query_planner, summary_service, user_service
+from utils import money
+
+logger = logging.getLogger(__name__)
+
+budgets_collection = db.collection("budgets")
+transactions_collection = db.collection("transactions")
+versions_collection = db.collection("transaction_versions")
+
+# Periods recounted per budget by a re-sync: the current and the previous one
+RESYNC_PERIODS = 2
+
+# Recount attempts when creating a budget while the user keeps writing
+MAX_SEED_ATTEMPTS = 3
+
+# (budget id, period) -> [amount, count] to add to that period's counter
+SpendingDeltas = Dict[Tuple[str, str], List[float]]
+
+
+def periods_collection(budget_id: str):
+    """Collection holding one spending counter per period of a budget"""
+    return budgets_collection.document(budget_id).collection("periods")
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def period_key(value: datetime, period: str) -> str:
+    """Counter a transaction dated ``value`` counts towards (2024-05, 2024-W18)"""
+    return summary_service.period_key(_as_utc(value), period)
+
+
+def _recent_period_starts(period: str, count: int) -> List[datetime]:
+    """Start of the current period and of the ``count - 1`` before it"""
+    start = summary_service.period_start(datetime.now(timezone.utc), period)
+    starts = [start]
+    while len(starts) < count:
+        start = summary_service.period_start(start - timedelta(days=1), period)
+        starts.append(start)
+    return starts
+
+
+def _budget_from_doc(doc) -> BudgetResponse:
+    return BudgetResponse(id=doc.id, **doc.to_dict())
+
+
+async def get_budget(budget_id: str) -> Optional[BudgetResponse]:
+    """Get a budget by ID"""
+    doc = await budgets_collection.document(budget_id).get()
+    if not doc.exists:
+        return None
+    return _budget_from_doc(doc)
+
+
+async def get_user_budgets(
+    user_id: str, categories: Optional[Iterable[str]] = None
+) -> List[BudgetResponse]:
+    """A user's budgets, optionally only those for some categories"""
+    budgets = [
+        _budget_from_doc(doc)
+        async for doc in budgets_collection.where("user_id", "==", user_id).stream()
+    ]
+    if categories is None:
+        return budgets
+    categories = set(categories)
+    return [budget for budget in budgets if budget.category in categories]
+
+
+def _amounts_in(currency: str, expenses: List[dict]) -> List[float]:
+    """Amounts of expenses in ``currency``, at the rate of each one's date
+
+    Raises ValueError when the rate table has no rate for one of them.
+    """
+    if not expenses:
+        return []
+    currencies = [money.currency_of(data) for data in expenses]
+    converted = fx_service.convert_amounts(
+        [data["amount"] for data in expenses],
+        currencies,
+        [data["date"] for data in expenses],
+        currency,
+    )
+    for data, source, amount in zip(expenses, currencies, converted):
+        if amount is None:
+            raise ValueError(
+                f"No exchange rate from {source} to {currency} on "
+                f"{_as_utc(data['date']):%Y-%m-%d} for the {data['category']} budget"
+            )
+    return converted
+
+
+def spending_deltas(
+    budgets: List[BudgetResponse], changes: Iterable[Tuple[dict, int]]
+) -> SpendingDeltas:
+    """Counter changes caused by adding (1) or removing (-1) transactions
+
+    Only expenses in a budget's category count, and only from the period in
+    which the budget was created, in the budget's currency. Changes that
+    cancel out are dropped, so e.g. editing a description touches no counter.
+    Raises ValueError when a needed exchange rate is missing.
+    """
+    # (budget, period, transaction data, sign) of every counted expense
+    matches = []
+    for data, sign in changes:
+        if data["type"] != "expense":
+            continue
+        for budget in budgets:
+            if budget.category != data["category"]:
+                continue
+            key = period_key(data["date"], budget.period)
+            if key < budget.start_period:
+                continue
+            matches.append((budget, key, data, sign))
+
+    # One conversion pass per budget currency
+    amounts = [0.0] * len(matches)
+    for currency in {budget.currency for budget, _, _, _ in matches}:
+        indices = [
+            i for i, match in enumerate(matches) if match[0].currency == currency
+        ]
+        converted = _amounts_in(currency, [matches[i][2] for i in indices])
+        for index, amount in zip(indices, converted):
+            amounts[index] = amount
+
+    deltas: SpendingDeltas = {}
+    for (budget, key, _, sign), amount in zip(matches, amounts):
+        cell = deltas.setdefault((budget.id, key), [0.0, 0])
+        cell[0] += sign * amount
+        cell[1] += sign
+
+    return {key: cell for key, cell in deltas.items() if cell[0] or cell[1]}
+
+
+async def read_spent(deltas: SpendingDeltas, transaction=None) -> Dict[tuple, float]:
+    """Current value of the counters ``deltas`` will change"""
+    spent = {}
+    for budget_id, period in deltas:
+        snapshot = (
+            await periods_collection(budget_id)
+            .document(period)
+            .get(transaction=transaction)
+        )
+        spent[(budget_id, period)] = (
+            snapshot.to_dict().get("spent", 0.0) if snapshot.exists else 0.0
+        )
+    return spent
+
+
+def apply_spending_deltas(writer, deltas: SpendingDeltas) -> None:
+    """Adjust the counters in the batch or transaction carrying the write"""
+    for (budget_id, period), (amount, count) in deltas.items():
+        writer.set(
+            periods_collection(budget_id).document(period),
+            {"period": period, "spent": Increment(amount), "count": Increment(count)},
+            merge=True,
+        )
+
+
+def crossed_alerts(
+    budgets: List[BudgetResponse], deltas: SpendingDeltas, spent: Dict[tuple, float]
+) -> List[BudgetAlert]:
+    """Thresholds that the counter changes cross upwards"""
+    by_id = {budget.id: budget for budget in budgets}
+    alerts = []
+    for (budget_id, period), (amount, _) in deltas.items():
+        budget = by_id[budget_id]
+        before = spent[(budget_id, period)]
+        after = before + amount
+
+        if before < budget.limit <= after:
+            level = "exceeded"
+        elif before < budget.limit * budget.alert_threshold <= after:
+            level = "warning"
+        else:
+            continue
+
+        alerts.append(
+            BudgetAlert(
+                budget_id=budget_id,
+                category=budget.category,
+                period=period,
+                limit=budget.limit,
+                spent=after,
+                level=level,
+            )
+        )
+    return alerts
+
+
+async def _change_version(user_id: str) -> int:
+    doc = await versions_collection.document(user_id).get()
+    return doc.to_dict().get("version", 0) if doc.exists else 0
+
+
+async def _count_periods(
+    budget: BudgetResponse, starts: List[datetime]
+) -> Dict[str, List[float]]:
+    """Expenses of the budget's category in each period, from the transactions
+
+    Amounts are in the budget's currency; raises ValueError when a needed
+    exchange rate is missing.
+    """
+    counts = {}
+    for start in starts:
+        end = summary_service.next_period_start(start, budget.period)
+        plan = query_planner.plan_transaction_query(
+            budget.user_id,
+            {"category": budget.category, "type": "expense"},
+            {"date": (start, end - timedelta(microseconds=1))},
+        )
+        query = plan.apply(transactions_collection).select(
+            ["type", "category", "amount", "currency", "date"]
+        )
+        expenses = []
+        async for doc in query.stream():
+            data = doc.to_dict()
+            if plan.matches(data):
+                expenses.append(data)
+        counts[summary_service.period_key(start, budget.period)] = [
+            money.round_amount(
+                sum(_amounts_in(budget.currency, expenses)), budget.currency
+            ),
+            len(expenses),
+        ]
+    return counts
+
+
+async def _store_counts(
+    user_id: str,
+    expected_version: Optional[int],
+    budget_id: str,
+    counts: Dict[str, List[float]],
+    budget_data: Optional[dict] = None,
+) -> bool:
+    """Overwrite counters unless a transaction was written since the recount
+
+    The change counter is bumped by every transaction write, so an unchanged
+    version means no Increment landed between the recount and this commit.
+    ``expected_version=None`` skips the check.
+    """
+    version_ref = versions_collection.document(user_id)
+
+    async def _write(transaction):
+        if expected_version is not None:
+            snapshot = await version_ref.get(transaction=transaction)
+            current = snapshot.to_dict().get("version", 0) if snapshot.exists else 0
+            if current != expected_version:
+                return False
+
+        if budget_data is not None:
+            transaction.set(budgets_collection.document(budget_id), budget_data)
+        for period, (amount, count) in counts.items():
+            transaction.set(
+                periods_collection(budget_id).document(period),
+                {"period": period, "spent": amount, "count": count},
+            )
+        return True
+
+    return await db.run_transaction(_write)
+
+
+async def create_budget(user_id: str, budget: BudgetCreate) -> BudgetResponse:
+    """Create a budget with its current period counted from the transactions
+
+    The budget is in the user's reporting currency. Raises ValueError when
+    the user already has a budget for the same category and period, or when
+    counting an expense needs a missing exchange rate.
+    """
+    existing = await get_user_budgets(user_id, [budget.category])
+    if any(other.period == budget.period for other in existing):
+        raise ValueError(
+            f"A {budget.period} budget for {budget.category} already exists"
+        )
+
+    now = datetime.now(timezone.utc)
+    doc_ref = budgets_collection.document()
+    budget_data = {
+        **budget.dict(),
+        "user_id": user_id,
+        "currency": await user_service.get_reporting_currency(user_id),
+        "start_period": period_key(now, budget.period),
+        "created_at": now,
+        "updated_at": now,
+    }
+    response = BudgetResponse(id=doc_ref.id, **budget_data)
+
+    # Writes racing every attempt are left for the next re-sync
+    for attempt in range(MAX_SEED_ATTEMPTS):
+        version = await _change_version(user_id)
+        counts = await _count_periods(response, _recent_period_starts(budget.period, 1))
+        last_attempt = attempt == MAX_SEED_ATTEMPTS - 1
+        if await _store_counts(
+            user_id,
+            None if last_attempt else version,
+            doc_ref.id,
+            counts,
+            budget_data,
+        ):
+            break
+
+    return response
+
+
+async def update_budget(
+    budget_id: str, budget_update: BudgetUpdate, user_id: Optional[str] = None
+) -> Optional[BudgetResponse]:
+    """Update a budget's limit or threshold, optionally checking its owner
+
+    Returns None when the budget does not exist and raises PermissionError
+    when it belongs to someone else.
+    """
+    doc_ref = budgets_collection.document(budget_id)
+    doc = await doc_ref.get()
+    if not doc.exists:
+        return None
+
+    current = doc.to_dict()
+    if user_id is not None and current.get("user_id") != user_id:
+        raise PermissionError("Not authorized to update this budget")
+
+    # Only update fields that are provided (not None)
+    update_data = {k: v for k, v in budget_update.dict().items() if v is not None}
+    if update_data:
+        update_data["updated_at"] = datetime.now(timezone.utc)
+        await doc_ref.update(update_data)
+
+    return BudgetResponse(id=budget_id, **{**current, **update_data})
+
+
+async def delete_budget(budget_id: str, user_id: Optional[str] = None) -> bool:
+    """Delete a budget and its counters, optionally checking its owner
+
+    Returns False when the budget does not exist and raises PermissionError
+    when it belongs to someone else.
+    """
+    doc_ref = budgets_collection.document(budget_id)
+    doc = await doc_ref.get()
+    if not doc.exists:
+        return False
+
+    if user_id is not None and doc.to_dict().get("user_id") != user_id:
+        raise PermissionError("Not authorized to delete this budget")
+
+    # The budget goes first so writers stop maintaining its counters
+    await doc_ref.delete()
+
+    batch = db.batch()
+    pending = 0
+    async for counter in periods_collection(budget_id).select([]).stream():
+        batch.delete(counter.reference)
+        pending += 1
+        if pending == MAX_BATCH_WRITES:
+            await batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        await batch.commit()
+
+    return True
+
+
+def _status(budget: BudgetResponse, period: str, counter: Optional[dict]):
+    spent = counter.get("spent", 0.0) if counter else 0.0
+    return BudgetStatus(
+        **budget.dict(),
+        current_period=period,
+        spent=spent,
+        count=counter.get("count", 0) if counter else 0,
+        remaining=budget.limit - spent,
+        percentage=round(spent / budget.limit * 100, 2),
+    )
+
+
+async def get_budget_statuses(budgets: List[BudgetResponse]) -> List[BudgetStatus]:
+    """Spending of each budget's current period, read from its counter"""
+    now = datetime.now(timezone.utc)
+    periods = [period_key(now, budget.period) for budget in budgets]
+    references = [
+        periods_collection(budget.id).document(period)
+        for budget, period in zip(budgets, periods)
+    ]
+
+    counters = {}
+    async for snapshot in db.get_all(references):
+        if snapshot.exists:
+            counters[snapshot.reference.path] = snapshot.to_dict()
+
+    return [
+        _status(budget, period, counters.get(reference.path))
+        for budget, period, reference in zip(budgets, periods, references)
+    ]
+
+
+async def resync_budget(budget: BudgetResponse, periods: int = RESYNC_PERIODS) -> bool:
+    """Recount the budget's most recent counters from its transactions
+
+    Returns False when a transaction write raced the recount; the counters
+    are then left to their increments until the next re-sync.
+    """
+    starts = [
+        start
+        for start in _recent_period_starts(budget.period, periods)
+        if summary_service.period_key(start, budget.period) >= budget.start_period
+    ]
+    version = await _change_version(budget.user_id)
+    counts = await _count_periods(budget, starts)
+    return await _store_counts(budget.user_id, version, budget.id, counts)
+
+
+async def resync_budgets(
+    user_ids: Optional[List[str]] = None, periods: int = RESYNC_PERIODS
+) -> int:
+    """Re-sync the budgets of some users (all by default), return how many"""
+    if user_ids is None:
+        budgets = [_budget_from_doc(doc) async for doc in budgets_collection.stream()]
+    else:
+        budgets = [
+            budget for user_id in user_ids for budget in await get_user_budgets(user_id)
+        ]
+
+    synced = 0
+    for budget in budgets:
+        try:
+            if await resync_budget(budget, periods):
+                synced += 1
+        except Exception:  # one broken budget must not stop the others
+            logger.exception("Re-sync of budget %s failed", budget.id)
+    return synced
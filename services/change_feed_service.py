@@ -0,0 +1,210 @@
+"""Fan-out of transaction changes to ``/transactions/stream`` connections
+
+A worker keeps at most one storage listener per user, however many of that
+user's devices are connected: the first connection opens it and the last
+one closes it. Each change is encoded as a Server-Sent Event once and the
+same bytes are queued on every connection of the user. Queues are bounded,
+so a client that stops reading cannot grow memory: when its queue is full
+the backlog is dropped and a ``reset`` event tells it to re-fetch its list.
+
+Protocol: after connecting, a client waits for ``ready``, loads
+``GET /transactions/`` and then applies ``added``, ``modified`` (full
+transaction, with ``converted_amount`` in the reporting currency as in the
+list) and ``removed`` (``{"id": ...}``) events. The reporting currency is
+the one in effect when the user's latest connection was opened.
+"""
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+from config.settings import (
+    CHANGE_FEED_BUFFER_SIZE,
+    CHANGE_FEED_HEARTBEAT_SECONDS,
+    CHANGE_FEED_MAX_CONNECTIONS,
+    DEFAULT_CURRENCY,
+)
+from models.transaction import TransactionResponse
+from services import transaction_service
+from storage import db, CHANGE_REMOVED, DocumentStore
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONS_COLLECTION = "transactions"
+
+change_feed_resets = REGISTRY.counter(
+    "change_feed_resets_total",
+    "Change feed connections whose buffer overflowed and was reset",
+)
+
+
+def encode_event(event: str, data: str) -> bytes:
+    """One Server-Sent Event"""
+    return f"event: {event}\ndata: {data}\n\n".encode("utf-8")
+
+
+READY_EVENT = encode_event("ready", "{}")
+RESET_EVENT = encode_event("reset", "{}")
+HEARTBEAT = b": keep-alive\n\n"
+
+
+def encode_changes(changes: List, currency: str) -> List[bytes]:
+    """Events for added, modified or removed transactions, in order
+
+    Transactions get ``converted_amount`` in ``currency`` in one pass, like a
+    list response. A document that is not a valid transaction is skipped.
+    """
+    parsed = []
+    for kind, snapshot in changes:
+        transaction = None
+        if kind != CHANGE_REMOVED:
+            try:
+                transaction = TransactionResponse(id=snapshot.id, **snapshot.to_dict())
+            except Exception:  # one bad document must not stop the feed
+                logger.exception("Skipping change of %s", snapshot.id)
+                continue
+        parsed.append((kind, snapshot.id, transaction))
+
+    transaction_service.with_converted_amounts(
+        [transaction for _, _, transaction in parsed if transaction is not None],
+        currency,
+    )
+    return [
+        encode_event(
+            kind,
+            json.dumps({"id": doc_id}) if transaction is None else transaction.json(),
+        )
+        for kind, doc_id, transaction in parsed
+    ]
+
+
+class Subscription:
+    """One connection's bounded queue of encoded events"""
+
+    def __init__(self, user_id: str, buffer_size: int):
+        self.user_id = user_id
+        self._queue: asyncio.Queue = asyncio.Queue(buffer_size)
+
+    def push(self, event: bytes) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog; re-fetching is cheaper than replaying it
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESET_EVENT)
+            change_feed_resets.inc()
+
+    async def next_event(self, timeout: float) -> Optional[bytes]:
+        """Next queued event, or None when nothing arrived within ``timeout``"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class _UserFeed:
+    """A user's storage listener and the connections it feeds"""
+
+    def __init__(self):
+        self.subscriptions: Set[Subscription] = set()
+        self.ready = False
+        self.currency = DEFAULT_CURRENCY
+        self.stop: Callable[[], None] = lambda: None
+
+
+class ChangeFeed:
+    """Per-user storage listeners shared by all of a user's connections"""
+
+    def __init__(
+        self,
+        store: DocumentStore,
+        collection_path: str = TRANSACTIONS_COLLECTION,
+        buffer_size: int = CHANGE_FEED_BUFFER_SIZE,
+        max_connections: int = CHANGE_FEED_MAX_CONNECTIONS,
+    ):
+        self._store = store
+        self._collection_path = collection_path
+        self._buffer_size = buffer_size
+        self._max_connections = max_connections
+        self._feeds: Dict[str, _UserFeed] = {}
+        self.connections = 0
+
+    def is_full(self) -> bool:
+        return self.connections >= self._max_connections
+
+    def subscribe(self, user_id: str, currency: str = DEFAULT_CURRENCY) -> Subscription:
+        """Register a connection, starting the user's listener if needed
+
+        ``currency`` is the user's reporting currency; every connection of
+        the user then receives amounts converted to it.
+        """
+        subscription = Subscription(user_id, self._buffer_size)
+        feed = self._feeds.get(user_id)
+        if feed is None:
+            feed = _UserFeed()
+            feed.stop = self._store.listen(
+                self._collection_path,
+                "user_id",
+                user_id,
+                lambda changes: self._deliver(user_id, feed, changes),
+            )
+            self._feeds[user_id] = feed
+        elif feed.ready:
+            subscription.push(READY_EVENT)
+
+        feed.currency = currency
+        feed.subscriptions.add(subscription)
+        self.connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Drop a connection, stopping the listener with the user's last one"""
+        feed = self._feeds.get(subscription.user_id)
+        if feed is None or subscription not in feed.subscriptions:
+            return
+
+        feed.subscriptions.discard(subscription)
+        self.connections -= 1
+        if not feed.subscriptions:
+            del self._feeds[subscription.user_id]
+            feed.stop()
+
+    def _deliver(self, user_id: str, feed: _UserFeed, changes: List) -> None:
+        if self._feeds.get(user_id) is not feed:
+            return  # stopped while this delivery was queued
+
+        if not feed.ready:
+            # The first delivery is the current state, which clients load
+            # from GET /transactions/ once they see ``ready``
+            feed.ready = True
+            events = [READY_EVENT]
+        else:
+            events = encode_changes(changes, feed.currency)
+
+        for subscription in feed.subscriptions:
+            for event in events:
+                subscription.push(event)
+
+    async def stream(
+        self,
+        user_id: str,
+        currency: str = DEFAULT_CURRENCY,
+        heartbeat: float = CHANGE_FEED_HEARTBEAT_SECONDS,
+    ) -> AsyncIterator[bytes]:
+        """A connection's events, with a keep-alive comment when idle
+
+        The subscription is made when iteration starts and dropped when the
+        consumer stops, e.g. because the client disconnected.
+        """
+        subscription = self.subscribe(user_id, currency)
+        try:
+            while True:
+                event = await subscription.next_event(heartbeat)
+                yield HEARTBEAT if event is None else event
+        finally:
+            self.unsubscribe(subscription)
+
+
+change_feed = ChangeFeed(db)
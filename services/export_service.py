@@ -0,0 +1,152 @@
+"""Service layer for streaming transaction exports"""
+
+import csv
+import io
+from typing import AsyncIterator, List
+from models.transaction import TransactionResponse
+from config.settings import DEFAULT_CURRENCY
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_PAGE_SIZE = 1000
+
+EXPORT_FIELDS = [
+    "id",
+    "user_id",
+    "type",
+    "amount",
+    "currency",
+    "category",
+    "date",
+    "description",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """Whether the optional pyarrow dependency is installed"""
+    return pq is not None
+
+
+def _with_currency(transaction: TransactionResponse) -> TransactionResponse:
+    """Documents written before transactions had a currency are in the default"""
+    if transaction.currency is None:
+        transaction.currency = DEFAULT_CURRENCY
+    return transaction
+
+
+async def encode_ndjson(
+    pages: AsyncIterator[List[TransactionResponse]],
+) -> AsyncIterator[bytes]:
+    """Encode each page as newline-delimited JSON"""
+    async for page in pages:
+        yield "".join(
+            _with_currency(transaction).json() + "\n" for transaction in page
+        ).encode("utf-8")
+
+
+async def encode_csv(
+    pages: AsyncIterator[List[TransactionResponse]],
+) -> AsyncIterator[bytes]:
+    """Encode pages as CSV with a single header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+
+    async for page in pages:
+        for transaction in page:
+            writer.writerow(
+                [
+                    transaction.id,
+                    transaction.user_id,
+                    transaction.type,
+                    transaction.amount,
+                    transaction.currency or DEFAULT_CURRENCY,
+                    transaction.category,
+                    transaction.date.isoformat(),
+                    transaction.description or "",
+                ]
+            )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose buffered bytes can be taken out piecemeal"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def encode_parquet(
+    pages: AsyncIterator[List[TransactionResponse]],
+) -> AsyncIterator[bytes]:
+    """Encode pages as Parquet, one row group per page"""
+    schema = pa.schema(
+        [
+            ("id", pa.string()),
+            ("user_id", pa.string()),
+            ("type", pa.string()),
+            ("amount", pa.float64()),
+            ("currency", pa.string()),
+            ("category", pa.string()),
+            ("date", pa.timestamp("us", tz="UTC")),
+            ("description", pa.string()),
+        ]
+    )
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    try:
+        async for page in pages:
+            columns = {field: [] for field in EXPORT_FIELDS}
+            for transaction in map(_with_currency, page):
+                for field in EXPORT_FIELDS:
+                    columns[field].append(getattr(transaction, field))
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+    "parquet": encode_parquet,
+}
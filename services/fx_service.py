@@ -0,0 +1,204 @@
+"""Daily exchange rates from a local CSV table and vectorized conversion
+
+The table at FX_RATES_PATH has a ``date`` column followed by one column per
+currency, holding units of that currency per unit of FX_BASE_CURRENCY (the
+layout of the ECB's eurofxref-hist.csv; blank and ``N/A`` cells are gaps).
+It is loaded into a sorted array of epoch days and a (day x currency) rate
+matrix, gaps filled forward, so a date without a row (weekend, holiday)
+uses the latest earlier rate. The table is cached in-process and reloaded
+when the file changes; no live rate service is involved.
+
+Converting many amounts is one pass of array indexing: ``searchsorted``
+finds each row's rate day and the matrix gives both rates at once.
+"""
+
+import csv
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config.settings import DEFAULT_CURRENCY, FX_BASE_CURRENCY, FX_RATES_PATH
+from utils import money
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+_MISSING_RATES = {"", "N/A", "NA", "-"}
+
+
+def epoch_day(value: datetime) -> int:
+    """Days since 1970-01-01 of a datetime (naive means UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp()) // SECONDS_PER_DAY
+
+
+class RateTable:
+    """Daily rates of every currency against one base currency"""
+
+    def __init__(
+        self, days: np.ndarray, currencies: List[str], rates: np.ndarray, base: str
+    ):
+        self.days = days
+        self.currencies = currencies
+        self.rates = rates
+        self.base = base
+        self._columns = {currency: index for index, currency in enumerate(currencies)}
+
+    @classmethod
+    def from_csv(cls, path: str, base: str = FX_BASE_CURRENCY) -> "RateTable":
+        """Load a wide CSV table: date, then one column per currency"""
+        with open(path, newline="", encoding="utf-8") as handle:
+            reader = csv.reader(handle)
+            header = [field.strip() for field in next(reader, [])]
+            currencies = [code.upper() for code in header[1:] if code]
+            rows: Dict[int, List[float]] = {}
+            for record in reader:
+                if not record or not record[0].strip():
+                    continue
+                day = (date.fromisoformat(record[0].strip()) - date(1970, 1, 1)).days
+                cells = record[1 : len(currencies) + 1]
+                cells += [""] * (len(currencies) - len(cells))
+                rows[day] = [_parse_rate(cell) for cell in cells]
+
+        days = np.array(sorted(rows), dtype=np.int64)
+        rates = np.array([rows[day] for day in days], dtype=np.float64).reshape(
+            len(days), len(currencies)
+        )
+        rates = _fill_forward(rates)
+
+        if base not in currencies:
+            currencies.append(base)
+            rates = np.hstack([rates, np.ones((len(days), 1))])
+        return cls(days, currencies, rates, base)
+
+    @classmethod
+    def empty(cls, base: str = FX_BASE_CURRENCY) -> "RateTable":
+        return cls(np.zeros(0, dtype=np.int64), [], np.zeros((0, 0)), base)
+
+    def convert(
+        self,
+        amounts: np.ndarray,
+        currency_codes: np.ndarray,
+        currencies: Sequence[str],
+        days: np.ndarray,
+        target: str,
+    ) -> np.ndarray:
+        """Amounts in ``target`` at each row's daily rate, NaN when none is known
+
+        ``currency_codes`` index ``currencies``, one code per amount. Rows
+        already in ``target`` are returned unchanged without needing a rate.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        currency_codes = np.asarray(currency_codes)
+        converted = np.full(len(amounts), np.nan)
+        if not len(amounts):
+            return converted
+
+        same = np.array([currency == target for currency in currencies], dtype=bool)
+        in_target = same[currency_codes]
+        converted[in_target] = amounts[in_target]
+
+        target_column = self._columns.get(target)
+        foreign = ~in_target
+        if target_column is None or not foreign.any() or not len(self.days):
+            return converted
+
+        # Table column of each distinct currency, -1 when the table lacks it
+        columns = np.array(
+            [self._columns.get(currency, -1) for currency in currencies],
+            dtype=np.int64,
+        )[currency_codes[foreign]]
+        # Latest table day on or before each row's day, -1 before the table
+        rows = np.searchsorted(self.days, np.asarray(days)[foreign], side="right") - 1
+        known = (columns >= 0) & (rows >= 0)
+
+        values = np.full(len(columns), np.nan)
+        source = self.rates[rows[known], columns[known]]
+        values[known] = (
+            amounts[foreign][known] / source * self.rates[rows[known], target_column]
+        )
+        converted[foreign] = values
+        return converted
+
+    def convert_one(
+        self, amount: float, currency: str, day: int, target: str
+    ) -> Optional[float]:
+        """convert for a single amount, None when no rate is known"""
+        value = self.convert(
+            np.array([amount]), np.array([0]), [currency], np.array([day]), target
+        )[0]
+        return None if np.isnan(value) else float(value)
+
+
+def _parse_rate(cell: str) -> float:
+    cell = cell.strip()
+    return np.nan if cell in _MISSING_RATES else float(cell)
+
+
+def _fill_forward(rates: np.ndarray) -> np.ndarray:
+    """Replace each gap with the latest earlier rate of the same currency"""
+    if not rates.size:
+        return rates
+    valid = ~np.isnan(rates)
+    rows = np.where(valid, np.arange(len(rates))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    # Still NaN before a currency's first rate
+    return rates[rows, np.arange(rates.shape[1])]
+
+
+# (path, modification time) of the cached table
+_loaded: Tuple[Optional[tuple], RateTable] = (None, RateTable.empty())
+
+
+def get_rate_table(path: str = FX_RATES_PATH) -> RateTable:
+    """The cached rate table, reloaded when the file changes"""
+    global _loaded
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        key = (path, None)
+
+    if key != _loaded[0]:
+        table = RateTable.empty()
+        if key[1] is not None:
+            try:
+                table = RateTable.from_csv(path)
+            except (OSError, ValueError):
+                logger.exception("Could not load exchange rates from %s", path)
+        _loaded = (key, table)
+    return _loaded[1]
+
+
+def rates_version(path: str = FX_RATES_PATH) -> str:
+    """Changes whenever the rate table file does (for ETags)"""
+    get_rate_table(path)
+    return str(_loaded[0][1])
+
+
+def convert_amounts(
+    amounts: Sequence[float],
+    currencies: Sequence[Optional[str]],
+    dates: Sequence[datetime],
+    target: str,
+) -> List[Optional[float]]:
+    """Convert parallel lists in one pass, rounded to ``target``'s minor unit"""
+    names: Dict[str, int] = {}
+    codes = [
+        names.setdefault(currency or DEFAULT_CURRENCY, len(names))
+        for currency in currencies
+    ]
+    converted = get_rate_table().convert(
+        np.array(amounts, dtype=np.float64),
+        np.array(codes, dtype=np.int64),
+        list(names),
+        np.array([epoch_day(value) for value in dates], dtype=np.int64),
+        target,
+    )
+    decimals = money.exponent(target)
+    return [
+        None if np.isnan(value) else round(float(value), decimals)
+        for value in converted
+    ]
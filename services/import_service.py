@@ -0,0 +1,281 @@
+"""Service layer for bulk transaction imports"""
+
+import codecs
+import csv
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Set, Tuple, Union
+from google.cloud.firestore import Increment
+from pydantic import ValidationError
+from storage import db, MAX_BATCH_WRITES
+from models.transaction import (
+    BulkImportResult,
+    BulkRowError,
+    Transaction,
+    TransactionCreate,
+)
+from services import budget_service, rollup_service, transaction_service, user_service
+from utils import money
+
+imports_collection = db.collection("bulk_imports")
+
+MAX_IMPORT_ROWS = 100_000
+MAX_REPORTED_ERRORS = 1000
+
+# (1-based row number, parsed row or the reason it could not be parsed)
+ParsedRow = Tuple[int, Union[dict, str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a UTF-8 byte stream into lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """Parse one JSON object per non-blank line"""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield row_number, f"Invalid JSON: {exc}"
+            continue
+
+        yield row_number, row if isinstance(row, dict) else "Row must be a JSON object"
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """Parse CSV with a header row; quoted fields may span lines"""
+    header = None
+    pending = None
+    row_number = 0
+
+    async for line in lines:
+        pending = line if pending is None else f"{pending}\n{line}"
+
+        # An odd number of quotes means a quoted field continues on the next line
+        if pending.count('"') % 2:
+            continue
+
+        record = next(csv.reader([pending]), [])
+        pending = None
+        if not any(field.strip() for field in record):
+            continue
+
+        if header is None:
+            header = [field.strip() for field in record]
+            continue
+
+        row_number += 1
+        if len(record) != len(header):
+            yield row_number, f"Expected {len(header)} columns, got {len(record)}"
+            continue
+
+        yield row_number, {
+            key: value if value != "" else None for key, value in zip(header, record)
+        }
+
+    if pending is not None:
+        yield row_number + 1, "Unterminated quoted field"
+
+
+async def iter_json_rows(rows: list) -> AsyncIterator[ParsedRow]:
+    """Number the objects of an already parsed JSON array"""
+    for row_number, row in enumerate(rows, start=1):
+        yield row_number, row if isinstance(row, dict) else "Row must be a JSON object"
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    """Flatten a pydantic error into a single message"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def _import_document_id(user_id: str, idempotency_key: str, row_number: int) -> str:
+    """Deterministic transaction ID so a retried upload rewrites the same rows"""
+    digest = hashlib.sha256(f"{user_id}:{idempotency_key}:{row_number}".encode())
+    return digest.hexdigest()[:20]
+
+
+def _import_record(user_id: str, idempotency_key: str):
+    """Progress record of an idempotent import"""
+    digest = hashlib.sha256(f"{user_id}:{idempotency_key}".encode()).hexdigest()
+    return imports_collection.document(digest)
+
+
+async def import_transactions(
+    user_id: str,
+    rows: AsyncIterator[ParsedRow],
+    idempotency_key: Optional[str] = None,
+) -> BulkImportResult:
+    """Validate rows in chunks and write them in batches of up to 500 operations
+
+    With an idempotency key every batch also advances a progress record in the
+    same commit, so a retried upload skips rows that were already written and a
+    completed import returns its original result. Each batch is a transaction
+    that re-reads the record, so concurrent retries with the same key write,
+    and count, every row once.
+    """
+    record_ref = _import_record(user_id, idempotency_key) if idempotency_key else None
+    committed_through = 0
+
+    if record_ref is not None:
+        record = await record_ref.get()
+        if record.exists:
+            record_data = record.to_dict()
+            if record_data.get("status") == "completed":
+                return BulkImportResult(**record_data["result"], replayed=True)
+            committed_through = record_data.get("committed_through", 0)
+
+    imported = 0
+    failed = 0
+    errors: List[BulkRowError] = []
+    chunk: List[Transaction] = []
+    chunk_rows: List[int] = []
+    chunk_months: Set[str] = set()
+    chunk_counters: Set[Tuple[str, str]] = set()
+
+    # Loaded once: every expense row may add to a budget counter, and rows
+    # without a currency are in the reporting currency
+    budgets = await budget_service.get_user_budgets(user_id)
+    reporting_currency = await user_service.get_reporting_currency(user_id)
+
+    async def commit_chunk(transaction) -> int:
+        """Stage the rows no concurrent attempt committed yet, with progress"""
+        record = await record_ref.get(transaction=transaction)
+        done = record.to_dict().get("committed_through", 0) if record.exists else 0
+        pending = [
+            (row, transaction_data)
+            for row, transaction_data in zip(chunk_rows, chunk)
+            if row > done
+        ]
+        if not pending:
+            return 0
+
+        await transaction_service.stage_transactions(
+            transaction,
+            [transaction_data for _, transaction_data in pending],
+            [_import_document_id(user_id, idempotency_key, row) for row, _ in pending],
+            budgets,
+        )
+        transaction.set(
+            record_ref,
+            {
+                "user_id": user_id,
+                "status": "in_progress",
+                "committed_through": pending[-1][0],
+                "imported": Increment(len(pending)),
+                "updated_at": datetime.now(timezone.utc),
+            },
+            merge=True,
+        )
+        return len(pending)
+
+    async def flush():
+        nonlocal imported
+        if not chunk:
+            return
+
+        if record_ref is not None:
+            imported += await db.run_transaction(commit_chunk)
+        else:
+            await transaction_service.create_transactions(chunk, budgets=budgets)
+            imported += len(chunk)
+        chunk.clear()
+        chunk_rows.clear()
+        chunk_months.clear()
+        chunk_counters.clear()
+
+    async for row_number, row in rows:
+        if row_number > MAX_IMPORT_ROWS:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(
+                    BulkRowError(row=row_number, message="Import row limit exceeded")
+                )
+            break
+
+        if isinstance(row, str):
+            message = row
+        else:
+            try:
+                transaction_data = TransactionCreate(**row)
+                message = None
+                if transaction_data.currency is None:
+                    transaction_data.currency = reporting_currency
+                    money.to_minor_units(transaction_data.amount, reporting_currency)
+                counters = budget_service.spending_deltas(
+                    budgets, [(transaction_data.dict(), 1)]
+                )
+            except ValidationError as exc:
+                message = _format_validation_error(exc)
+            except ValueError as exc:
+                message = f"amount: {exc}"
+
+        if message is not None:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(BulkRowError(row=row_number, message=message))
+            continue
+
+        # Already committed by an earlier attempt with the same key
+        if row_number <= committed_through:
+            continue
+
+        transaction = Transaction(user_id=user_id, **transaction_data.dict())
+        chunk.append(transaction)
+        chunk_rows.append(row_number)
+        chunk_months.add(rollup_service.month_key(transaction_data.date))
+        chunk_counters.update(counters)
+
+        # Transactions, rollup months, budget counters, change counter and
+        # progress record must fit in one commit
+        if len(chunk) + len(chunk_months) + len(chunk_counters) + 2 >= MAX_BATCH_WRITES:
+            await flush()
+
+    await flush()
+
+    if record_ref is None:
+        return BulkImportResult(imported=imported, failed=failed, errors=errors)
+
+    async def complete(transaction) -> BulkImportResult:
+        """Record the result, or return the one a concurrent attempt recorded"""
+        record_data = (await record_ref.get(transaction=transaction)).to_dict() or {}
+        if record_data.get("status") == "completed":
+            return BulkImportResult(**record_data["result"], replayed=True)
+
+        # Rows committed by every attempt with this key, including this one
+        result = BulkImportResult(
+            imported=record_data.get("imported", 0), failed=failed, errors=errors
+        )
+        transaction.set(
+            record_ref,
+            {
+                "user_id": user_id,
+                "status": "completed",
+                "result": result.dict(exclude={"replayed"}),
+                "updated_at": datetime.now(timezone.utc),
+            },
+            merge=True,
+        )
+        return result
+
+    return await db.run_transaction(complete)
@@ -0,0 +1,221 @@
+"""Composite-index-aware planning of transaction queries
+
+Firestore needs a composite index for every combination of equality filters
+used together with a range or ordering. Instead of declaring one index per
+combination, only the prefixes in ``INDEXED_PREFIXES`` followed by one of the
+``ORDER_FIELDS`` are indexed. The planner pushes the most selective prefix a
+request can use, plus the range on the sort field, to Firestore and evaluates
+the remaining predicates in-process while streaming, so every query is bounded
+by the user and none needs a missing index.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+COLLECTION_GROUP = "transactions"
+ORDER_FIELDS = ("date", "amount")
+
+# Array of indexed words and prefixes, see services/search_service.py
+SEARCH_FIELD = "search_terms"
+
+# Firestore limit on the values of one ``in`` filter
+MAX_IN_VALUES = 30
+
+# Equality fields that head a (prefix..., order field) composite index
+INDEXED_PREFIXES: Tuple[Tuple[str, ...], ...] = (
+    ("user_id",),
+    ("user_id", "category"),
+    ("user_id", "type"),
+)
+
+# Rough number of distinct values per field, used to rank prefixes
+FIELD_CARDINALITY = {"user_id": 1, "type": 2, "category": 12}
+
+Predicate = Tuple[str, str, Any]
+
+
+def _selectivity(prefix: Tuple[str, ...], equalities: Dict[str, Any]) -> float:
+    """Higher is better: expected reduction of the scanned range"""
+    score = 1.0
+    for field in prefix:
+        values = equalities[field]
+        matched = len(values) if isinstance(values, (list, tuple)) else 1
+        score *= FIELD_CARDINALITY.get(field, 1) / matched
+    return score
+
+
+def _bound(value: Any) -> Any:
+    """Naive datetimes mean UTC, as they do when Firestore evaluates them"""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _equality(field: str, value: Any) -> Predicate:
+    """``==`` for one value, ``in`` for several"""
+    if isinstance(value, (list, tuple)):
+        if len(value) == 1:
+            return (field, "==", value[0])
+        return (field, "in", list(value))
+    return (field, "==", value)
+
+
+def _matches(data: dict, predicate: Predicate) -> bool:
+    field, op, value = predicate
+    actual = data.get(field)
+    if actual is None:
+        return False
+    if op == "==":
+        return actual == value
+    if op == "in":
+        return actual in value
+    if op == ">=":
+        return actual >= value
+    if op == "<=":
+        return actual <= value
+    if op == ">":
+        return actual > value
+    if op == "<":
+        return actual < value
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class QueryPlan:
+    """Predicates pushed to Firestore and those left to the in-process filter"""
+
+    def __init__(
+        self,
+        index: Tuple[str, ...],
+        pushed: List[Predicate],
+        residual: List[Predicate],
+        order_field: str = "date",
+    ):
+        self.index = index
+        self.pushed = pushed
+        self.residual = residual
+        self.order_field = order_field
+
+    def apply(self, query):
+        """Add the pushed predicates to a collection query"""
+        for field, op, value in self.pushed:
+            query = query.where(field, op, value)
+        return query
+
+    def matches(self, data: dict) -> bool:
+        """Whether a fetched document satisfies the residual predicates"""
+        return all(_matches(data, predicate) for predicate in self.residual)
+
+    def matches_all(self, data: dict) -> bool:
+        """Whether a document satisfies every predicate, pushed or residual"""
+        return all(
+            _matches(data, predicate) for predicate in self.pushed + self.residual
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"QueryPlan(index={self.index + (self.order_field,)}, "
+            f"pushed={self.pushed}, residual={self.residual})"
+        )
+
+
+def choose_prefix(equalities: Dict[str, Any]) -> Tuple[str, ...]:
+    """Most selective indexed prefix made only of the given equality fields"""
+    # Value lists longer than Firestore accepts in one ``in`` stay in-process
+    pushable = {
+        field
+        for field, value in equalities.items()
+        if not isinstance(value, (list, tuple)) or len(value) <= MAX_IN_VALUES
+    }
+    candidates = [prefix for prefix in INDEXED_PREFIXES if set(prefix) <= pushable]
+    if not candidates:
+        raise ValueError("Transaction queries must filter on user_id")
+    return max(
+        candidates,
+        key=lambda prefix: (_selectivity(prefix, equalities), -len(prefix)),
+    )
+
+
+def covers(fields: Iterable[str]) -> bool:
+    """Whether equality filters on ``fields`` can all be pushed to one index"""
+    fields = set(fields) | {"user_id"}
+    return any(set(prefix) == fields for prefix in INDEXED_PREFIXES)
+
+
+def plan_transaction_query(
+    user_id: str,
+    equalities: Optional[Dict[str, Any]] = None,
+    ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    order_field: str = "date",
+) -> QueryPlan:
+    """Split a user's transaction filters into pushed and residual predicates
+
+    ``equalities`` maps fields to a required value or a list of accepted
+    values (``None`` means unfiltered). ``ranges`` maps fields to inclusive
+    ``(lower, upper)`` bounds, either of which may be ``None``. Only the range
+    on ``order_field`` is pushed: Firestore serves it from the same index that
+    provides the order.
+    """
+    if order_field not in ORDER_FIELDS:
+        raise ValueError(f"Cannot order transactions by {order_field}")
+
+    equalities = {
+        field: value
+        for field, value in (equalities or {}).items()
+        if value is not None and value != []
+    }
+    equalities["user_id"] = user_id
+
+    prefix = choose_prefix(equalities)
+    pushed = [_equality(field, equalities[field]) for field in prefix]
+    residual = [
+        _equality(field, value)
+        for field, value in sorted(equalities.items())
+        if field not in prefix
+    ]
+
+    for field, (lower, upper) in sorted((ranges or {}).items()):
+        target = pushed if field == order_field else residual
+        if lower is not None:
+            target.append((field, ">=", _bound(lower)))
+        if upper is not None:
+            target.append((field, "<=", _bound(upper)))
+
+    return QueryPlan(prefix, pushed, residual, order_field)
+
+
+def index_definitions() -> dict:
+    """``firestore.indexes.json`` content for every query the planner emits
+
+    Each prefix gets a descending index per order field for the paginated
+    listing and an ascending one for ascending sorts and for range queries
+    without an explicit order (aggregations and the summary reducer).
+    """
+    indexes = []
+    for order_field in ORDER_FIELDS:
+        for prefix in INDEXED_PREFIXES:
+            for direction in ("ASCENDING", "DESCENDING"):
+                indexes.append(
+                    {
+                        "collectionGroup": COLLECTION_GROUP,
+                        "queryScope": "COLLECTION",
+                        "fields": [
+                            {"fieldPath": field, "order": "ASCENDING"}
+                            for field in prefix
+                        ]
+                        + [{"fieldPath": order_field, "order": direction}],
+                    }
+                )
+
+    # Term lookups of the search endpoint, newest first
+    indexes.append(
+        {
+            "collectionGroup": COLLECTION_GROUP,
+            "queryScope": "COLLECTION",
+            "fields": [
+                {"fieldPath": "user_id", "order": "ASCENDING"},
+                {"fieldPath": SEARCH_FIELD, "arrayConfig": "CONTAINS"},
+                {"fieldPath": "date", "order": "DESCENDING"},
+            ],
+        }
+    )
+    return {"indexes": indexes, "fieldOverrides": []}
@@ -0,0 +1,310 @@
+"""Recurring transaction rules and the scheduler that posts their occurrences
+
+A rule stores its transaction template, its schedule and ``next_run``, the
+date of the next occurrence (empty once the rule has ended). The scheduler
+only reads rules whose ``next_run`` has passed, through the single-field
+index Firestore keeps on it, so idle rules cost nothing. Due rules are
+grouped by user and each group is posted in one Firestore transaction that
+re-reads the rules, stages the occurrences through ``transaction_service``
+and advances the rules. A second worker or a restart re-reading the same
+rules finds them advanced, so an occurrence is never posted twice.
+"""
+
+import asyncio
+import calendar
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from storage import db
+from models.recurring import (
+    RecurringRuleCreate,
+    RecurringRuleResponse,
+    RecurringRuleUpdate,
+)
+from models.transaction import Transaction
+from services import transaction_service, user_service
+from utils import money
+
+logger = logging.getLogger(__name__)
+
+rules_collection = db.collection("recurring_rules")
+
+NEXT_RUN_FIELD = "next_run"
+
+# Due rules read per scheduler query
+DUE_PAGE_SIZE = 200
+
+# Occurrences per commit: with their months, budget counters, change counter
+# and rule updates they stay well under the 500 writes of one commit
+MAX_OCCURRENCES_PER_COMMIT = 80
+
+# Bounds one scheduler run when many rules are catching up
+MAX_PAGES_PER_RUN = 50
+
+# Users whose due rules are posted concurrently
+POSTING_CONCURRENCY = 8
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _add_months(start: datetime, months: int, day: int) -> datetime:
+    """``start`` moved by whole months, on ``day`` or the month's last day"""
+    total = start.month - 1 + months
+    year, month = start.year + total // 12, total % 12 + 1
+    return start.replace(
+        year=year, month=month, day=min(day, calendar.monthrange(year, month)[1])
+    )
+
+
+def occurrence_date(rule: dict, index: int) -> Optional[datetime]:
+    """Date of the rule's ``index``-th occurrence (0-based), None past its end
+
+    Every occurrence is computed from the start date rather than from the
+    previous one, so clamping to short months never shifts later ones.
+    """
+    start = _as_utc(rule["start_date"])
+    interval = rule["interval"]
+
+    if rule["frequency"] == "daily":
+        date = start + timedelta(days=index * interval)
+    elif rule["frequency"] == "weekly":
+        date = start + timedelta(weeks=index * interval)
+    else:
+        step = interval if rule["frequency"] == "monthly" else 12 * interval
+        day = rule.get("day_of_month") or start.day
+        # A day of month before the start date's day begins one period later
+        first = 0 if _add_months(start, 0, day) >= start else step
+        date = _add_months(start, first + index * step, day)
+
+    end_date = rule.get("end_date")
+    if end_date is not None and date > _as_utc(end_date):
+        return None
+    return date
+
+
+def _rule_from_doc(doc) -> RecurringRuleResponse:
+    return RecurringRuleResponse(id=doc.id, **doc.to_dict())
+
+
+async def create_rule(user_id: str, rule: RecurringRuleCreate) -> RecurringRuleResponse:
+    """Create a recurring rule; past occurrences are posted by the scheduler
+
+    Raises ValueError for a day of month on a daily or weekly rule, for an
+    end date before the start date and for an amount finer than the
+    currency's minor unit. The currency defaults to the reporting currency
+    at creation, so later changes to it do not affect the rule.
+    """
+    if rule.day_of_month is not None and rule.frequency in ("daily", "weekly"):
+        raise ValueError("day_of_month only applies to monthly and yearly rules")
+
+    currency = rule.currency or await user_service.get_reporting_currency(user_id)
+    money.to_minor_units(rule.amount, currency)
+
+    rule_data = {
+        **rule.dict(),
+        "currency": currency,
+        "start_date": _as_utc(rule.start_date),
+        "end_date": _as_utc(rule.end_date) if rule.end_date else None,
+    }
+    if rule_data["end_date"] and rule_data["end_date"] < rule_data["start_date"]:
+        raise ValueError("end_date must not be before start_date")
+
+    rule_data.update(
+        user_id=user_id,
+        occurrences=0,
+        next_run=occurrence_date(rule_data, 0),
+        created_at=datetime.now(timezone.utc),
+    )
+    doc_ref = rules_collection.document()
+    await doc_ref.set(rule_data)
+    return RecurringRuleResponse(id=doc_ref.id, **rule_data)
+
+
+async def get_rule(rule_id: str) -> Optional[RecurringRuleResponse]:
+    """Get a recurring rule by ID"""
+    doc = await rules_collection.document(rule_id).get()
+    if not doc.exists:
+        return None
+    return _rule_from_doc(doc)
+
+
+async def get_user_rules(user_id: str) -> List[RecurringRuleResponse]:
+    """A user's recurring rules, next due first and ended rules last"""
+    rules = [
+        _rule_from_doc(doc)
+        async for doc in rules_collection.where("user_id", "==", user_id).stream()
+    ]
+    rules.sort(
+        key=lambda rule: (rule.next_run is None, rule.next_run or rule.created_at)
+    )
+    return rules
+
+
+async def update_rule(
+    rule_id: str, rule_update: RecurringRuleUpdate, user_id: Optional[str] = None
+) -> Optional[RecurringRuleResponse]:
+    """Update a rule's template or end date, optionally checking its owner
+
+    Runs as a Firestore transaction so it cannot interleave with the
+    scheduler advancing the same rule. Returns None when the rule does not
+    exist, raises PermissionError when it belongs to someone else and
+    ValueError for an invalid end date or amount.
+    """
+    doc_ref = rules_collection.document(rule_id)
+
+    # Only update fields that are provided (not None)
+    update_data = {k: v for k, v in rule_update.dict().items() if v is not None}
+    if "end_date" in update_data:
+        update_data["end_date"] = _as_utc(update_data["end_date"])
+
+    async def _update(transaction):
+        snapshot = await doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+
+        current = snapshot.to_dict()
+        if user_id is not None and current.get("user_id") != user_id:
+            raise PermissionError("Not authorized to update this recurring rule")
+
+        updated = {**current, **update_data}
+        if "amount" in update_data:
+            money.to_minor_units(update_data["amount"], money.currency_of(current))
+        if "end_date" in update_data:
+            if update_data["end_date"] < _as_utc(current["start_date"]):
+                raise ValueError("end_date must not be before start_date")
+            update_data[NEXT_RUN_FIELD] = occurrence_date(
+                updated, current["occurrences"]
+            )
+            updated[NEXT_RUN_FIELD] = update_data[NEXT_RUN_FIELD]
+
+        if update_data:
+            transaction.update(doc_ref, update_data)
+        return updated
+
+    rule_data = await db.run_transaction(_update)
+    if rule_data is None:
+        return None
+    return RecurringRuleResponse(id=rule_id, **rule_data)
+
+
+async def delete_rule(rule_id: str, user_id: Optional[str] = None) -> bool:
+    """Delete a rule (posted transactions stay), optionally checking its owner
+
+    Returns False when the rule does not exist and raises PermissionError when
+    it belongs to someone else.
+    """
+    doc_ref = rules_collection.document(rule_id)
+    doc = await doc_ref.get()
+    if not doc.exists:
+        return False
+
+    if user_id is not None and doc.to_dict().get("user_id") != user_id:
+        raise PermissionError("Not authorized to delete this recurring rule")
+
+    await doc_ref.delete()
+    return True
+
+
+def _occurrence_id(rule_id: str, index: int) -> str:
+    """Deterministic transaction ID of one occurrence"""
+    digest = hashlib.sha256(f"recurring:{rule_id}:{index}".encode())
+    return digest.hexdigest()[:20]
+
+
+async def _post_user_rules(user_id: str, rule_ids: List[str], now: datetime) -> int:
+    """Post the due occurrences of some of a user's rules in one commit"""
+    references = [rules_collection.document(rule_id) for rule_id in rule_ids]
+
+    async def _post(transaction):
+        transactions, document_ids, advanced = [], [], []
+
+        for reference in references:
+            snapshot = await reference.get(transaction=transaction)
+            if not snapshot.exists:
+                continue
+
+            rule = snapshot.to_dict()
+            index = rule["occurrences"]
+            date = rule.get(NEXT_RUN_FIELD)
+            while (
+                date is not None
+                and date <= now
+                and len(transactions) < MAX_OCCURRENCES_PER_COMMIT
+            ):
+                transactions.append(
+                    Transaction(
+                        user_id=rule["user_id"],
+                        type=rule["type"],
+                        amount=rule["amount"],
+                        currency=rule.get("currency"),
+                        category=rule["category"],
+                        description=rule.get("description"),
+                        date=date,
+                    )
+                )
+                document_ids.append(_occurrence_id(reference.id, index))
+                index += 1
+                date = occurrence_date(rule, index)
+
+            if index != rule["occurrences"]:
+                advanced.append(
+                    (reference, {"occurrences": index, NEXT_RUN_FIELD: date})
+                )
+
+        # Reads are done; the rest only stages writes
+        if transactions:
+            await transaction_service.stage_transactions(
+                transaction, transactions, document_ids
+            )
+        for reference, data in advanced:
+            transaction.update(reference, data)
+        return len(transactions)
+
+    return await db.run_transaction(_post)
+
+
+async def process_due_rules(now: Optional[datetime] = None) -> int:
+    """Post every occurrence due by ``now``, return how many were posted
+
+    Rules far behind are caught up MAX_OCCURRENCES_PER_COMMIT occurrences
+    at a time; the loop ends when nothing is due or no progress is made.
+    """
+    now = _as_utc(now) if now else datetime.now(timezone.utc)
+    semaphore = asyncio.Semaphore(POSTING_CONCURRENCY)
+
+    async def post(user_id: str, rule_ids: List[str]) -> int:
+        async with semaphore:
+            try:
+                return await _post_user_rules(user_id, rule_ids, now)
+            except Exception:  # one user's failure must not stop the others
+                logger.exception("Posting recurring transactions of %s failed", user_id)
+                return 0
+
+    posted = 0
+    for _ in range(MAX_PAGES_PER_RUN):
+        query = (
+            rules_collection.where(NEXT_RUN_FIELD, "<=", now)
+            .order_by(NEXT_RUN_FIELD)
+            .limit(DUE_PAGE_SIZE)
+            .select(["user_id"])
+        )
+        due = defaultdict(list)
+        async for doc in query.stream():
+            due[doc.to_dict()["user_id"]].append(doc.id)
+        if not due:
+            break
+
+        results = await asyncio.gather(
+            *(post(user_id, rule_ids) for user_id, rule_ids in due.items())
+        )
+        posted += sum(results)
+        if not any(results):
+            break
+
+    return posted
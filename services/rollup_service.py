@@ -0,0 +1,265 @@
+"""Materialized per-user monthly rollups maintained on every transaction write
+
+Each ``user_rollups/{user_id}/months/{yyyy-mm}`` document holds running totals
+and counts per type and per (type, category); ``total_minor`` keeps the
+same total as an exact integer of minor units. The write paths in
+transaction_service apply signed deltas inside the same batch or Firestore
+transaction as the transaction write, so rollups never drift from the data.
+The parent ``user_rollups/{user_id}`` document marks rollups as complete;
+until then summaries fall back to scanning. Rollups add amounts as recorded,
+so they only serve users whose transactions share one currency.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from google.cloud.firestore import Increment
+from storage import db, MAX_BATCH_WRITES
+from models.transaction import SummaryBucket
+from utils import money
+
+rollups_collection = db.collection("user_rollups")
+transactions_collection = db.collection("transactions")
+
+ROLLUP_FIELDS = ("type", "category", "amount", "date", "currency", "amount_minor")
+
+
+def month_key(value: datetime) -> str:
+    """UTC calendar month of a date as yyyy-mm"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m")
+
+
+def month_number(value: datetime) -> int:
+    """UTC calendar month of a date as the number yyyymm"""
+    return int(month_key(value).replace("-", ""))
+
+
+def months_collection(user_id: str):
+    """Collection holding one rollup document per month for a user"""
+    return rollups_collection.document(user_id).collection("months")
+
+
+def apply_rollup_deltas(
+    writer, user_id: str, transactions: Iterable[dict], sign: int = 1
+) -> None:
+    """Add (sign=1) or remove (sign=-1) transactions from their months' rollups
+
+    Deltas are merged per month first, so a batch touching many transactions
+    costs one write per month. ``writer`` is the WriteBatch or Transaction
+    carrying the transaction writes.
+    """
+    apply_rollup_changes(writer, user_id, ((data, sign) for data in transactions))
+
+
+def apply_rollup_changes(
+    writer, user_id: str, changes: Iterable[Tuple[dict, int]]
+) -> None:
+    """apply_rollup_deltas with a sign per transaction, e.g. old and new states"""
+    months: Dict[str, Dict[tuple, list]] = {}
+    for data, sign in changes:
+        cells = months.setdefault(month_key(data["date"]), {})
+        cell = cells.setdefault((data["type"], data["category"]), [0.0, 0, 0])
+        cell[0] += sign * data["amount"]
+        cell[1] += sign
+        cell[2] += sign * money.minor_units_of(data)
+
+    for key, cells in months.items():
+        totals: Dict[str, list] = {}
+        categories: Dict[str, dict] = {}
+        for (transaction_type, category), (amount, count, minor) in cells.items():
+            type_total = totals.setdefault(transaction_type, [0.0, 0, 0])
+            type_total[0] += amount
+            type_total[1] += count
+            type_total[2] += minor
+            categories.setdefault(transaction_type, {})[category] = {
+                "total": Increment(amount),
+                "count": Increment(count),
+                "total_minor": Increment(minor),
+            }
+
+        writer.set(
+            months_collection(user_id).document(key),
+            {
+                "month": key,
+                "totals": {
+                    transaction_type: {
+                        "total": Increment(amount),
+                        "count": Increment(count),
+                        "total_minor": Increment(minor),
+                    }
+                    for transaction_type, (amount, count, minor) in totals.items()
+                },
+                "categories": categories,
+            },
+            merge=True,
+        )
+
+
+def apply_rollup_delta(writer, user_id: str, transaction_data: dict, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) a single transaction from its rollup"""
+    apply_rollup_deltas(writer, user_id, [transaction_data], sign)
+
+
+def rollup_fields_changed(current: dict, updated: dict) -> bool:
+    """Whether an update moves a transaction between or within rollup buckets"""
+    return any(current.get(field) != updated.get(field) for field in ROLLUP_FIELDS)
+
+
+async def get_rollup_marker(user_id: str) -> dict:
+    """The user's rollup marker, empty when rollups were never built"""
+    doc = await rollups_collection.document(user_id).get()
+    return doc.to_dict() if doc.exists else {}
+
+
+async def has_complete_rollups(user_id: str) -> bool:
+    """Whether the user's rollups cover their full history"""
+    return (await get_rollup_marker(user_id)).get("complete", False)
+
+
+async def mark_rollups_complete(user_id: str, writer=None) -> None:
+    """Flag a user's rollups as complete (new users start with nothing to roll up)
+
+    ``minor_units`` records that every ``total_minor`` covers the whole
+    month; rollups completed before it existed only have float totals.
+    """
+    marker = {
+        "complete": True,
+        "minor_units": True,
+        "rebuilt_at": datetime.now(timezone.utc),
+    }
+    if writer is not None:
+        writer.set(rollups_collection.document(user_id), marker)
+    else:
+        await rollups_collection.document(user_id).set(marker)
+
+
+async def get_monthly_rollups(
+    user_id: str, start_month: Optional[str] = None, end_month: Optional[str] = None
+) -> List[dict]:
+    """Read the month rollups in [start_month, end_month], oldest first"""
+    query = months_collection(user_id)
+
+    if start_month:
+        query = query.where("month", ">=", start_month)
+
+    if end_month:
+        query = query.where("month", "<=", end_month)
+
+    return [doc.to_dict() async for doc in query.order_by("month").stream()]
+
+
+async def summarize_from_rollups(
+    user_id: str,
+    period: Optional[str],
+    group_by_category: bool,
+    transaction_type: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    category: Optional[Union[str, List[str]]],
+    currency: str,
+    minor_units: bool = False,
+) -> List[SummaryBucket]:
+    """Build summary buckets from month rollups in O(months)
+
+    Totals are exact from ``total_minor`` when the rollups have
+    ``minor_units``, otherwise the float totals rounded to ``currency``.
+    """
+    rollups = await get_monthly_rollups(
+        user_id,
+        month_key(start_date) if start_date else None,
+        month_key(end_date) if end_date else None,
+    )
+
+    # One category labels the buckets; several only filter them
+    label = category if isinstance(category, str) else None
+    categories = {category} if label else set(category or ())
+
+    totals: Dict[tuple, List[float]] = {}
+    for rollup in rollups:
+        bucket_period = rollup["month"] if period == "month" else None
+
+        for bucket_type, per_category in rollup.get("categories", {}).items():
+            if transaction_type and bucket_type != transaction_type:
+                continue
+
+            for bucket_category, values in per_category.items():
+                if categories and bucket_category not in categories:
+                    continue
+
+                key = (
+                    bucket_period,
+                    bucket_type,
+                    bucket_category if group_by_category else label,
+                )
+                running = totals.setdefault(key, [0, 0])
+                running[0] += values.get("total_minor" if minor_units else "total", 0)
+                running[1] += values.get("count", 0)
+
+    return [
+        SummaryBucket(
+            period=bucket_period,
+            type=bucket_type,
+            category=bucket_category,
+            total=(
+                money.from_minor_units(total, currency)
+                if minor_units
+                else money.round_amount(total, currency)
+            ),
+            count=count,
+        )
+        for (bucket_period, bucket_type, bucket_category), (total, count) in sorted(
+            totals.items(), key=lambda item: tuple(part or "" for part in item[0])
+        )
+        if count
+    ]
+
+
+async def rebuild_user_rollups(user_id: str) -> int:
+    """Recompute a user's rollups from scratch, returning the months written"""
+    months: Dict[str, dict] = {}
+
+    query = transactions_collection.where("user_id", "==", user_id).select(
+        list(ROLLUP_FIELDS)
+    )
+    async for doc in query.stream():
+        data = doc.to_dict()
+        key = month_key(data["date"])
+        rollup = months.setdefault(key, {"month": key, "totals": {}, "categories": {}})
+
+        minor = money.minor_units_of(data)
+        type_totals = rollup["totals"].setdefault(
+            data["type"], {"total": 0.0, "count": 0, "total_minor": 0}
+        )
+        type_totals["total"] += data["amount"]
+        type_totals["count"] += 1
+        type_totals["total_minor"] += minor
+
+        category_totals = (
+            rollup["categories"]
+            .setdefault(data["type"], {})
+            .setdefault(data["category"], {"total": 0.0, "count": 0, "total_minor": 0})
+        )
+        category_totals["total"] += data["amount"]
+        category_totals["count"] += 1
+        category_totals["total_minor"] += minor
+
+    stale = [doc.reference async for doc in months_collection(user_id).stream()]
+    writes = [(ref, None) for ref in stale]
+    writes += [
+        (months_collection(user_id).document(key), rollup)
+        for key, rollup in months.items()
+    ]
+
+    # Deletes precede sets, so a month present in both ends up rewritten
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for ref, data in writes[start : start + MAX_BATCH_WRITES]:
+            if data is None:
+                batch.delete(ref)
+            else:
+                batch.set(ref, data)
+        await batch.commit()
+
+    await mark_rollups_complete(user_id)
+    return len(months)
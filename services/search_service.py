@@ -0,0 +1,143 @@
+"""Full-text search over transaction descriptions and categories
+
+Each transaction stores ``search_terms``: the normalized tokens of its
+description and category plus their prefixes. The array-contains index that
+Firestore keeps on that field, scoped to the user and ordered by date, is the
+per-user inverted index: one term lookup returns the matching transactions
+without scanning the user's history. The terms are written in the same commit
+as the transaction itself, so the index never lags behind the data.
+"""
+
+import re
+import unicodedata
+from typing import List, Optional
+from storage import db, MAX_BATCH_WRITES
+from models.transaction import TransactionSearchResult
+from services.query_planner import SEARCH_FIELD
+
+MIN_TERM_LENGTH = 2
+MAX_PREFIX_LENGTH = 12
+MAX_INDEXED_TOKENS = 40
+MAX_QUERY_TOKENS = 8
+
+# Newest matches of the lookup term that are ranked per query
+MAX_SEARCH_CANDIDATES = 500
+
+# A match in the category outranks the same match in the description
+CATEGORY_WEIGHT = 1.5
+
+_WORD = re.compile(r"\w+")
+
+transactions_collection = db.collection("transactions")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-free words of at least MIN_TERM_LENGTH characters"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return [
+        word
+        for word in _WORD.findall(folded.casefold())
+        if len(word) >= MIN_TERM_LENGTH
+    ]
+
+
+def index_terms(transaction_data: dict) -> List[str]:
+    """Terms stored with a transaction: every prefix of its words"""
+    words = tokenize(transaction_data.get("category")) + tokenize(
+        transaction_data.get("description")
+    )
+    terms = set()
+    for word in list(dict.fromkeys(words))[:MAX_INDEXED_TOKENS]:
+        for length in range(MIN_TERM_LENGTH, min(len(word), MAX_PREFIX_LENGTH) + 1):
+            terms.add(word[:length])
+    return sorted(terms)
+
+
+def with_search_terms(transaction_data: dict) -> dict:
+    """Copy of a transaction document including its search terms"""
+    return {**transaction_data, SEARCH_FIELD: index_terms(transaction_data)}
+
+
+def search_fields_changed(update_data: dict) -> bool:
+    """Whether an update touches the text the terms are built from"""
+    return "description" in update_data or "category" in update_data
+
+
+def _score(query_words: List[str], transaction_data: dict) -> Optional[float]:
+    """Relevance of a transaction, None unless every query word matches"""
+    fields = (
+        (tokenize(transaction_data.get("category")), CATEGORY_WEIGHT),
+        (tokenize(transaction_data.get("description")), 1.0),
+    )
+    score = 0.0
+    for query_word in query_words:
+        best = 0.0
+        for words, weight in fields:
+            for word in words:
+                if word == query_word:
+                    best = max(best, 2 * weight)
+                elif word.startswith(query_word):
+                    # Shorter completions are closer to what was typed
+                    best = max(best, weight * len(query_word) / len(word))
+        if not best:
+            return None
+        score += best
+    return score
+
+
+async def search_transactions(
+    user_id: str, text: str, limit: int = 20
+) -> List[TransactionSearchResult]:
+    """Rank a user's transactions whose words start with every query word
+
+    The longest query word is looked up in the index (the most selective
+    posting list); the newest MAX_SEARCH_CANDIDATES matches are then scored
+    in-process and the other words checked against them.
+    """
+    query_words = list(dict.fromkeys(tokenize(text)))[:MAX_QUERY_TOKENS]
+    if not query_words:
+        return []
+
+    lookup = max(query_words, key=len)[:MAX_PREFIX_LENGTH]
+    query = (
+        transactions_collection.where("user_id", "==", user_id)
+        .where(SEARCH_FIELD, "array_contains", lookup)
+        .order_by("date", direction="DESCENDING")
+        .limit(MAX_SEARCH_CANDIDATES)
+    )
+
+    hits = []
+    async for doc in query.stream():
+        data = doc.to_dict()
+        score = _score(query_words, data)
+        if score is not None:
+            hits.append((score, data["date"], doc.id, data))
+
+    hits.sort(key=lambda hit: (hit[0], hit[1]), reverse=True)
+    return [
+        TransactionSearchResult(id=doc_id, score=round(score, 3), **data)
+        for score, _, doc_id, data in hits[:limit]
+    ]
+
+
+async def rebuild_user_search_terms(user_id: str) -> int:
+    """Recompute the search terms of every transaction of a user"""
+    query = transactions_collection.where("user_id", "==", user_id).select(
+        ["category", "description"]
+    )
+
+    batch = db.batch()
+    pending = updated = 0
+    async for doc in query.stream():
+        batch.update(doc.reference, {SEARCH_FIELD: index_terms(doc.to_dict())})
+        pending += 1
+        updated += 1
+        if pending == MAX_BATCH_WRITES:
+            await batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        await batch.commit()
+    return updated
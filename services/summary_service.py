@@ -0,0 +1,334 @@
+"""Service layer for income/expense summaries"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Union
+from models.transaction import SummaryBucket, TransactionSummary
+from services import (
+    analytics_service,
+    rollup_service,
+    transaction_service,
+    user_service,
+)
+from utils import money
+
+TRANSACTION_TYPES = ("income", "expense")
+
+# Above this many period buckets a single streaming pass is cheaper than
+# issuing one aggregation query per (bucket, type)
+MAX_AGGREGATION_BUCKETS = 62
+
+
+def period_key(value: datetime, period: str) -> str:
+    """Label of the period a date falls into (2024-05-03, 2024-W18, 2024-05)"""
+    if period == "day":
+        return value.strftime("%Y-%m-%d")
+    if period == "week":
+        year, week, _ = value.isocalendar()
+        return f"{year}-W{week:02d}"
+    return value.strftime("%Y-%m")
+
+
+def period_start(value: datetime, period: str) -> datetime:
+    """Start of the period a date falls into"""
+    start = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "week":
+        return start - timedelta(days=start.weekday())
+    if period == "month":
+        return start.replace(day=1)
+    return start
+
+
+def next_period_start(start: datetime, period: str) -> datetime:
+    """Start of the period following the one beginning at ``start``"""
+    if period == "day":
+        return start + timedelta(days=1)
+    if period == "week":
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _period_bounds(
+    start_date: datetime, end_date: datetime, period: str
+) -> List[Tuple[datetime, datetime]]:
+    """Split [start_date, end_date] into half-open period ranges"""
+    bounds = []
+    cursor = period_start(start_date, period)
+    while cursor <= end_date:
+        upper = next_period_start(cursor, period)
+        bounds.append((max(cursor, start_date), upper))
+        cursor = upper
+    return bounds
+
+
+async def _aggregate(query) -> Tuple[float, int]:
+    """Run a server-side sum/count aggregation for a query"""
+    results = await query.count(alias="count").sum("amount", alias="total").get()
+    values = {result.alias: result.value for result in results[0]}
+    return float(values.get("total") or 0), int(values.get("count") or 0)
+
+
+async def _summarize_with_aggregations(
+    user_id: str,
+    transaction_type: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    category: Optional[Union[str, List[str]]],
+    period: Optional[str],
+    currency: str,
+) -> List[SummaryBucket]:
+    """One aggregation query per (period, type); nothing is downloaded"""
+    types = [transaction_type] if transaction_type else list(TRANSACTION_TYPES)
+    if period:
+        bounds = _period_bounds(start_date, end_date, period)
+    else:
+        bounds = [(start_date, None)]
+
+    groups = []
+    queries = []
+    for lower, upper in bounds:
+        for bucket_type in types:
+            plan = transaction_service.plan_user_query(
+                user_id, bucket_type, lower, end_date, category
+            )
+            query = transaction_service.build_filtered_query(plan)
+            if upper is not None:
+                query = query.where("date", "<", upper)
+            groups.append((period_key(lower, period) if period else None, bucket_type))
+            queries.append(_aggregate(query))
+
+    results = await asyncio.gather(*queries)
+
+    return [
+        SummaryBucket(
+            period=group_period,
+            type=group_type,
+            category=category_label(category),
+            total=money.round_amount(total, currency),
+            count=count,
+        )
+        for (group_period, group_type), (total, count) in zip(groups, results)
+        if count
+    ]
+
+
+async def _summarize_with_reducer(
+    user_id: str,
+    transaction_type: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    category: Optional[Union[str, List[str]]],
+    period: Optional[str],
+    group_by_category: bool,
+    currency: str,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> List[SummaryBucket]:
+    """Single streaming pass keeping one running total per group in minor units"""
+    plan = transaction_service.plan_user_query(
+        user_id,
+        transaction_type,
+        start_date,
+        end_date,
+        category,
+        min_amount,
+        max_amount,
+    )
+    query = transaction_service.build_filtered_query(plan).select(
+        ["type", "category", "amount", "date", "currency", "amount_minor"]
+    )
+
+    totals: Dict[Tuple[Optional[str], str, Optional[str]], List[int]] = {}
+    async for doc in query.stream():
+        data = doc.to_dict()
+        if not plan.matches(data):
+            continue
+        key = (
+            period_key(data["date"], period) if period else None,
+            data["type"],
+            data["category"] if group_by_category else category_label(category),
+        )
+        running = totals.setdefault(key, [0, 0])
+        running[0] += money.minor_units_of(data)
+        running[1] += 1
+
+    return [
+        SummaryBucket(
+            period=group_period,
+            type=group_type,
+            category=group_category,
+            total=money.from_minor_units(total, currency),
+            count=count,
+        )
+        for (group_period, group_type, group_category), (total, count) in sorted(
+            totals.items(), key=lambda item: tuple(part or "" for part in item[0])
+        )
+    ]
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Aware dates moved to UTC; naive ones are already UTC"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc)
+
+
+def _is_month_aligned(
+    start_date: Optional[datetime], end_date: Optional[datetime]
+) -> bool:
+    """Whether a date range covers whole UTC calendar months only
+
+    Rollups are keyed by UTC month, so ``2024-02-01T00:00+05:00`` (still
+    January in UTC) is not aligned.
+    """
+    start_date, end_date = _as_utc(start_date), _as_utc(end_date)
+    if start_date and start_date != period_start(start_date, "month"):
+        return False
+
+    if end_date:
+        # Accept inclusive month ends down to second or microsecond precision
+        return any(
+            (end_date + step) == period_start(end_date + step, "month")
+            for step in (timedelta(seconds=1), timedelta(microseconds=1))
+        )
+
+    return True
+
+
+def category_label(category: Optional[Union[str, List[str]]]) -> Optional[str]:
+    """Category of buckets not grouped by category: the filtered one, if single"""
+    return category if isinstance(category, str) else None
+
+
+async def get_transaction_summary(
+    user_id: str,
+    period: Optional[str] = None,
+    group_by_category: bool = False,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[Union[str, List[str]]] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> TransactionSummary:
+    """Summarize a user's transactions grouped by period, type and category
+
+    Filters match the transaction list: one or several categories and an
+    amount range, compared with amounts as recorded. Totals are in the
+    user's reporting currency. While all transactions are in it they are
+    summed exactly in minor units; otherwise every amount is converted at the
+    rate of its date (ValueError when a rate is missing).
+    """
+    if (
+        start_date
+        and end_date
+        and (start_date.tzinfo is None) != (end_date.tzinfo is None)
+    ):
+        raise ValueError("start_date and end_date must both include or omit a timezone")
+
+    if isinstance(category, list) and len(category) == 1:
+        category = category[0]
+
+    bucket_count = (
+        len(_period_bounds(start_date, end_date, period))
+        if period and start_date and end_date
+        else None
+    )
+    # Aggregations filter on type per bucket and cannot apply residual filters
+    plan = transaction_service.plan_user_query(
+        user_id,
+        transaction_type or TRANSACTION_TYPES[0],
+        start_date,
+        end_date,
+        category,
+        min_amount,
+        max_amount,
+    )
+    use_aggregations = (
+        not group_by_category
+        and not plan.residual
+        and (
+            period is None
+            or (bucket_count is not None and bucket_count <= MAX_AGGREGATION_BUCKETS)
+        )
+    )
+
+    currency = await user_service.get_reporting_currency(user_id)
+    # Rollups, aggregations and the reducer add amounts as recorded
+    mixed = not await transaction_service.in_single_currency(user_id, currency)
+
+    # Rollups hold totals per month and category, not per amount
+    marker = {}
+    if (
+        not mixed
+        and min_amount is None
+        and max_amount is None
+        and period in (None, "month")
+        and _is_month_aligned(start_date, end_date)
+    ):
+        marker = await rollup_service.get_rollup_marker(user_id)
+
+    if mixed:
+        buckets = await analytics_service.summarize_converted(
+            user_id,
+            currency,
+            period,
+            group_by_category,
+            transaction_type,
+            start_date,
+            end_date,
+            category,
+            min_amount,
+            max_amount,
+        )
+    elif marker.get("complete"):
+        buckets = await rollup_service.summarize_from_rollups(
+            user_id,
+            period,
+            group_by_category,
+            transaction_type,
+            start_date,
+            end_date,
+            category,
+            currency,
+            minor_units=marker.get("minor_units", False),
+        )
+    elif use_aggregations:
+        buckets = await _summarize_with_aggregations(
+            user_id, transaction_type, start_date, end_date, category, period, currency
+        )
+    else:
+        buckets = await _summarize_with_reducer(
+            user_id,
+            transaction_type,
+            start_date,
+            end_date,
+            category,
+            period,
+            group_by_category,
+            currency,
+            min_amount,
+            max_amount,
+        )
+
+    total_income = _total(buckets, "income", currency)
+    total_expense = _total(buckets, "expense", currency)
+
+    return TransactionSummary(
+        period=period,
+        currency=currency,
+        total_income=total_income,
+        total_expense=total_expense,
+        net=money.round_amount(total_income - total_expense, currency),
+        buckets=buckets,
+    )
+
+
+def _total(buckets: List[SummaryBucket], transaction_type: str, currency: str) -> float:
+    """Sum of the buckets of a type, rounded to the currency's minor unit"""
+    return money.round_amount(
+        sum(bucket.total for bucket in buckets if bucket.type == transaction_type),
+        currency,
+    )
@@ -1,121 +1,933 @@
 """Service layer for transaction operations"""
 
+import base64
+import json
 from datetime import datetime
-from typing import Optional, List
-from config.firebase import db
-from models.transaction import Transaction, TransactionResponse, TransactionUpdate
+from typing import Any, AsyncIterator, Iterable, Optional, List, Set, Tuple, Union
+from google.cloud.firestore import ArrayUnion, Increment, Maximum, Minimum
+from google.cloud.firestore_v1.field_path import FieldPath
+from storage import db, MAX_BATCH_WRITES
+from models.budget import BudgetResponse
+from models.transaction import (
+    Transaction,
+    TransactionBatchResult,
+    TransactionFilter,
+    TransactionResponse,
+    TransactionUpdate,
+    TransactionWriteResponse,
+)
+from config.settings import DEFAULT_CURRENCY
+from services import (
+    budget_service,
+    fx_service,
+    query_planner,
+    rollup_service,
+    search_service,
+    user_service,
+)
+from utils import money
 
 collection = db.collection("transactions")
 
+# Documents read per round trip when part of a filter is evaluated in-process
+RESIDUAL_CHUNK_SIZE = 300
 
-async def create_transaction(transaction: Transaction) -> TransactionResponse:
-    """Create a new transaction"""
-    doc_ref = collection.document()
-    transaction_data = transaction.dict()
-    doc_ref.set(transaction_data)
+# Documents read and written per Firestore transaction of a batch request
+BATCH_CHUNK_SIZE = 200
+# Most transactions a filtered batch request may select
+MAX_BATCH_MATCHES = 10000
 
-    return TransactionResponse(id=doc_ref.id, **transaction_data)
+# Streamed rows converted to the reporting currency per vectorized pass
+CONVERSION_CHUNK_SIZE = 500
+versions_collection = db.collection("transaction_versions")
 
 
-async def get_transaction(transaction_id: str) -> Optional[TransactionResponse]:
-    """Get a single transaction by ID"""
-    doc = collection.document(transaction_id).get()
+# Earliest month (yyyymm) whose balance checkpoint a write may have changed
+BALANCE_STALE_FIELD = "balance_stale_from"
+# Latest such month; LATEST_MONTH when every later checkpoint may have changed
+BALANCE_STALE_THROUGH_FIELD = "balance_stale_through"
+LATEST_MONTH = 999999
 
-    if not doc.exists:
+# Every currency the user's transactions were ever written in
+CURRENCIES_FIELD = "currencies"
+# Set once CURRENCIES_FIELD covers every document, including those written
+# before transactions had a currency
+CURRENCIES_COMPLETE_FIELD = "currencies_complete"
+
+
+def bump_change_version(
+    writer,
+    user_id: str,
+    stale_month: Optional[int] = None,
+    currencies: Iterable[str] = (),
+    stale_through: int = LATEST_MONTH,
+) -> None:
+    """Advance the user's change counter in the same commit as a write
+
+    ``stale_month`` to ``stale_through`` are the months whose running balance
+    the write changes; they widen the stale range of the balance checkpoints.
+    ``currencies`` are those of the written transactions.
+    """
+    data = {"version": Increment(1)}
+    if stale_month is not None:
+        data[BALANCE_STALE_FIELD] = Minimum(stale_month)
+        data[BALANCE_STALE_THROUGH_FIELD] = Maximum(stale_through)
+    currencies = sorted(set(currencies))
+    if currencies:
+        data[CURRENCIES_FIELD] = ArrayUnion(currencies)
+    writer.set(versions_collection.document(user_id), data, merge=True)
+
+
+def with_money_fields(transaction_data: dict, default_currency: str) -> dict:
+    """Transaction data with its currency set and the amount in minor units
+
+    Raises ValueError when the amount is finer than the currency's minor unit.
+    """
+    currency = transaction_data.get("currency") or default_currency
+    return {
+        **transaction_data,
+        "currency": currency,
+        "amount_minor": money.to_minor_units(transaction_data["amount"], currency),
+    }
+
+
+def _signed_amount(transaction_data: dict) -> float:
+    amount = transaction_data["amount"]
+    return amount if transaction_data["type"] == "income" else -amount
+
+
+def _balance_stale_months(current: dict, updated: dict) -> Optional[Tuple[int, int]]:
+    """First and last month whose closing balance an update changes, if any
+
+    Moving a transaction between months only changes the months in between,
+    both included: every later closing balance still counts it once. Edits
+    that keep its month and signed amount change no balance at all; a new
+    signed amount changes every month from the earlier one on.
+    """
+    old_month = rollup_service.month_number(current["date"])
+    new_month = rollup_service.month_number(updated["date"])
+    first, last = sorted((old_month, new_month))
+    if _signed_amount(current) != _signed_amount(updated):
+        return first, LATEST_MONTH
+    if old_month == new_month:
         return None
+    return first, last
 
-    transaction_data = doc.to_dict()
-    return TransactionResponse(id=transaction_id, **transaction_data)
 
+async def get_change_version(user_id: str) -> int:
+    """Counter bumped by every write to the user's transactions"""
+    doc = await versions_collection.document(user_id).get()
+    return doc.to_dict().get("version", 0) if doc.exists else 0
 
-async def get_user_transactions(
-    user_id: str,
-    transaction_type: Optional[str] = None,
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
-    category: Optional[str] = None,
-) -> List[TransactionResponse]:
-    """Get all transactions for a user with optional filters"""
-    query = collection.where("user_id", "==", user_id)
 
-    # Apply filters
-    if transaction_type:
-        query = query.where("type", "==", transaction_type)
+async def get_user_currencies(user_id: str) -> Set[str]:
+    """Currencies the user's transactions may be in
 
-    if category:
-        query = query.where("category", "==", category)
+    Until the recorded set is marked complete (new users, or after
+    :func:`rebuild_user_currencies`), documents written before transactions
+    had a currency may exist; they are in DEFAULT_CURRENCY, which is then
+    included.
+    """
+    doc = await versions_collection.document(user_id).get()
+    data = doc.to_dict() if doc.exists else {}
+    recorded = set(data.get(CURRENCIES_FIELD, []))
+    if data.get(CURRENCIES_COMPLETE_FIELD):
+        return recorded
+    return {DEFAULT_CURRENCY, *recorded}
 
-    if start_date:
-        query = query.where("date", ">=", start_date)
 
-    if end_date:
-        query = query.where("date", "<=", end_date)
+async def in_single_currency(user_id: str, currency: str) -> bool:
+    """Whether all of the user's transactions (if any) are in ``currency``"""
+    return await get_user_currencies(user_id) <= {currency}
 
-    # Order by date (newest first)
-    query = query.order_by("date", direction="DESCENDING")
 
-    docs = query.stream()
-    transactions = []
+def mark_currencies_complete(writer, user_id: str) -> None:
+    """Flag the recorded currencies as complete (new users have no documents)"""
+    writer.set(
+        versions_collection.document(user_id),
+        {CURRENCIES_COMPLETE_FIELD: True},
+        merge=True,
+    )
 
-    for doc in docs:
-        transaction_data = doc.to_dict()
-        transactions.append(TransactionResponse(id=doc.id, **transaction_data))
 
-    return transactions
+async def rebuild_user_currencies(user_id: str) -> Set[str]:
+    """Record the currency of every existing transaction and mark the set complete
 
+    Writes racing the scan record their own currency, so the union stays
+    complete.
+    """
+    query = collection.where("user_id", "==", user_id).select(["currency"])
+    currencies = {money.currency_of(doc.to_dict()) async for doc in query.stream()}
+    data = {CURRENCIES_COMPLETE_FIELD: True}
+    if currencies:
+        data[CURRENCIES_FIELD] = ArrayUnion(sorted(currencies))
+    await versions_collection.document(user_id).set(data, merge=True)
+    return currencies
 
-async def update_transaction(
-    transaction_id: str, transaction_update: TransactionUpdate
-) -> TransactionResponse:
-    """Update a transaction"""
-    doc_ref = collection.document(transaction_id)
 
-    # Only update fields that are provided (not None)
-    update_data = {k: v for k, v in transaction_update.dict().items() if v is not None}
+async def _budgets_for(user_id: str, *transactions: dict) -> List[BudgetResponse]:
+    """Budgets whose spending the given transactions may change"""
+    categories = {
+        data["category"] for data in transactions if data["type"] == "expense"
+    }
+    if not categories:
+        return []
+    return await budget_service.get_user_budgets(user_id, categories)
 
-    if update_data:
-        doc_ref.update(update_data)
 
-    # Return updated transaction
-    updated_doc = doc_ref.get()
-    transaction_data = updated_doc.to_dict()
-    return TransactionResponse(id=transaction_id, **transaction_data)
+async def create_transaction(transaction: Transaction) -> TransactionWriteResponse:
+    """Create a new transaction, reporting the budget thresholds it crosses
+
+    Raises ValueError when the amount is finer than the currency's minor unit
+    or when a budget it counts towards needs a rate the rate table lacks.
+    """
+    doc_ref = collection.document()
+    reporting_currency = await user_service.get_reporting_currency(transaction.user_id)
+    transaction_data = search_service.with_search_terms(
+        with_money_fields(transaction.dict(), reporting_currency)
+    )
+    budgets = await _budgets_for(transaction.user_id, transaction_data)
+    deltas = budget_service.spending_deltas(budgets, [(transaction_data, 1)])
+
+    # Write the transaction with its rollup and budget deltas atomically
+    def _write(writer):
+        writer.set(doc_ref, transaction_data)
+        rollup_service.apply_rollup_delta(
+            writer, transaction.user_id, transaction_data, 1
+        )
+        budget_service.apply_spending_deltas(writer, deltas)
+        bump_change_version(
+            writer,
+            transaction.user_id,
+            rollup_service.month_number(transaction.date),
+            [transaction_data["currency"]],
+        )
+
+    if deltas:
+        # Counters are read in the same transaction, so each crossing is
+        # reported by exactly one write
+        async def _create(writer):
+            spent = await budget_service.read_spent(deltas, transaction=writer)
+            _write(writer)
+            return budget_service.crossed_alerts(budgets, deltas, spent)
+
+        alerts = await db.run_transaction(_create)
+    else:
+        batch = db.batch()
+        _write(batch)
+        await batch.commit()
+        alerts = []
+
+    response = TransactionWriteResponse(
+        id=doc_ref.id, budget_alerts=alerts, **transaction_data
+    )
+    return with_converted_amounts([response], reporting_currency)[0]
+
+
+async def stage_transactions(
+    writer,
+    transactions: List[Transaction],
+    document_ids: Optional[List[str]] = None,
+    budgets: Optional[List[BudgetResponse]] = None,
+) -> List[TransactionResponse]:
+    """Stage new transactions of one user on a batch or Firestore transaction
+
+    Adds one write per transaction, one per month touched, one per budget
+    period touched and one for the change counter; committing is left to the
+    caller. ``budgets`` are the user's budgets when the caller already loaded
+    them. Transactions without a currency get the user's reporting currency,
+    and the responses carry the amounts converted to it. Raises ValueError,
+    before staging anything, for an amount finer than its currency's minor
+    unit or a budget needing a rate the rate table lacks.
+    """
+    if not transactions:
+        return []
+
+    user_id = transactions[0].user_id
+    reporting_currency = await user_service.get_reporting_currency(user_id)
+    rows = [with_money_fields(t.dict(), reporting_currency) for t in transactions]
+    if budgets is None:
+        budgets = await _budgets_for(user_id, *rows)
+    deltas = budget_service.spending_deltas(budgets, [(row, 1) for row in rows])
+
+    responses = []
+    for index, row in enumerate(rows):
+        doc_ref = (
+            collection.document(document_ids[index])
+            if document_ids
+            else collection.document()
+        )
+        transaction_data = search_service.with_search_terms(row)
+        writer.set(doc_ref, transaction_data)
+        responses.append(TransactionResponse(id=doc_ref.id, **transaction_data))
+
+    rollup_service.apply_rollup_deltas(writer, user_id, rows)
+    budget_service.apply_spending_deltas(writer, deltas)
+    bump_change_version(
+        writer,
+        user_id,
+        min(rollup_service.month_number(t.date) for t in transactions),
+        [row["currency"] for row in rows],
+    )
+
+    return with_converted_amounts(responses, reporting_currency)
+
+
+async def create_transactions(
+    transactions: List[Transaction],
+    document_ids: Optional[List[str]] = None,
+    budgets: Optional[List[BudgetResponse]] = None,
+) -> List[TransactionResponse]:
+    """Create transactions of one user in a single atomic batch
 
+    The caller keeps the batch under the Firestore write limit (see
+    :func:`stage_transactions`).
+    """
+    batch = db.batch()
+    responses = await stage_transactions(batch, transactions, document_ids, budgets)
+    await batch.commit()
+    return responses
 
-async def delete_transaction(transaction_id: str) -> bool:
-    """Delete a transaction"""
-    doc_ref = collection.document(transaction_id)
-    doc = doc_ref.get()
+
+async def get_transaction(transaction_id: str) -> Optional[TransactionResponse]:
+    """Get a single transaction by ID"""
+    doc = await collection.document(transaction_id).get()
 
     if not doc.exists:
-        return False
+        return None
 
-    doc_ref.delete()
-    return True
+    transaction_data = doc.to_dict()
+    return TransactionResponse(id=transaction_id, **transaction_data)
 
 
-# Legacy functions for backward compatibility (remove if not needed)
-def create_transaction_sync(tx: Transaction):
-    """Legacy sync function - deprecated"""
-    doc_ref = collection.document()
-    doc_ref.set(tx.dict())
-    return {"id": doc_ref.id, **tx.dict()}
+# Response fields and the values of optional ones missing from a document
+_RESPONSE_DEFAULTS = {
+    name: None if field.is_required() else field.get_default()
+    for name, field in TransactionResponse.model_fields.items()
+}
+
+
+def response_row(transaction_id: str, transaction_data: dict) -> dict:
+    """A stored transaction as a plain TransactionResponse dict, unvalidated
+
+    Documents are validated when they are written, so large list responses
+    skip building and re-validating a model per row.
+    """
+    row = {
+        name: transaction_data.get(name, default)
+        for name, default in _RESPONSE_DEFAULTS.items()
+    }
+    row["id"] = transaction_id
+    return row
+
 
+def _response_model(transaction_id: str, transaction_data: dict) -> TransactionResponse:
+    return TransactionResponse(id=transaction_id, **transaction_data)
+
+
+def with_converted_amounts(transactions: list, target: str) -> list:
+    """Fill ``converted_amount`` (and a missing ``currency``) in place
+
+    Works on response models and on ``response_row`` dicts alike and converts
+    the whole list in one vectorized pass over the local rate table.
+    """
+    if not transactions:
+        return transactions
+
+    rows = isinstance(transactions[0], dict)
+    fields = [
+        (
+            (row["amount"], row["currency"], row["date"])
+            if rows
+            else (row.amount, row.currency, row.date)
+        )
+        for row in transactions
+    ]
+    amounts, currencies, dates = zip(*fields)
+    converted = fx_service.convert_amounts(amounts, currencies, dates, target)
+
+    for transaction, currency, value in zip(transactions, currencies, converted):
+        currency = currency or DEFAULT_CURRENCY
+        if rows:
+            transaction["currency"] = currency
+            transaction["converted_amount"] = value
+        else:
+            transaction.currency = currency
+            transaction.converted_amount = value
+    return transactions
+
+
+async def iter_with_converted_amounts(
+    transactions: AsyncIterator, target: str, chunk_size: int = CONVERSION_CHUNK_SIZE
+) -> AsyncIterator:
+    """with_converted_amounts over a stream, converting ``chunk_size`` at a time"""
+    chunk = []
+    async for transaction in transactions:
+        chunk.append(transaction)
+        if len(chunk) >= chunk_size:
+            for converted in with_converted_amounts(chunk, target):
+                yield converted
+            chunk = []
+    for converted in with_converted_amounts(chunk, target):
+        yield converted
+
+
+def encode_page_token(
+    transaction: Union[TransactionResponse, dict], sort: str = "date"
+) -> str:
+    """Encode the cursor position after a transaction as an opaque page token"""
+    if isinstance(transaction, dict):
+        value, transaction_id = transaction[sort], transaction["id"]
+    else:
+        value, transaction_id = getattr(transaction, sort), transaction.id
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({sort: value, "id": transaction_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_page_token(page_token: str, sort: str = "date") -> Tuple[Any, str]:
+    """Decode a page token into its (sort value, document id) cursor values"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+        if sort == "date":
+            return datetime.fromisoformat(payload["date"]), payload["id"]
+        return float(payload[sort]), payload["id"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid page token") from exc
+
+
+def plan_user_query(
+    user_id: str,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[Union[str, List[str]]] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: str = "date",
+) -> query_planner.QueryPlan:
+    """Plan which of a user's transaction filters Firestore can evaluate"""
+    return query_planner.plan_transaction_query(
+        user_id,
+        {"type": transaction_type, "category": category},
+        {"date": (start_date, end_date), "amount": (min_amount, max_amount)},
+        order_field=sort,
+    )
+
+
+def build_filtered_query(plan: query_planner.QueryPlan):
+    """Build the unordered Firestore query for the pushed part of a plan"""
+    return plan.apply(collection)
+
+
+def _build_user_query(
+    plan: query_planner.QueryPlan,
+    descending: bool = True,
+    cursor: Optional[Tuple[Any, str]] = None,
+    limit: Optional[int] = None,
+):
+    """Build the ordered Firestore query for the pushed part of a plan"""
+    query = build_filtered_query(plan)
+
+    # Document id breaks ties so cursors are stable
+    direction = "DESCENDING" if descending else "ASCENDING"
+    query = query.order_by(plan.order_field, direction=direction).order_by(
+        FieldPath.document_id(), direction=direction
+    )
+
+    if cursor:
+        cursor_value, cursor_id = cursor
+        query = query.start_after([cursor_value, collection.document(cursor_id)])
+
+    if limit:
+        query = query.limit(limit)
+
+    return query
+
+
+async def iter_user_transactions(
+    user_id: str,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[Union[str, List[str]]] = None,
+    page_token: Optional[str] = None,
+    limit: Optional[int] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: str = "date",
+    descending: bool = True,
+    rows: bool = False,
+) -> AsyncIterator[Union[TransactionResponse, dict]]:
+    """Yield a user's transactions as they arrive from the Firestore stream
+
+    With ``rows`` they are plain dicts built by :func:`response_row`.
+    """
+    build = response_row if rows else _response_model
+    plan = plan_user_query(
+        user_id,
+        transaction_type,
+        start_date,
+        end_date,
+        category,
+        min_amount,
+        max_amount,
+        sort,
+    )
+    cursor = decode_page_token(page_token, sort) if page_token else None
+
+    if not plan.residual or not limit:
+        async for doc in _build_user_query(
+            plan, descending, cursor, None if plan.residual else limit
+        ).stream():
+            data = doc.to_dict()
+            if plan.matches(data):
+                yield build(doc.id, data)
+        return
+
+    # Residual filters: read fixed-size chunks until the page is full
+    remaining = limit
+    while True:
+        fetched = 0
+        query = _build_user_query(plan, descending, cursor, RESIDUAL_CHUNK_SIZE)
+        async for doc in query.stream():
+            fetched += 1
+            data = doc.to_dict()
+            cursor = (data[sort], doc.id)
+            if plan.matches(data):
+                yield build(doc.id, data)
+                remaining -= 1
+                if remaining == 0:
+                    return
+
+        if fetched < RESIDUAL_CHUNK_SIZE:
+            return
+
+
+async def get_user_transactions(
+    user_id: str,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[Union[str, List[str]]] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: str = "date",
+    descending: bool = True,
+    rows: bool = False,
+) -> List[Union[TransactionResponse, dict]]:
+    """Get all transactions for a user with optional filters"""
+    return [
+        transaction
+        async for transaction in iter_user_transactions(
+            user_id,
+            transaction_type,
+            start_date,
+            end_date,
+            category,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            sort=sort,
+            descending=descending,
+            rows=rows,
+        )
+    ]
+
+
+async def get_user_transactions_page(
+    user_id: str,
+    limit: int,
+    page_token: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[Union[str, List[str]]] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: str = "date",
+    descending: bool = True,
+    rows: bool = False,
+) -> Tuple[List[Union[TransactionResponse, dict]], Optional[str]]:
+    """Get one page of a user's transactions and the token for the next page"""
+    # Fetch one extra row to know whether another page exists
+    transactions = [
+        transaction
+        async for transaction in iter_user_transactions(
+            user_id,
+            transaction_type,
+            start_date,
+            end_date,
+            category,
+            page_token,
+            limit + 1,
+            min_amount,
+            max_amount,
+            sort,
+            descending,
+            rows,
+        )
+    ]
+
+    if len(transactions) <= limit:
+        return transactions, None
+
+    transactions = transactions[:limit]
+    return transactions, encode_page_token(transactions[-1], sort)
+
+
+async def iter_user_transaction_pages(
+    user_id: str,
+    page_size: int,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[Union[str, List[str]]] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> AsyncIterator[List[TransactionResponse]]:
+    """Yield a user's full history page by page, holding one page at a time"""
+    page_token = None
+
+    while True:
+        transactions, page_token = await get_user_transactions_page(
+            user_id,
+            limit=page_size,
+            page_token=page_token,
+            transaction_type=transaction_type,
+            start_date=start_date,
+            end_date=end_date,
+            category=category,
+            min_amount=min_amount,
+            max_amount=max_amount,
+        )
+        if transactions:
+            yield transactions
+
+        if page_token is None:
+            return
 
-def get_transactions_sync(user_id: str):
-    """Legacy sync function - deprecated"""
-    docs = collection.where("user_id", "==", user_id).stream()
-    return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
+async def update_transaction(
+    transaction_id: str,
+    transaction_update: TransactionUpdate,
+    user_id: Optional[str] = None,
+) -> Optional[TransactionWriteResponse]:
+    """Update a transaction, optionally checking it belongs to ``user_id``
+
+    Ownership check, write, rollup and budget deltas share one Firestore
+    transaction (begin, get, commit) and the merged document is returned
+    without a second read, with the budget thresholds the update crosses.
+    Returns None when the transaction does not exist, raises PermissionError
+    when it belongs to someone else and ValueError when the new amount is
+    finer than the currency's minor unit or a budget needs a missing rate.
+    """
+    doc_ref = collection.document(transaction_id)
 
-def update_transaction_sync(tx_id: str, tx: Transaction):
-    """Legacy sync function - deprecated"""
-    doc_ref = collection.document(tx_id)
-    doc_ref.update(tx.dict())
-    return {"id": tx_id, **tx.dict()}
+    # Only update fields that are provided (not None)
+    update_data = {k: v for k, v in transaction_update.dict().items() if v is not None}
 
+    async def _update(transaction):
+        snapshot = await doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+
+        current = snapshot.to_dict()
+        if user_id is not None and current.get("user_id") != user_id:
+            raise PermissionError("Not authorized to update this transaction")
+
+        changes = update_data
+        if "amount" in update_data or "currency" in update_data:
+            # Documents without a currency predate it and are in DEFAULT_CURRENCY
+            money_fields = with_money_fields(
+                {**current, **update_data}, DEFAULT_CURRENCY
+            )
+            changes = {
+                **update_data,
+                "currency": money_fields["currency"],
+                "amount_minor": money_fields["amount_minor"],
+            }
+
+        updated = {**current, **changes}
+        alerts = []
+
+        if changes:
+            owner_id = current["user_id"]
+            moved = rollup_service.rollup_fields_changed(current, updated)
+
+            # Reads first: budget counters are read before any write is staged
+            deltas = {}
+            if moved:
+                budgets = await _budgets_for(owner_id, current, updated)
+                deltas = budget_service.spending_deltas(
+                    budgets, [(current, -1), (updated, 1)]
+                )
+                spent = await budget_service.read_spent(deltas, transaction=transaction)
+                alerts = budget_service.crossed_alerts(budgets, deltas, spent)
+
+            writes = changes
+            if search_service.search_fields_changed(changes):
+                # Refresh the search terms from the merged text
+                writes = {
+                    **changes,
+                    query_planner.SEARCH_FIELD: search_service.index_terms(updated),
+                }
+            transaction.update(doc_ref, writes)
+
+            # Move the amount between rollup buckets in the same commit
+            if moved:
+                rollup_service.apply_rollup_delta(transaction, owner_id, current, -1)
+                rollup_service.apply_rollup_delta(transaction, owner_id, updated, 1)
+                budget_service.apply_spending_deltas(transaction, deltas)
+
+            stale = _balance_stale_months(current, updated) or (None, LATEST_MONTH)
+            bump_change_version(
+                transaction,
+                owner_id,
+                stale[0],
+                [updated.get("currency") or DEFAULT_CURRENCY],
+                stale[1],
+            )
+
+        return updated, alerts
+
+    result = await db.run_transaction(_update)
+    if result is None:
+        return None
+
+    transaction_data, alerts = result
+    response = TransactionWriteResponse(
+        id=transaction_id, budget_alerts=alerts, **transaction_data
+    )
+    reporting_currency = await user_service.get_reporting_currency(
+        transaction_data["user_id"]
+    )
+    return with_converted_amounts([response], reporting_currency)[0]
+
+
+async def delete_transaction(
+    transaction_id: str, user_id: Optional[str] = None
+) -> bool:
+    """Delete a transaction, optionally checking it belongs to ``user_id``
+
+    Runs as a single Firestore transaction. Returns False when the transaction
+    does not exist, raises PermissionError when it belongs to someone else
+    and ValueError when a budget it counted towards needs a missing rate.
+    """
+    doc_ref = collection.document(transaction_id)
 
-def delete_transaction_sync(tx_id: str):
-    """Legacy sync function - deprecated"""
-    collection.document(tx_id).delete()
-    return {"id": tx_id, "deleted": True}
+    async def _delete(transaction):
+        snapshot = await doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return False
+
+        current = snapshot.to_dict()
+        if user_id is not None and current.get("user_id") != user_id:
+            raise PermissionError("Not authorized to delete this transaction")
+
+        budgets = await _budgets_for(current["user_id"], current)
+
+        transaction.delete(doc_ref)
+        rollup_service.apply_rollup_delta(transaction, current["user_id"], current, -1)
+        budget_service.apply_spending_deltas(
+            transaction, budget_service.spending_deltas(budgets, [(current, -1)])
+        )
+        bump_change_version(
+            transaction,
+            current["user_id"],
+            rollup_service.month_number(current["date"]),
+        )
+        return True
+
+    return await db.run_transaction(_delete)
+
+
+async def _select_by_filter(plan: query_planner.QueryPlan) -> List[str]:
+    """IDs of the transactions matching a plan, reading only filtered fields"""
+    fields = sorted({field for field, _, _ in plan.residual})
+    ids = []
+    async for doc in build_filtered_query(plan).select(fields).stream():
+        if plan.matches(doc.to_dict()):
+            ids.append(doc.id)
+            if len(ids) > MAX_BATCH_MATCHES:
+                raise ValueError(
+                    f"Filter matches more than {MAX_BATCH_MATCHES} transactions"
+                )
+    return ids
+
+
+async def batch_modify_transactions(
+    user_id: str,
+    action: str,
+    ids: Optional[List[str]] = None,
+    transaction_filter: Optional[TransactionFilter] = None,
+    transaction_update: Optional[TransactionUpdate] = None,
+) -> TransactionBatchResult:
+    """Delete or update many of a user's transactions in a few round trips
+
+    Targets are given either by ``ids`` or by ``transaction_filter``. Every
+    chunk of up to BATCH_CHUNK_SIZE documents is read with one get_all and
+    written with one commit, together with its rollup, budget and change
+    counter deltas, inside a Firestore transaction, so an edit racing the
+    batch is never counted twice. IDs that do not exist or belong to someone
+    else are reported and left untouched; filtered transactions that no
+    longer match when their chunk is read are skipped. Raises ValueError for
+    an invalid request, or for a chunk whose budget counters need a missing
+    exchange rate; chunks committed before it stay committed.
+    """
+    if (ids is None) == (transaction_filter is None):
+        raise ValueError("Select transactions with either ids or filter")
+
+    update_data = {}
+    if action == "update":
+        if transaction_update is not None:
+            update_data = {
+                k: v for k, v in transaction_update.dict().items() if v is not None
+            }
+        if not update_data:
+            raise ValueError("An update needs at least one field to set")
+        if "amount" in update_data:
+            # Check the amount up front against every currency it may land in
+            currencies = (
+                [update_data["currency"]]
+                if "currency" in update_data
+                else await get_user_currencies(user_id)
+            )
+            for currency in currencies:
+                money.to_minor_units(update_data["amount"], currency)
+
+    plan = None
+    if transaction_filter is not None:
+        criteria = transaction_filter.dict()
+        if all(value is None or value == [] for value in criteria.values()):
+            raise ValueError("The filter needs at least one criterion")
+        plan = plan_user_query(
+            user_id,
+            criteria["type"],
+            criteria["start_date"],
+            criteria["end_date"],
+            criteria["category"],
+            criteria["min_amount"],
+            criteria["max_amount"],
+        )
+        ids = await _select_by_filter(plan)
+    else:
+        ids = list(dict.fromkeys(ids))
+
+    budgets = await budget_service.get_user_budgets(user_id)
+
+    async def _modify_chunk(transaction, references):
+        snapshots = {
+            snapshot.id: snapshot
+            async for snapshot in db.get_all(references, transaction=transaction)
+        }
+        outcome = {
+            "matched": 0,
+            "modified": 0,
+            "not_found": [],
+            "forbidden": [],
+            "leftover": [],
+        }
+        changes, stale_months = [], []
+        months, counters, currencies = set(), set(), set()
+        # One write is reserved for the change counter
+        writes = 1
+
+        for index, reference in enumerate(references):
+            snapshot = snapshots.get(reference.id)
+            if snapshot is None or not snapshot.exists:
+                outcome["not_found"].append(reference.id)
+                continue
+
+            current = snapshot.to_dict()
+            if current.get("user_id") != user_id:
+                outcome["forbidden"].append(reference.id)
+                continue
+            if plan is not None and not plan.matches_all(current):
+                continue
+
+            if action == "delete":
+                updated = None
+                row_changes = [(current, -1)]
+                stale = (rollup_service.month_number(current["date"]), LATEST_MONTH)
+            else:
+                row_update = update_data
+                if "amount" in update_data or "currency" in update_data:
+                    money_fields = with_money_fields(
+                        {**current, **update_data}, DEFAULT_CURRENCY
+                    )
+                    row_update = {
+                        **update_data,
+                        "currency": money_fields["currency"],
+                        "amount_minor": money_fields["amount_minor"],
+                    }
+                updated = {**current, **row_update}
+                row_changes = []
+                if rollup_service.rollup_fields_changed(current, updated):
+                    row_changes = [(current, -1), (updated, 1)]
+                stale = _balance_stale_months(current, updated)
+
+            # Leave the rest to the next chunk once the commit would be full
+            new_months = {
+                rollup_service.month_key(data["date"]) for data, _ in row_changes
+            } - months
+            new_counters = (
+                set(budget_service.spending_deltas(budgets, row_changes)) - counters
+            )
+            needed = 1 + len(new_months) + len(new_counters)
+            if writes + needed > MAX_BATCH_WRITES:
+                outcome["leftover"] = references[index:]
+                break
+            writes += needed
+            months |= new_months
+            counters |= new_counters
+
+            if updated is None:
+                transaction.delete(reference)
+            elif search_service.search_fields_changed(update_data):
+                transaction.update(
+                    reference,
+                    {
+                        **row_update,
+                        query_planner.SEARCH_FIELD: search_service.index_terms(updated),
+                    },
+                )
+            else:
+                transaction.update(reference, row_update)
+
+            changes.extend(row_changes)
+            if updated is not None:
+                currencies.add(updated.get("currency") or DEFAULT_CURRENCY)
+            if stale is not None:
+                stale_months.append(stale)
+            outcome["matched"] += 1
+            outcome["modified"] += 1
+
+        if outcome["modified"]:
+            rollup_service.apply_rollup_changes(transaction, user_id, changes)
+            budget_service.apply_spending_deltas(
+                transaction, budget_service.spending_deltas(budgets, changes)
+            )
+            bump_change_version(
+                transaction,
+                user_id,
+                min(first for first, _ in stale_months) if stale_months else None,
+                currencies,
+                max((last for _, last in stale_months), default=LATEST_MONTH),
+            )
+        return outcome
+
+    result = TransactionBatchResult(matched=0, modified=0)
+    pending = [collection.document(transaction_id) for transaction_id in ids]
+    while pending:
+        chunk, pending = pending[:BATCH_CHUNK_SIZE], pending[BATCH_CHUNK_SIZE:]
+        outcome = await db.run_transaction(
+            lambda transaction: _modify_chunk(transaction, chunk)
+        )
+        result.matched += outcome["matched"]
+        result.modified += outcome["modified"]
+        result.not_found.extend(outcome["not_found"])
+        result.forbidden.extend(outcome["forbidden"])
+        pending = outcome["leftover"] + pending
+
+    return result
@@ -1,12 +1,51 @@
 """Service layer for user operations"""
 
+import time
 from datetime import datetime
 from typing import Optional
-from config.firebase import db
+from config.settings import (
+    CACHE_REDIS_URL,
+    DEFAULT_CURRENCY,
+    PROFILE_CACHE_SIZE,
+    PROFILE_CACHE_TTL_SECONDS,
+)
+from storage import db
 from models.user import User, UserResponse, UserUpdate
+from services import rollup_service, transaction_service
+from utils.cache import create_cache
+from utils.metrics import REGISTRY
 
 users_collection = db.collection("users")
 
+# Profiles almost never change; cache them as JSON, shared when Redis is set
+profile_cache = create_cache(
+    "profiles", PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL_SECONDS, CACHE_REDIS_URL
+)
+
+# Cumulative get_user_profile latency split by cache outcome
+_profile_latency = {"hit": [0, 0.0], "miss": [0, 0.0]}
+
+
+def _record_profile_latency(outcome: str, started: float) -> None:
+    """Add one get_user_profile call to the latency counters"""
+    counter = _profile_latency[outcome]
+    counter[0] += 1
+    counter[1] += time.perf_counter() - started
+
+
+def profile_cache_stats() -> dict:
+    """Hit ratio and mean lookup latency of the profile cache"""
+    return {
+        **profile_cache.stats(),
+        **{
+            f"{outcome}_latency_ms": (total / count * 1000) if count else 0.0
+            for outcome, (count, total) in _profile_latency.items()
+        },
+    }
+
+
+REGISTRY.register_cache("user_profile", profile_cache_stats)
+
 
 async def create_user_profile(
     user_id: str, email: str, name: Optional[str] = None
@@ -14,21 +53,48 @@ async def create_user_profile(
     """Create user profile in Firestore"""
     user_data = {"email": email, "name": name, "created_at": datetime.now()}
 
-    # Store in Firestore with the Firebase Auth UID as document ID
-    users_collection.document(user_id).set(user_data)
+    # Store in Firestore with the Firebase Auth UID as document ID; a new user
+    # has no history, so their (empty) monthly rollups and recorded
+    # currencies are complete from day one
+    batch = db.batch()
+    batch.set(users_collection.document(user_id), user_data)
+    await rollup_service.mark_rollups_complete(user_id, writer=batch)
+    transaction_service.mark_currencies_complete(batch, user_id)
+    await batch.commit()
+    await profile_cache.delete(user_id)
 
     return User(**user_data)
 
 
 async def get_user_profile(user_id: str) -> Optional[UserResponse]:
-    """Get user profile by ID"""
-    doc = users_collection.document(user_id).get()
+    """Get user profile by ID (read-through cached)"""
+    started = time.perf_counter()
+
+    cached_profile = await profile_cache.get(user_id)
+    if cached_profile is not None:
+        profile = UserResponse.model_validate_json(cached_profile)
+        _record_profile_latency("hit", started)
+        return profile
+
+    doc = await users_collection.document(user_id).get()
 
     if not doc.exists:
+        _record_profile_latency("miss", started)
         return None
 
     user_data = doc.to_dict()
-    return UserResponse(id=user_id, **user_data)
+    profile = UserResponse(id=user_id, **user_data)
+    await profile_cache.set(user_id, profile.json())
+    _record_profile_latency("miss", started)
+    return profile
+
+
+async def get_reporting_currency(user_id: str) -> str:
+    """Currency the user's summaries and lists are converted to"""
+    profile = await get_user_profile(user_id)
+    if profile is None or not profile.reporting_currency:
+        return DEFAULT_CURRENCY
+    return profile.reporting_currency
 
 
 async def update_user_profile(
@@ -36,7 +102,7 @@ async def update_user_profile(
 ) -> Optional[UserResponse]:
     """Update user profile"""
     doc_ref = users_collection.document(user_id)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
 
     if not doc.exists:
         return None
@@ -45,10 +111,11 @@ async def update_user_profile(
     update_data = {k: v for k, v in user_update.dict().items() if v is not None}
 
     if update_data:
-        doc_ref.update(update_data)
+        await doc_ref.update(update_data)
+        await profile_cache.delete(user_id)
 
     # Return updated user
-    updated_doc = doc_ref.get()
+    updated_doc = await doc_ref.get()
     user_data = updated_doc.to_dict()
     return UserResponse(id=user_id, **user_data)
 
@@ -56,10 +123,11 @@ async def update_user_profile(
 async def delete_user_profile(user_id: str) -> bool:
     """Delete user profile"""
     doc_ref = users_collection.document(user_id)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
 
     if not doc.exists:
         return False
 
-    doc_ref.delete()
+    await doc_ref.delete()
+    await profile_cache.delete(user_id)
     return True
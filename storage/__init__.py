@@ -0,0 +1,45 @@
+"""Pluggable document storage backends selected by STORAGE_BACKEND"""
+
+from config.firebase import create_firestore_client, create_firestore_listener_client
+from config.settings import SQLITE_PATH, STORAGE_BACKEND
+from .base import (
+    CHANGE_ADDED,
+    CHANGE_MODIFIED,
+    CHANGE_REMOVED,
+    DocumentStore,
+    MAX_BATCH_WRITES,
+)
+from .firestore import FirestoreDocumentStore
+from .instrumented import InstrumentedDocumentStore
+from .memory import MemoryDocumentStore
+from .sqlite import SQLiteDocumentStore
+
+
+def create_store(backend: str = STORAGE_BACKEND) -> DocumentStore:
+    """Build the configured storage backend"""
+    if backend == "firestore":
+        return FirestoreDocumentStore(
+            create_firestore_client(), create_firestore_listener_client
+        )
+
+    if backend == "memory":
+        return MemoryDocumentStore()
+
+    if backend == "sqlite":
+        return SQLiteDocumentStore(SQLITE_PATH)
+
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# Every backend is wrapped so storage calls feed the /metrics endpoint
+db = InstrumentedDocumentStore(create_store())
+
+__all__ = [
+    "db",
+    "create_store",
+    "DocumentStore",
+    "MAX_BATCH_WRITES",
+    "CHANGE_ADDED",
+    "CHANGE_MODIFIED",
+    "CHANGE_REMOVED",
+]
@@ -0,0 +1,60 @@
+"""Storage backend interface used by the service layer"""
+
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Tuple
+
+# Firestore accepts at most 500 writes per batch or transaction commit
+MAX_BATCH_WRITES = 500
+
+# Change kinds delivered to ``listen`` callbacks
+CHANGE_ADDED = "added"
+CHANGE_MODIFIED = "modified"
+CHANGE_REMOVED = "removed"
+
+# Receives (change kind, document snapshot) pairs; removals carry the old data
+ChangeCallback = Callable[[List[Tuple[str, Any]]], None]
+
+
+class DocumentStore(ABC):
+    """Async document database with the Firestore data model
+
+    Services only talk to this interface: collection and document references,
+    queries, write batches and transactions behave like the async Firestore
+    client, so every backend serves the same service code.
+    """
+
+    @abstractmethod
+    def collection(self, path: str):
+        """Reference to a (possibly nested) collection"""
+
+    @abstractmethod
+    def batch(self):
+        """New write batch committed atomically with ``await batch.commit()``"""
+
+    @abstractmethod
+    async def run_transaction(self, callback: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run ``callback(transaction)`` atomically and return its result
+
+        Writes staged on the transaction are committed when the callback
+        returns; an exception raised by the callback discards them.
+        """
+
+    @abstractmethod
+    def get_all(self, references: Iterable, transaction=None) -> AsyncIterator:
+        """Fetch many documents in one round trip, optionally inside a transaction"""
+
+    @abstractmethod
+    def listen(
+        self,
+        collection_path: str,
+        field_path: str,
+        value: Any,
+        callback: ChangeCallback,
+    ) -> Callable[[], None]:
+        """Watch the documents of a collection whose ``field_path`` equals ``value``
+
+        Must be called from the event loop, where ``callback`` is then invoked.
+        Its first call lists the documents matching at registration time as
+        added; later calls carry only what changed. Returns a function that
+        stops listening.
+        """
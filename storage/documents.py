@@ -0,0 +1,800 @@
+"""Firestore-compatible document model shared by the local storage backends
+
+Implements the subset of the async Firestore API the service layer uses
+(references, filtered and ordered queries, cursors, projections, aggregations,
+write batches, transactions and field transforms) on top of three backend
+hooks: read one document, scan a collection and persist a set of changes.
+
+Values are normalized the way Firestore returns them, so datetimes always
+come back timezone-aware in UTC.
+"""
+
+import asyncio
+import contextvars
+import copy
+import uuid
+from abc import abstractmethod
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import dropwhile, islice
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore import (
+    DELETE_FIELD,
+    SERVER_TIMESTAMP,
+    ArrayRemove,
+    ArrayUnion,
+    Increment,
+    Maximum,
+    Minimum,
+)
+from storage.base import (
+    CHANGE_ADDED,
+    CHANGE_MODIFIED,
+    CHANGE_REMOVED,
+    ChangeCallback,
+    DocumentStore,
+)
+
+DOCUMENT_ID = "__name__"
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+# Local backends keep a secondary index on (user_id, date, document id)
+INDEXED_EQUALITY_FIELD = "user_id"
+INDEXED_ORDER_FIELD = "date"
+
+_MISSING = object()
+
+
+class Write(NamedTuple):
+    """A staged write: set, create, update or delete"""
+
+    kind: str
+    path: str
+    data: Optional[dict] = None
+    merge: bool = False
+
+
+def normalize_value(value: Any) -> Any:
+    """Store datetimes as timezone-aware UTC, like Firestore timestamps"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(item) for item in value]
+    return value
+
+
+def get_field(data: dict, field_path: str) -> Any:
+    """Value at a dotted field path, or _MISSING"""
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def copy_document(data: dict) -> dict:
+    """Copy a stored document so callers cannot mutate the store"""
+    return {
+        key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        for key, value in data.items()
+    }
+
+
+def _resolve(existing: Any, value: Any) -> Any:
+    """Apply a field transform (Increment, Minimum, ArrayUnion, ...) to a value"""
+    if isinstance(value, Increment):
+        is_number = isinstance(existing, (int, float)) and not isinstance(
+            existing, bool
+        )
+        return (existing if is_number else 0) + value.value
+    if isinstance(value, (Maximum, Minimum)):
+        is_number = isinstance(existing, (int, float)) and not isinstance(
+            existing, bool
+        )
+        if not is_number:
+            return value.value
+        pick = max if isinstance(value, Maximum) else min
+        return pick(existing, value.value)
+    if isinstance(value, ArrayUnion):
+        result = list(existing) if isinstance(existing, list) else []
+        result.extend(item for item in value.values if item not in result)
+        return normalize_value(result)
+    if isinstance(value, ArrayRemove):
+        result = list(existing) if isinstance(existing, list) else []
+        return [item for item in result if item not in value.values]
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, dict):
+        return {
+            key: _resolve(None, item)
+            for key, item in value.items()
+            if item is not DELETE_FIELD
+        }
+    return normalize_value(value)
+
+
+def _merge(existing: dict, updates: dict) -> dict:
+    """Deep-merge ``updates`` into a copy of ``existing`` (set with merge=True)"""
+    result = dict(existing)
+    for key, value in updates.items():
+        if value is DELETE_FIELD:
+            result.pop(key, None)
+        elif isinstance(value, dict):
+            current = result.get(key)
+            result[key] = _merge(current if isinstance(current, dict) else {}, value)
+        else:
+            result[key] = _resolve(result.get(key), value)
+    return result
+
+
+def _update(existing: dict, updates: dict) -> dict:
+    """Apply field-path updates to a copy of ``existing``"""
+    result = dict(existing)
+    for field_path, value in updates.items():
+        *parents, leaf = field_path.split(".")
+        target = result
+        for part in parents:
+            child = target.get(part)
+            child = dict(child) if isinstance(child, dict) else {}
+            target[part] = child
+            target = child
+
+        if value is DELETE_FIELD:
+            target.pop(leaf, None)
+        else:
+            target[leaf] = _resolve(target.get(leaf), value)
+    return result
+
+
+def apply_write(existing: Optional[dict], write: Write) -> Optional[dict]:
+    """New document state after a write (None means deleted)"""
+    if write.kind == "delete":
+        return None
+    if write.kind == "create":
+        if existing is not None:
+            raise AlreadyExists(f"Document already exists: {write.path}")
+        return _resolve(None, write.data)
+    if write.kind == "update":
+        if existing is None:
+            raise NotFound(f"No document to update: {write.path}")
+        return _update(existing, write.data)
+    if write.merge and existing is not None:
+        return _merge(existing, write.data)
+    return _resolve(None, write.data)
+
+
+def _type_rank(value: Any) -> int:
+    """Firestore's cross-type ordering: null < bool < number < timestamp < string"""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, DocumentReference):
+        return 6
+    if isinstance(value, list):
+        return 8
+    return 9
+
+
+def sort_key(value: Any) -> tuple:
+    """Totally ordered key for any stored value"""
+    if isinstance(value, DocumentReference):
+        return (6, value.path)
+    rank = _type_rank(value)
+    if rank >= 8:
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def _compare(actual: Any, op: str, expected: Any) -> bool:
+    """Evaluate one filter against a present field value"""
+    if op == "==":
+        return _type_rank(actual) == _type_rank(expected) and actual == expected
+    if op == "!=":
+        return actual is not None and actual != expected
+    if op == "in":
+        return actual in expected
+    if op == "not-in":
+        return actual is not None and actual not in expected
+    if op == "array_contains":
+        return isinstance(actual, list) and expected in actual
+    if op == "array_contains_any":
+        return isinstance(actual, list) and any(item in actual for item in expected)
+
+    # Range comparisons only match values of the same type
+    if _type_rank(actual) != _type_rank(expected):
+        return False
+    if op == "<":
+        return actual < expected
+    if op == "<=":
+        return actual <= expected
+    if op == ">":
+        return actual > expected
+    if op == ">=":
+        return actual >= expected
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+OPERATORS = {
+    "==",
+    "!=",
+    "<",
+    "<=",
+    ">",
+    ">=",
+    "in",
+    "not-in",
+    "array_contains",
+    "array_contains_any",
+}
+
+
+class DocumentSnapshot:
+    """Point-in-time read of a document"""
+
+    def __init__(self, reference: "DocumentReference", data: Optional[dict]):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return None if self._data is None else copy_document(self._data)
+
+    def get(self, field_path: str) -> Any:
+        value = get_field(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class DocumentReference:
+    """Reference to a document at ``collection/.../document`` path"""
+
+    def __init__(self, store: "LocalDocumentStore", path: str):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    @property
+    def parent(self) -> "CollectionReference":
+        return CollectionReference(self._store, self.path.rsplit("/", 1)[0])
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._store, f"{self.path}/{name}")
+
+    async def get(self, field_paths=None, transaction=None) -> DocumentSnapshot:
+        return DocumentSnapshot(self, self._store.read_document(self.path))
+
+    async def set(self, document_data: dict, merge: bool = False) -> None:
+        self._store.commit_writes([Write("set", self.path, document_data, merge)])
+
+    async def create(self, document_data: dict) -> None:
+        self._store.commit_writes([Write("create", self.path, document_data)])
+
+    async def update(self, field_updates: dict) -> None:
+        self._store.commit_writes([Write("update", self.path, field_updates)])
+
+    async def delete(self) -> None:
+        self._store.commit_writes([Write("delete", self.path)])
+
+
+class Query:
+    """Immutable query over one collection"""
+
+    def __init__(
+        self,
+        store: "LocalDocumentStore",
+        collection_path: str,
+        filters: Tuple[tuple, ...] = (),
+        orders: Tuple[tuple, ...] = (),
+        cursor: Optional[list] = None,
+        limit_count: Optional[int] = None,
+        projection: Optional[List[str]] = None,
+    ):
+        self._store = store
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._cursor = cursor
+        self._limit = limit_count
+        self._projection = projection
+
+    def _copy(self, **changes) -> "Query":
+        state = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "cursor": self._cursor,
+            "limit_count": self._limit,
+            "projection": self._projection,
+        }
+        state.update(changes)
+        return Query(self._store, self._collection_path, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = (
+                filter.field_path,
+                filter.op_string,
+                filter.value,
+            )
+        if op_string not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op_string}")
+        if isinstance(value, DocumentReference):
+            value = value.id
+        condition = (str(field_path), op_string, normalize_value(value))
+        return self._copy(filters=self._filters + (condition,))
+
+    def order_by(self, field_path, direction: str = ASCENDING) -> "Query":
+        return self._copy(orders=self._orders + ((str(field_path), direction),))
+
+    def start_after(self, document_fields_or_snapshot) -> "Query":
+        if isinstance(document_fields_or_snapshot, DocumentSnapshot):
+            snapshot = document_fields_or_snapshot
+            orders = self._orders
+            if not any(field == DOCUMENT_ID for field, _ in orders):
+                direction = orders[-1][1] if orders else ASCENDING
+                orders = orders + ((DOCUMENT_ID, direction),)
+            values = [
+                (
+                    snapshot.id
+                    if field == DOCUMENT_ID
+                    else get_field(snapshot.to_dict(), field)
+                )
+                for field, _ in orders
+            ]
+            return self._copy(orders=orders, cursor=values)
+
+        if isinstance(document_fields_or_snapshot, dict):
+            values = [
+                document_fields_or_snapshot.get(field) for field, _ in self._orders
+            ]
+        else:
+            values = list(document_fields_or_snapshot)
+
+        values = [
+            value.id if isinstance(value, DocumentReference) else normalize_value(value)
+            for value in values
+        ]
+        return self._copy(cursor=values)
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit_count=count)
+
+    def select(self, field_paths: Iterable[str]) -> "Query":
+        return self._copy(projection=list(field_paths))
+
+    def count(self, alias: Optional[str] = None) -> "AggregationQuery":
+        return AggregationQuery(self).count(alias)
+
+    def sum(self, field_path: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return AggregationQuery(self).sum(field_path, alias)
+
+    def avg(self, field_path: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return AggregationQuery(self).avg(field_path, alias)
+
+    def _project(self, data: dict) -> dict:
+        if self._projection is None:
+            return copy_document(data)
+
+        projected: Dict[str, Any] = {}
+        for field_path in self._projection:
+            value = get_field(data, field_path)
+            if value is _MISSING:
+                continue
+            *parents, leaf = field_path.split(".")
+            target = projected
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = copy.deepcopy(value)
+        return projected
+
+    async def stream(self, transaction=None) -> AsyncIterator[DocumentSnapshot]:
+        for doc_id, data in self._store.run_query(self):
+            reference = DocumentReference(
+                self._store, f"{self._collection_path}/{doc_id}"
+            )
+            yield DocumentSnapshot(reference, self._project(data))
+
+    async def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return [snapshot async for snapshot in self.stream()]
+
+
+class CollectionReference(Query):
+    """Reference to a collection; also the unfiltered query over it"""
+
+    def __init__(self, store: "LocalDocumentStore", path: str):
+        super().__init__(store, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        document_id = document_id or uuid.uuid4().hex[:20]
+        return DocumentReference(self._store, f"{self._collection_path}/{document_id}")
+
+    async def add(self, document_data: dict) -> Tuple[None, DocumentReference]:
+        reference = self.document()
+        await reference.create(document_data)
+        return None, reference
+
+
+class AggregationResult(NamedTuple):
+    """One aggregated value"""
+
+    alias: str
+    value: Any
+
+
+class AggregationQuery:
+    """count/sum/avg computed over a query in a single pass"""
+
+    def __init__(self, query: Query):
+        self._query = query
+        self._aggregations: List[Tuple[str, Optional[str], str]] = []
+
+    def _add(self, kind: str, field_path: Optional[str], alias: Optional[str]):
+        alias = alias or f"field_{len(self._aggregations) + 1}"
+        self._aggregations.append((kind, field_path, alias))
+        return self
+
+    def count(self, alias: Optional[str] = None) -> "AggregationQuery":
+        return self._add("count", None, alias)
+
+    def sum(self, field_path: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return self._add("sum", field_path, alias)
+
+    def avg(self, field_path: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return self._add("avg", field_path, alias)
+
+    async def get(self, transaction=None) -> List[List[AggregationResult]]:
+        count = 0
+        totals: Dict[str, float] = {}
+        numeric_counts: Dict[str, int] = {}
+
+        for _, data in self._query._store.run_query(self._query):
+            count += 1
+            for kind, field_path, _ in self._aggregations:
+                if kind == "count":
+                    continue
+                value = get_field(data, field_path)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[field_path] = totals.get(field_path, 0) + value
+                    numeric_counts[field_path] = numeric_counts.get(field_path, 0) + 1
+
+        results = []
+        for kind, field_path, alias in self._aggregations:
+            if kind == "count":
+                value = count
+            elif kind == "sum":
+                value = totals.get(field_path, 0)
+            else:
+                matched = numeric_counts.get(field_path, 0)
+                value = totals[field_path] / matched if matched else None
+            results.append(AggregationResult(alias, value))
+        return [results]
+
+
+class WriteBatch:
+    """Writes applied atomically on commit"""
+
+    def __init__(self, store: "LocalDocumentStore"):
+        self._store = store
+        self._writes: List[Write] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(
+        self, reference: DocumentReference, document_data: dict, merge: bool = False
+    ):
+        self._writes.append(Write("set", reference.path, document_data, merge))
+
+    def create(self, reference: DocumentReference, document_data: dict):
+        self._writes.append(Write("create", reference.path, document_data))
+
+    def update(self, reference: DocumentReference, field_updates: dict):
+        self._writes.append(Write("update", reference.path, field_updates))
+
+    def delete(self, reference: DocumentReference):
+        self._writes.append(Write("delete", reference.path))
+
+    async def commit(self) -> list:
+        writes, self._writes = self._writes, []
+        self._store.commit_writes(writes)
+        return writes
+
+
+class Transaction(WriteBatch):
+    """Write batch whose reads are serialized with other transactions"""
+
+
+class _Listener(NamedTuple):
+    """A ``listen`` registration"""
+
+    field_path: str
+    value: Any
+    callback: ChangeCallback
+    loop: asyncio.AbstractEventLoop
+
+
+class LocalDocumentStore(DocumentStore):
+    """Base class for backends that evaluate Firestore queries locally
+
+    Subclasses provide ``read_raw``, ``persist`` and ``scan``; query planning,
+    filtering, ordering, cursors and atomic multi-document writes live here.
+    Listeners see the writes committed through this store object, i.e. by
+    this process.
+    """
+
+    def __init__(self):
+        self._transaction_lock = asyncio.Lock()
+        self._listeners: Dict[str, List[_Listener]] = defaultdict(list)
+
+    def collection(self, path: str) -> CollectionReference:
+        return CollectionReference(self, path)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    async def run_transaction(self, callback: Callable[[Any], Awaitable[Any]]) -> Any:
+        async with self._transaction_lock:
+            transaction = Transaction(self)
+            result = await callback(transaction)
+            await transaction.commit()
+            return result
+
+    async def get_all(
+        self, references: Iterable, transaction=None
+    ) -> AsyncIterator[DocumentSnapshot]:
+        # Transactions hold the store-wide lock, so plain reads are isolated
+        for reference in references:
+            yield await reference.get()
+
+    def listen(
+        self,
+        collection_path: str,
+        field_path: str,
+        value: Any,
+        callback: ChangeCallback,
+    ) -> Callable[[], None]:
+        listener = _Listener(
+            field_path, normalize_value(value), callback, asyncio.get_running_loop()
+        )
+        query = CollectionReference(self, collection_path).where(
+            field_path, "==", value
+        )
+        initial = [
+            (CHANGE_ADDED, DocumentSnapshot(DocumentReference(self, path), data))
+            for path, data in (
+                (f"{collection_path}/{doc_id}", data)
+                for doc_id, data in self.run_query(query)
+            )
+        ]
+        self._listeners[collection_path].append(listener)
+        listener.loop.call_soon(callback, initial, context=contextvars.Context())
+
+        def unsubscribe() -> None:
+            listeners = self._listeners.get(collection_path, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners:
+                self._listeners.pop(collection_path, None)
+
+        return unsubscribe
+
+    # Backend hooks
+
+    @abstractmethod
+    def read_raw(self, path: str) -> Optional[dict]:
+        """Stored data of one document (not copied) or None"""
+
+    @abstractmethod
+    def persist(self, changes: Dict[str, Optional[dict]]) -> None:
+        """Atomically store new document states (None deletes)"""
+
+    @abstractmethod
+    def scan(
+        self,
+        collection_path: str,
+        user_id: Optional[str] = None,
+        date_range: Optional[Tuple[Optional[datetime], Optional[datetime]]] = None,
+        descending: bool = False,
+    ) -> Iterator[Tuple[str, dict]]:
+        """Candidate documents of a collection
+
+        With ``user_id`` only documents whose ``user_id`` equals it are
+        returned. With ``date_range`` (inclusive bounds, either may be None)
+        only documents with a ``date`` in range are returned, ordered by
+        (date, document id) ascending or descending.
+        """
+
+    # Shared engine
+
+    def read_document(self, path: str) -> Optional[dict]:
+        data = self.read_raw(path)
+        return None if data is None else copy_document(data)
+
+    def commit_writes(self, writes: List[Write]) -> None:
+        """Apply writes all-or-nothing, in order"""
+        staged: Dict[str, Optional[dict]] = {}
+        previous: Dict[str, Optional[dict]] = {}
+        for write in writes:
+            if write.path in staged:
+                existing = staged[write.path]
+            else:
+                existing = previous[write.path] = self.read_raw(write.path)
+            staged[write.path] = apply_write(existing, write)
+        self.persist(staged)
+        if self._listeners:
+            self._notify_listeners(previous, staged)
+
+    def _notify_listeners(
+        self, previous: Dict[str, Optional[dict]], staged: Dict[str, Optional[dict]]
+    ) -> None:
+        """Queue each listener's changes from one commit as a single call"""
+        changes: Dict[_Listener, list] = defaultdict(list)
+        for path, data in staged.items():
+            listeners = self._listeners.get(path.rsplit("/", 1)[0])
+            if not listeners:
+                continue
+            before = previous[path]
+            for listener in listeners:
+                was = (
+                    before is not None
+                    and get_field(before, listener.field_path) == listener.value
+                )
+                now = (
+                    data is not None
+                    and get_field(data, listener.field_path) == listener.value
+                )
+                reference = DocumentReference(self, path)
+                if now:
+                    kind = CHANGE_MODIFIED if was else CHANGE_ADDED
+                    changes[listener].append((kind, DocumentSnapshot(reference, data)))
+                elif was:
+                    changes[listener].append(
+                        (CHANGE_REMOVED, DocumentSnapshot(reference, before))
+                    )
+
+        # Delivered outside the writer's context, like Firestore's listener thread
+        for listener, events in changes.items():
+            listener.loop.call_soon_threadsafe(
+                listener.callback, events, context=contextvars.Context()
+            )
+
+    @staticmethod
+    def _plan(query: Query):
+        """Pick the (user_id, date) index when the query can use it"""
+        user_id = None
+        lower = upper = None
+        for field_path, op, value in query._filters:
+            if (
+                field_path == INDEXED_EQUALITY_FIELD
+                and op == "=="
+                and isinstance(value, str)
+            ):
+                user_id = value
+            elif field_path == INDEXED_ORDER_FIELD and isinstance(value, datetime):
+                if op in (">", ">=", "=="):
+                    lower = value if lower is None else max(lower, value)
+                if op in ("<", "<=", "=="):
+                    upper = value if upper is None else min(upper, value)
+
+        orders = query._orders
+        date_direction = None
+        if orders and orders[0][0] == INDEXED_ORDER_FIELD:
+            date_direction = orders[0][1]
+
+        uses_date_index = user_id is not None and (
+            date_direction is not None
+            or (not orders and (lower is not None or upper is not None))
+        )
+        presorted = uses_date_index and all(
+            order == (DOCUMENT_ID, date_direction or ASCENDING) for order in orders[1:]
+        )
+        date_range = (lower, upper) if uses_date_index else None
+        return user_id, date_range, date_direction == DESCENDING, presorted
+
+    @staticmethod
+    def _matches(doc_id: str, data: dict, filters: Tuple[tuple, ...]) -> bool:
+        for field_path, op, value in filters:
+            actual = (
+                doc_id if field_path == DOCUMENT_ID else get_field(data, field_path)
+            )
+            if actual is _MISSING or not _compare(actual, op, value):
+                return False
+        return True
+
+    @staticmethod
+    def _order_values(doc_id: str, data: dict, orders) -> list:
+        return [
+            doc_id if field_path == DOCUMENT_ID else get_field(data, field_path)
+            for field_path, _ in orders
+        ]
+
+    def run_query(self, query: Query) -> Iterator[Tuple[str, dict]]:
+        """Evaluate a query, streaming when the index already yields its order"""
+        user_id, date_range, descending, presorted = self._plan(query)
+        candidates = self.scan(query._collection_path, user_id, date_range, descending)
+        matches = (
+            (doc_id, data)
+            for doc_id, data in candidates
+            if self._matches(doc_id, data, query._filters)
+        )
+
+        orders = query._orders
+        if presorted:
+            orders = orders or ((INDEXED_ORDER_FIELD, ASCENDING),)
+        else:
+            if not orders and (query._cursor is not None or query._limit is not None):
+                orders = ((DOCUMENT_ID, ASCENDING),)
+
+            if orders:
+                # Documents missing an ordered field are excluded, like Firestore
+                rows = [
+                    (doc_id, data)
+                    for doc_id, data in matches
+                    if _MISSING not in self._order_values(doc_id, data, orders)
+                ]
+                for field_path, direction in reversed(orders):
+                    rows.sort(
+                        key=lambda row, f=field_path: sort_key(
+                            row[0] if f == DOCUMENT_ID else get_field(row[1], f)
+                        ),
+                        reverse=direction == DESCENDING,
+                    )
+                matches = iter(rows)
+
+        if query._cursor is not None:
+            cursor = [sort_key(value) for value in query._cursor]
+
+            def not_after_cursor(row) -> bool:
+                values = self._order_values(row[0], row[1], orders)
+                for (_, direction), value, bound in zip(orders, values, cursor):
+                    key = sort_key(value)
+                    if key != bound:
+                        return (key < bound) != (direction == DESCENDING)
+                return True
+
+            matches = dropwhile(not_after_cursor, matches)
+
+        if query._limit is not None:
+            matches = islice(matches, query._limit)
+
+        return matches
@@ -0,0 +1,59 @@
+"""Google Cloud Firestore storage backend"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+from google.cloud.firestore import async_transactional
+from google.cloud.firestore_v1.base_query import FieldFilter
+from storage.base import DocumentStore, ChangeCallback
+
+
+class FirestoreDocumentStore(DocumentStore):
+    """DocumentStore backed by the async Firestore client
+
+    Snapshot listeners only exist on the synchronous client, so one is
+    created from ``listener_client_factory`` the first time ``listen`` runs.
+    """
+
+    def __init__(self, client, listener_client_factory: Optional[Callable] = None):
+        self.client = client
+        self._listener_client_factory = listener_client_factory
+        self._listener_client = None
+
+    def collection(self, path: str):
+        return self.client.collection(path)
+
+    def batch(self):
+        return self.client.batch()
+
+    async def run_transaction(self, callback: Callable[[Any], Awaitable[Any]]) -> Any:
+        # async_transactional retries the callback on contention
+        return await async_transactional(callback)(self.client.transaction())
+
+    def get_all(self, references: Iterable, transaction=None) -> AsyncIterator:
+        return self.client.get_all(list(references), transaction=transaction)
+
+    def listen(
+        self,
+        collection_path: str,
+        field_path: str,
+        value: Any,
+        callback: ChangeCallback,
+    ) -> Callable[[], None]:
+        if self._listener_client is None:
+            if self._listener_client_factory is None:
+                raise NotImplementedError("No client available for snapshot listeners")
+            self._listener_client = self._listener_client_factory()
+
+        loop = asyncio.get_running_loop()
+
+        def on_snapshot(_documents, changes, _read_time):
+            # Runs on the listener's thread; hand the changes to the event loop
+            events = [(change.type.name.lower(), change.document) for change in changes]
+            loop.call_soon_threadsafe(callback, events)
+
+        watch = (
+            self._listener_client.collection(collection_path)
+            .where(filter=FieldFilter(field_path, "==", value))
+            .on_snapshot(on_snapshot)
+        )
+        return watch.unsubscribe
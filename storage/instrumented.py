@@ -0,0 +1,240 @@
+"""Storage wrapper that counts and times every round trip
+
+Wraps any DocumentStore (Firestore or local) so reads, writes and round trips
+are recorded in the metrics registry and attributed to the current request.
+Builders such as ``where`` or ``document`` are passed through untouched; only
+calls that reach the database are timed. Wrapped references are unwrapped
+before they are handed back to the underlying client.
+"""
+
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+from storage.base import ChangeCallback, DocumentStore
+from utils.metrics import record_storage_call, storage_documents
+
+_QUERY_BUILDERS = {
+    "where",
+    "order_by",
+    "start_after",
+    "start_at",
+    "end_before",
+    "end_at",
+    "limit",
+    "limit_to_last",
+    "offset",
+    "select",
+}
+_AGGREGATIONS = {"count", "sum", "avg"}
+
+
+def unwrap(value: Any) -> Any:
+    """Underlying client object of a wrapped reference, query or transaction"""
+    if isinstance(value, _Proxy):
+        return value.target
+    if isinstance(value, (list, tuple)):
+        return type(value)(unwrap(item) for item in value)
+    return value
+
+
+class _Proxy:
+    """Delegates everything that is not instrumented to the wrapped object"""
+
+    def __init__(self, target: Any):
+        self.target = target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.target, name)
+
+
+class InstrumentedQuery(_Proxy):
+    """Query whose stream/get calls are counted"""
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.target, name)
+        if name in _QUERY_BUILDERS:
+            return lambda *args, **kwargs: InstrumentedQuery(
+                attribute(*unwrap(args), **kwargs)
+            )
+        if name in _AGGREGATIONS:
+            return lambda *args, **kwargs: InstrumentedAggregation(
+                attribute(*args, **kwargs)
+            )
+        return attribute
+
+    async def stream(self, transaction=None) -> AsyncIterator:
+        started = time.perf_counter()
+        reads = 0
+        try:
+            async for snapshot in self.target.stream(transaction=unwrap(transaction)):
+                reads += 1
+                yield snapshot
+        finally:
+            record_storage_call("query", time.perf_counter() - started, reads=reads)
+
+    async def get(self, transaction=None) -> list:
+        return [snapshot async for snapshot in self.stream(transaction)]
+
+
+class InstrumentedAggregation(_Proxy):
+    """Aggregation query whose get call is counted"""
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.target, name)
+        if name in _AGGREGATIONS:
+            return lambda *args, **kwargs: InstrumentedAggregation(
+                attribute(*args, **kwargs)
+            )
+        return attribute
+
+    async def get(self, transaction=None) -> list:
+        started = time.perf_counter()
+        try:
+            return await self.target.get(transaction=unwrap(transaction))
+        finally:
+            # Billed as one read per batch of up to 1000 index entries
+            record_storage_call("aggregate", time.perf_counter() - started, reads=1)
+
+
+class InstrumentedCollection(InstrumentedQuery):
+    """Collection reference that hands out instrumented documents"""
+
+    def document(self, *args, **kwargs) -> "InstrumentedDocument":
+        return InstrumentedDocument(self.target.document(*args, **kwargs))
+
+
+class InstrumentedDocument(_Proxy):
+    """Document reference whose reads and writes are counted"""
+
+    def collection(self, name: str) -> InstrumentedCollection:
+        return InstrumentedCollection(self.target.collection(name))
+
+    async def _call(self, operation: str, method: str, *args, **kwargs):
+        started = time.perf_counter()
+        reads = 1 if operation == "get" else 0
+        try:
+            return await getattr(self.target, method)(*args, **kwargs)
+        finally:
+            record_storage_call(
+                operation,
+                time.perf_counter() - started,
+                reads=reads,
+                writes=1 - reads,
+            )
+
+    async def get(self, field_paths=None, transaction=None):
+        return await self._call(
+            "get", "get", field_paths=field_paths, transaction=unwrap(transaction)
+        )
+
+    async def set(self, document_data: dict, merge: bool = False):
+        return await self._call("set", "set", document_data, merge=merge)
+
+    async def create(self, document_data: dict):
+        return await self._call("create", "create", document_data)
+
+    async def update(self, field_updates: dict, *args, **kwargs):
+        return await self._call("update", "update", field_updates, *args, **kwargs)
+
+    async def delete(self, *args, **kwargs):
+        return await self._call("delete", "delete", *args, **kwargs)
+
+
+class InstrumentedBatch(_Proxy):
+    """Write batch (or transaction) that counts staged writes"""
+
+    def __init__(self, target: Any):
+        super().__init__(target)
+        self.writes = 0
+
+    def set(self, reference, document_data: dict, merge: bool = False):
+        self.writes += 1
+        return self.target.set(unwrap(reference), document_data, merge=merge)
+
+    def create(self, reference, document_data: dict):
+        self.writes += 1
+        return self.target.create(unwrap(reference), document_data)
+
+    def update(self, reference, field_updates: dict, *args, **kwargs):
+        self.writes += 1
+        return self.target.update(unwrap(reference), field_updates, *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        self.writes += 1
+        return self.target.delete(unwrap(reference), *args, **kwargs)
+
+    async def commit(self):
+        started = time.perf_counter()
+        try:
+            return await self.target.commit()
+        finally:
+            record_storage_call(
+                "commit", time.perf_counter() - started, writes=self.writes
+            )
+
+
+class InstrumentedDocumentStore(DocumentStore):
+    """DocumentStore decorator feeding the storage metrics"""
+
+    def __init__(self, store: DocumentStore):
+        self.store = store
+
+    def collection(self, path: str) -> InstrumentedCollection:
+        return InstrumentedCollection(self.store.collection(path))
+
+    def batch(self) -> InstrumentedBatch:
+        return InstrumentedBatch(self.store.batch())
+
+    async def run_transaction(self, callback: Callable[[Any], Awaitable[Any]]) -> Any:
+        wrapped = None
+        callback_seconds = 0.0
+
+        async def instrumented_callback(transaction):
+            nonlocal wrapped, callback_seconds
+            wrapped = InstrumentedBatch(transaction)
+            callback_started = time.perf_counter()
+            try:
+                return await callback(wrapped)
+            finally:
+                callback_seconds += time.perf_counter() - callback_started
+
+        started = time.perf_counter()
+        try:
+            return await self.store.run_transaction(instrumented_callback)
+        finally:
+            # Begin and commit; reads inside the callback are counted separately
+            record_storage_call(
+                "transaction",
+                time.perf_counter() - started - callback_seconds,
+                writes=wrapped.writes if wrapped else 0,
+                round_trips=2,
+            )
+
+    async def get_all(self, references: Iterable, transaction=None) -> AsyncIterator:
+        started = time.perf_counter()
+        reads = 0
+        try:
+            async for snapshot in self.store.get_all(
+                unwrap(list(references)), transaction=unwrap(transaction)
+            ):
+                reads += 1
+                yield snapshot
+        finally:
+            record_storage_call("get_all", time.perf_counter() - started, reads=reads)
+
+    def listen(
+        self,
+        collection_path: str,
+        field_path: str,
+        value: Any,
+        callback: ChangeCallback,
+    ) -> Callable[[], None]:
+        # Listener deliveries belong to no request; Firestore bills each as a read
+        def instrumented_callback(changes):
+            if changes:
+                storage_documents.inc(len(changes), kind="read")
+            callback(changes)
+
+        record_storage_call("listen", 0.0)
+        return self.store.listen(
+            collection_path, field_path, value, instrumented_callback
+        )
@@ -0,0 +1,109 @@
+"""In-memory storage backend for local development, benchmarks and CI"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from storage.documents import (
+    INDEXED_EQUALITY_FIELD,
+    INDEXED_ORDER_FIELD,
+    LocalDocumentStore,
+)
+
+# Sorts after any generated document ID, for inclusive upper bounds
+_MAX_ID = "\uffff"
+
+
+class MemoryDocumentStore(LocalDocumentStore):
+    """Process-local DocumentStore; data is lost when the process exits
+
+    Besides the documents themselves it keeps, per collection and user, the
+    set of document IDs and a sorted list of (date, document ID) so the
+    transaction queries never scan other users' data.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._collections: Dict[str, Dict[str, dict]] = defaultdict(dict)
+        self._user_documents: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._user_dates: Dict[Tuple[str, str], List[Tuple[datetime, str]]] = (
+            defaultdict(list)
+        )
+
+    @staticmethod
+    def _split(path: str) -> Tuple[str, str]:
+        collection_path, doc_id = path.rsplit("/", 1)
+        return collection_path, doc_id
+
+    def read_raw(self, path: str) -> Optional[dict]:
+        collection_path, doc_id = self._split(path)
+        documents = self._collections.get(collection_path)
+        return None if documents is None else documents.get(doc_id)
+
+    def _index_keys(self, collection_path: str, data: dict):
+        user_id = data.get(INDEXED_EQUALITY_FIELD)
+        if not isinstance(user_id, str):
+            return None, None
+        date = data.get(INDEXED_ORDER_FIELD)
+        return (collection_path, user_id), date if isinstance(date, datetime) else None
+
+    def _unindex(self, collection_path: str, doc_id: str, data: dict) -> None:
+        key, date = self._index_keys(collection_path, data)
+        if key is None:
+            return
+        self._user_documents[key].discard(doc_id)
+        if date is not None:
+            entries = self._user_dates[key]
+            position = bisect_left(entries, (date, doc_id))
+            if position < len(entries) and entries[position] == (date, doc_id):
+                del entries[position]
+
+    def _index(self, collection_path: str, doc_id: str, data: dict) -> None:
+        key, date = self._index_keys(collection_path, data)
+        if key is None:
+            return
+        self._user_documents[key].add(doc_id)
+        if date is not None:
+            insort(self._user_dates[key], (date, doc_id))
+
+    def persist(self, changes: Dict[str, Optional[dict]]) -> None:
+        for path, data in changes.items():
+            collection_path, doc_id = self._split(path)
+            documents = self._collections[collection_path]
+
+            previous = documents.pop(doc_id, None)
+            if previous is not None:
+                self._unindex(collection_path, doc_id, previous)
+
+            if data is not None:
+                documents[doc_id] = data
+                self._index(collection_path, doc_id, data)
+
+    def scan(
+        self,
+        collection_path: str,
+        user_id: Optional[str] = None,
+        date_range: Optional[Tuple[Optional[datetime], Optional[datetime]]] = None,
+        descending: bool = False,
+    ) -> Iterator[Tuple[str, dict]]:
+        documents = self._collections.get(collection_path, {})
+
+        if user_id is None:
+            doc_ids = list(documents)
+        elif date_range is None:
+            doc_ids = list(self._user_documents.get((collection_path, user_id), ()))
+        else:
+            entries = self._user_dates.get((collection_path, user_id), [])
+            lower, upper = date_range
+            start = bisect_left(entries, (lower, "")) if lower else 0
+            end = bisect_right(entries, (upper, _MAX_ID)) if upper else len(entries)
+            # Copy the slice so concurrent writes cannot shift the iteration
+            window = entries[start:end]
+            if descending:
+                window.reverse()
+            doc_ids = [doc_id for _, doc_id in window]
+
+        for doc_id in doc_ids:
+            data = documents.get(doc_id)
+            if data is not None:
+                yield doc_id, data
@@ -0,0 +1,171 @@
+"""SQLite storage backend for small single-node deployments and offline runs"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Tuple
+from storage.documents import (
+    INDEXED_EQUALITY_FIELD,
+    INDEXED_ORDER_FIELD,
+    LocalDocumentStore,
+)
+
+# Rows fetched per statement while scanning; each chunk is its own query so
+# no cursor stays open across awaits
+SCAN_CHUNK_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    user_id TEXT,
+    date TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, doc_id)
+);
+CREATE INDEX IF NOT EXISTS documents_user_date
+    ON documents (collection, user_id, date, doc_id);
+"""
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+
+def _decode_hook(value: dict):
+    if len(value) == 1 and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def _date_key(value: datetime) -> str:
+    """Fixed-width UTC timestamp that sorts lexicographically"""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+class SQLiteDocumentStore(LocalDocumentStore):
+    """DocumentStore persisted in one SQLite table
+
+    Documents are stored as JSON; ``user_id`` and ``date`` are copied into
+    indexed columns so per-user, date-ordered queries are index range scans.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+
+    @staticmethod
+    def _split(path: str) -> Tuple[str, str]:
+        collection_path, doc_id = path.rsplit("/", 1)
+        return collection_path, doc_id
+
+    @staticmethod
+    def _loads(data: str) -> dict:
+        return json.loads(data, object_hook=_decode_hook)
+
+    def read_raw(self, path: str) -> Optional[dict]:
+        collection_path, doc_id = self._split(path)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM documents WHERE collection = ? AND doc_id = ?",
+                (collection_path, doc_id),
+            ).fetchone()
+        return None if row is None else self._loads(row[0])
+
+    def persist(self, changes: Dict[str, Optional[dict]]) -> None:
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                for path, data in changes.items():
+                    collection_path, doc_id = self._split(path)
+                    if data is None:
+                        cursor.execute(
+                            "DELETE FROM documents WHERE collection = ? AND doc_id = ?",
+                            (collection_path, doc_id),
+                        )
+                        continue
+
+                    user_id = data.get(INDEXED_EQUALITY_FIELD)
+                    date = data.get(INDEXED_ORDER_FIELD)
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO documents "
+                        "(collection, doc_id, user_id, date, data) VALUES (?, ?, ?, ?, ?)",
+                        (
+                            collection_path,
+                            doc_id,
+                            user_id if isinstance(user_id, str) else None,
+                            _date_key(date) if isinstance(date, datetime) else None,
+                            json.dumps(data, default=_encode_default),
+                        ),
+                    )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def scan(
+        self,
+        collection_path: str,
+        user_id: Optional[str] = None,
+        date_range: Optional[Tuple[Optional[datetime], Optional[datetime]]] = None,
+        descending: bool = False,
+    ) -> Iterator[Tuple[str, dict]]:
+        conditions = ["collection = ?"]
+        params: list = [collection_path]
+
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+
+        if date_range is not None:
+            lower, upper = date_range
+            conditions.append("date IS NOT NULL")
+            if lower is not None:
+                conditions.append("date >= ?")
+                params.append(_date_key(lower))
+            if upper is not None:
+                conditions.append("date <= ?")
+                params.append(_date_key(upper))
+            direction = "DESC" if descending else "ASC"
+            keyset = (
+                "(date, doc_id) < (?, ?)" if descending else "(date, doc_id) > (?, ?)"
+            )
+            order = f"ORDER BY date {direction}, doc_id {direction}"
+        else:
+            keyset = "doc_id > ?"
+            order = "ORDER BY doc_id"
+
+        base_sql = (
+            f"SELECT doc_id, date, data FROM documents WHERE {' AND '.join(conditions)}"
+        )
+        last = None
+
+        while True:
+            sql = base_sql
+            chunk_params = list(params)
+            if last is not None:
+                sql += f" AND {keyset}"
+                chunk_params.extend(last if date_range is not None else last[1:])
+            sql += f" {order} LIMIT {SCAN_CHUNK_SIZE}"
+
+            with self._lock:
+                rows = self._connection.execute(sql, chunk_params).fetchall()
+
+            for doc_id, _, data in rows:
+                yield doc_id, self._loads(data)
+
+            if len(rows) < SCAN_CHUNK_SIZE:
+                return
+
+            last = (rows[-1][1], rows[-1][0])
@@ -0,0 +1,34 @@
+"""Shared setup: the in-memory backend and locally signed ID tokens"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.local_tokens import install_local_verifier, sign_token  # noqa: E402
+
+install_local_verifier()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user_id() -> str:
+    """A fresh user, so tests never see each other's documents"""
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def auth_headers(user_id):
+    return {"Authorization": f"Bearer {sign_token(user_id)}"}
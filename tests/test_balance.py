@@ -0,0 +1,147 @@
+"""Running balance series and their checkpoints"""
+
+import asyncio
+
+from services import balance_service, transaction_service, user_service
+
+# (month, signed amount)
+ROWS = [(1, 100), (2, -30), (3, 20), (4, -10), (5, 50), (6, -5)]
+
+
+def seed(client, headers, user_id) -> dict:
+    asyncio.run(user_service.create_user_profile(user_id, f"{user_id}@example.com"))
+    ids = {}
+    for month, amount in ROWS:
+        response = client.post(
+            "/transactions/",
+            json={
+                "type": "income" if amount > 0 else "expense",
+                "amount": abs(amount),
+                "category": "misc",
+                "date": f"2024-{month:02d}-15T12:00:00Z",
+            },
+            headers=headers,
+        )
+        assert response.status_code == 201, response.text
+        ids[month] = response.json()["id"]
+    return ids
+
+
+def monthly_balances(client, headers) -> dict:
+    response = client.get(
+        "/transactions/balance-series",
+        params={
+            "interval": "month",
+            "start_date": "2024-01-01T00:00:00Z",
+            "end_date": "2024-06-30T23:59:59Z",
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return {point["period"]: point["balance"] for point in response.json()["points"]}
+
+
+def stale_range(user_id) -> tuple:
+    doc = asyncio.run(
+        transaction_service.versions_collection.document(user_id).get()
+    ).to_dict()
+    return (
+        doc[transaction_service.BALANCE_STALE_FIELD],
+        doc[transaction_service.BALANCE_STALE_THROUGH_FIELD],
+    )
+
+
+def test_moving_a_transaction_invalidates_the_months_in_between(
+    client, auth_headers, user_id
+):
+    ids = seed(client, auth_headers, user_id)
+    assert monthly_balances(client, auth_headers)["2024-06"] == 125
+    assert stale_range(user_id) == (balance_service.ALL_CURRENT, 0)
+
+    # Mark the June checkpoint to see whether it is recomputed
+    june = balance_service.months_collection(user_id).document("2024-06")
+    asyncio.run(june.update({"untouched": True}))
+
+    response = client.put(
+        f"/transactions/{ids[2]}",
+        json={"date": "2024-04-20T12:00:00Z"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert stale_range(user_id) == (202402, 202404)
+
+    assert monthly_balances(client, auth_headers) == {
+        "2024-01": 100,
+        "2024-02": 100,
+        "2024-03": 120,
+        "2024-04": 80,
+        "2024-05": 130,
+        "2024-06": 125,
+    }
+    assert asyncio.run(june.get()).to_dict()["untouched"]
+    assert stale_range(user_id) == (balance_service.ALL_CURRENT, 0)
+
+
+def test_new_amount_invalidates_every_later_month(client, auth_headers, user_id):
+    ids = seed(client, auth_headers, user_id)
+    monthly_balances(client, auth_headers)
+
+    response = client.put(
+        f"/transactions/{ids[3]}", json={"amount": 25}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert stale_range(user_id) == (202403, transaction_service.LATEST_MONTH)
+
+    balances = monthly_balances(client, auth_headers)
+    assert (balances["2024-02"], balances["2024-03"], balances["2024-06"]) == (
+        70,
+        95,
+        130,
+    )
+
+
+def test_balances_are_exact_for_fractional_amounts(client, auth_headers, user_id):
+    asyncio.run(user_service.create_user_profile(user_id, f"{user_id}@example.com"))
+    for amount, day in ((0.1, 10), (0.2, 11)):
+        response = client.post(
+            "/transactions/",
+            json={
+                "type": "income",
+                "amount": amount,
+                "category": "misc",
+                "date": f"2024-01-{day}T12:00:00Z",
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 201, response.text
+    response = client.post(
+        "/transactions/",
+        json={
+            "type": "expense",
+            "amount": 0.7,
+            "category": "misc",
+            "date": "2024-02-03T12:00:00Z",
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+
+    for interval in ("month", "day"):
+        response = client.get(
+            "/transactions/balance-series",
+            params={
+                "interval": interval,
+                "start_date": "2024-01-01T00:00:00Z",
+                "end_date": "2024-02-10T12:00:00Z",
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 200, response.text
+        points = response.json()["points"]
+        assert {point["balance"] for point in points} <= {0, 0.1, 0.3, -0.4}
+        assert points[-1]["balance"] == -0.4
+
+    # Checkpoints hold integers, so the next series reads the same values
+    assert monthly_balances(client, auth_headers)["2024-01"] == 0.3
+    checkpoint = balance_service.months_collection(user_id).document("2024-01")
+    assert asyncio.run(checkpoint.get()).to_dict()["balance_minor"] == 30
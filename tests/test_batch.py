@@ -0,0 +1,84 @@
+"""Batch delete and update of transactions"""
+
+import asyncio
+
+from benchmarks.local_tokens import sign_token
+from services import transaction_service, user_service
+
+
+def create(client, headers, month: int, amount: float = 10) -> str:
+    response = client.post(
+        "/transactions/",
+        json={
+            "type": "expense",
+            "amount": amount,
+            "category": "food",
+            "date": f"2024-{month:02d}-15T12:00:00Z",
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_matched_counts_only_existing_owned_transactions(client, auth_headers):
+    owned = [create(client, auth_headers, month) for month in (1, 2, 3)]
+    other_headers = {"Authorization": f"Bearer {sign_token('batch-other-user')}"}
+    foreign = create(client, other_headers, 1)
+
+    response = client.post(
+        "/transactions/batch",
+        json={"action": "delete", "ids": owned + ["nope", foreign]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "matched": 3,
+        "modified": 3,
+        "not_found": ["nope"],
+        "forbidden": [foreign],
+    }
+    response = client.get(f"/transactions/{foreign}", headers=other_headers)
+    assert response.status_code == 200
+
+
+def test_full_commit_leaves_the_rest_to_the_next_chunk(
+    client, auth_headers, user_id, monkeypatch
+):
+    asyncio.run(user_service.create_user_profile(user_id, f"{user_id}@example.com"))
+    ids = [create(client, auth_headers, month) for month in range(1, 6)]
+    # The change counter plus two transactions with their rollup months
+    monkeypatch.setattr(transaction_service, "MAX_BATCH_WRITES", 6)
+    commits = []
+    run_transaction = transaction_service.db.run_transaction
+
+    async def counting(function):
+        commits.append(function)
+        return await run_transaction(function)
+
+    monkeypatch.setattr(transaction_service.db, "run_transaction", counting)
+
+    response = client.post(
+        "/transactions/batch",
+        json={"action": "update", "ids": ids, "update": {"amount": 12.5}},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert (response.json()["matched"], response.json()["modified"]) == (5, 5)
+    assert len(commits) == 3
+
+    # Every leftover was written once, with its rollup delta
+    response = client.get(
+        "/transactions/summary",
+        params={
+            "period": "month",
+            "start_date": "2024-01-01T00:00:00Z",
+            "end_date": "2024-05-31T23:59:59Z",
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["total_expense"] == 62.5
+    assert {bucket["total"] for bucket in response.json()["buckets"]} == {12.5}
@@ -0,0 +1,132 @@
+"""Budget counters follow transaction writes and report crossed thresholds"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+
+def create_budget(client, auth_headers, category: str) -> str:
+    response = client.post(
+        "/budgets/",
+        json={"category": category, "period": "month", "limit": 100},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def spent(client, auth_headers, budget_id: str) -> tuple:
+    response = client.get(f"/budgets/{budget_id}", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()["spent"], response.json()["count"]
+
+
+def test_counters_move_with_amount_and_category(client, auth_headers):
+    food = create_budget(client, auth_headers, "food")
+    rent = create_budget(client, auth_headers, "rent")
+
+    response = client.post(
+        "/transactions/",
+        json={
+            "type": "expense",
+            "amount": 30,
+            "category": "food",
+            "date": datetime.now(timezone.utc).isoformat(),
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    transaction_id = response.json()["id"]
+    assert spent(client, auth_headers, food) == (pytest.approx(30), 1)
+
+    response = client.put(
+        f"/transactions/{transaction_id}", json={"amount": 45}, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert spent(client, auth_headers, food) == (pytest.approx(45), 1)
+
+    response = client.put(
+        f"/transactions/{transaction_id}",
+        json={"category": "rent", "amount": 50},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert spent(client, auth_headers, food) == (pytest.approx(0), 0)
+    assert spent(client, auth_headers, rent) == (pytest.approx(50), 1)
+
+    response = client.put(
+        f"/transactions/{transaction_id}", json={"type": "income"}, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert spent(client, auth_headers, rent) == (pytest.approx(0), 0)
+
+    response = client.put(
+        f"/transactions/{transaction_id}",
+        json={"type": "expense"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert spent(client, auth_headers, rent) == (pytest.approx(50), 1)
+
+    response = client.delete(f"/transactions/{transaction_id}", headers=auth_headers)
+    assert response.status_code == 204, response.text
+    assert spent(client, auth_headers, rent) == (pytest.approx(0), 0)
+
+
+def test_expenses_outside_the_period_are_not_counted(client, auth_headers):
+    food = create_budget(client, auth_headers, "food")
+
+    response = client.post(
+        "/transactions/",
+        json={
+            "type": "expense",
+            "amount": 30,
+            "category": "food",
+            "date": "2020-01-15T12:00:00Z",
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    assert response.json()["budget_alerts"] == []
+    assert spent(client, auth_headers, food) == (pytest.approx(0), 0)
+
+
+def test_alerts_report_thresholds_crossed_upwards(client, auth_headers):
+    food = create_budget(client, auth_headers, "food")
+    today = datetime.now(timezone.utc).isoformat()
+
+    def expense(amount: float) -> dict:
+        response = client.post(
+            "/transactions/",
+            json={
+                "type": "expense",
+                "amount": amount,
+                "category": "food",
+                "date": today,
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    assert expense(50)["budget_alerts"] == []
+
+    alerts = expense(35)["budget_alerts"]
+    assert [(alert["budget_id"], alert["level"]) for alert in alerts] == [
+        (food, "warning")
+    ]
+    assert alerts[0]["spent"] == pytest.approx(85)
+
+    # Already past the warning: only crossing the limit is reported
+    assert expense(5)["budget_alerts"] == []
+    last = expense(20)
+    assert [alert["level"] for alert in last["budget_alerts"]] == ["exceeded"]
+    assert expense(1)["budget_alerts"] == []
+
+    # Lowering an expense crosses downwards and raises nothing
+    response = client.put(
+        f"/transactions/{last['id']}", json={"amount": 1}, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["budget_alerts"] == []
+    assert spent(client, auth_headers, food) == (pytest.approx(92), 5)
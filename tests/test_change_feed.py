@@ -0,0 +1,155 @@
+"""Change feed fan-out on the in-memory store"""
+
+import asyncio
+import json
+
+from services.change_feed_service import READY_EVENT, RESET_EVENT, ChangeFeed
+from storage.memory import MemoryDocumentStore
+
+
+class ListenerCountingStore(MemoryDocumentStore):
+    """Memory store counting the listeners opened and still open"""
+
+    def __init__(self):
+        super().__init__()
+        self.opened = 0
+        self.open = 0
+
+    def listen(self, collection_path, field_path, value, callback):
+        stop = super().listen(collection_path, field_path, value, callback)
+        self.opened += 1
+        self.open += 1
+
+        def unsubscribe():
+            self.open -= 1
+            stop()
+
+        return unsubscribe
+
+
+def transaction(user_id: str, amount: float) -> dict:
+    return {
+        "user_id": user_id,
+        "type": "expense",
+        "amount": amount,
+        "category": "food",
+        "date": "2024-03-05T10:00:00Z",
+    }
+
+
+async def drain(subscription) -> list:
+    """Events queued on a subscription, without waiting for more"""
+    events = []
+    while (event := await subscription.next_event(0.01)) is not None:
+        events.append(event)
+    return events
+
+
+async def settle() -> None:
+    """Let the store's queued listener callbacks run"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_one_listener_per_user():
+    async def run():
+        store = ListenerCountingStore()
+        feed = ChangeFeed(store)
+        for user_id in ("alice", "alice", "alice", "bob"):
+            feed.subscribe(user_id)
+        return store.opened, feed.connections
+
+    assert asyncio.run(run()) == (2, 4)
+
+
+def test_ready_is_sent_to_connections_subscribing_later():
+    async def run():
+        feed = ChangeFeed(ListenerCountingStore())
+        first = feed.subscribe("alice")
+        await settle()
+        later = feed.subscribe("alice")
+        return await drain(first), await drain(later)
+
+    assert asyncio.run(run()) == ([READY_EVENT], [READY_EVENT])
+
+
+def test_changes_reach_every_connection_of_the_user():
+    async def run():
+        store = ListenerCountingStore()
+        feed = ChangeFeed(store)
+        connections = [feed.subscribe("alice") for _ in range(2)]
+        other = feed.subscribe("bob")
+        await settle()
+        await store.collection("transactions").document("t1").set(
+            transaction("alice", 5)
+        )
+        await settle()
+        return [await drain(connection) for connection in connections + [other]]
+
+    first, second, other = asyncio.run(run())
+    assert first == second
+    assert first[0] == READY_EVENT
+    assert first[1].startswith(b"event: added\n") and b'"t1"' in first[1]
+    assert other == [READY_EVENT]
+
+
+def test_overflowing_queue_drops_backlog_and_resets():
+    async def run():
+        store = ListenerCountingStore()
+        feed = ChangeFeed(store, buffer_size=2)
+        subscription = feed.subscribe("alice")
+        await settle()
+        batch = store.batch()
+        for index in range(3):
+            batch.set(
+                store.collection("transactions").document(f"t{index}"),
+                transaction("alice", index + 1),
+            )
+        await batch.commit()
+        await settle()
+        return await drain(subscription)
+
+    # ready and t0 filled the queue; t1 overflowed it, t2 follows the reset
+    reset, added = asyncio.run(run())
+    assert reset == RESET_EVENT
+    assert b'"t2"' in added
+
+
+def test_listener_stops_with_the_last_connection():
+    async def run():
+        store = ListenerCountingStore()
+        feed = ChangeFeed(store)
+        first, second = feed.subscribe("alice"), feed.subscribe("alice")
+        await settle()
+
+        feed.unsubscribe(first)
+        still_open = store.open
+        feed.unsubscribe(second)
+        await store.collection("transactions").document("t1").set(
+            transaction("alice", 5)
+        )
+        await settle()
+        return still_open, store.open, feed.connections, await drain(second)
+
+    assert asyncio.run(run()) == (1, 0, 0, [READY_EVENT])
+
+
+def test_events_carry_the_converted_amount_like_the_list():
+    async def run():
+        store = ListenerCountingStore()
+        feed = ChangeFeed(store)
+        subscription = feed.subscribe("alice", "USD")
+        await settle()
+        # Written before transactions had a currency
+        await store.collection("transactions").document("t1").set(
+            transaction("alice", 5)
+        )
+        await store.collection("transactions").document("t1").delete()
+        await settle()
+        return await drain(subscription)
+
+    ready, added, removed = asyncio.run(run())
+    assert ready == READY_EVENT
+    data = json.loads(added.decode("utf-8").split("data: ", 1)[1])
+    assert (data["currency"], data["converted_amount"]) == ("USD", 5.0)
+    assert removed == b'event: removed\ndata: {"id": "t1"}\n\n'
@@ -0,0 +1,174 @@
+"""Transactions in several currencies: summaries, budgets, balances, responses"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from models.transaction import Transaction
+from models.user import UserUpdate
+from services import (
+    analytics_service,
+    balance_service,
+    fx_service,
+    summary_service,
+    transaction_service,
+    user_service,
+)
+
+# USD per EUR, forward-filled past the last day
+RATES = "Date,USD\n2024-01-02,1.1000\n2024-02-01,1.2000\n"
+
+
+@pytest.fixture
+def rates(tmp_path, monkeypatch):
+    path = tmp_path / "rates.csv"
+    path.write_text(RATES)
+    for function in (fx_service.get_rate_table, fx_service.rates_version):
+        monkeypatch.setattr(function, "__defaults__", (str(path),))
+
+
+def create(user_id: str, *rows) -> list:
+    return asyncio.run(
+        transaction_service.create_transactions(
+            [
+                Transaction(
+                    user_id=user_id,
+                    type=transaction_type,
+                    amount=amount,
+                    currency=currency,
+                    category="food",
+                    date=datetime(2024, month, day, 12, tzinfo=timezone.utc),
+                )
+                for transaction_type, amount, currency, month, day in rows
+            ]
+        )
+    )
+
+
+def test_user_in_another_reporting_currency_keeps_the_exact_paths(user_id, monkeypatch):
+    asyncio.run(user_service.create_user_profile(user_id, f"{user_id}@example.com"))
+    asyncio.run(
+        user_service.update_user_profile(user_id, UserUpdate(reporting_currency="EUR"))
+    )
+    create(user_id, ("expense", 10, "EUR", 1, 5), ("expense", 2.5, "EUR", 1, 6))
+
+    async def converted(*args, **kwargs):
+        raise AssertionError("summarized from converted columns")
+
+    monkeypatch.setattr(analytics_service, "summarize_converted", converted)
+    summary = asyncio.run(summary_service.get_transaction_summary(user_id))
+
+    assert summary.currency == "EUR"
+    assert summary.total_expense == 12.5
+
+
+def test_legacy_documents_count_until_the_currencies_are_rebuilt(user_id):
+    create(user_id, ("expense", 10, "EUR", 1, 5))
+    assert not asyncio.run(transaction_service.in_single_currency(user_id, "EUR"))
+
+    asyncio.run(transaction_service.rebuild_user_currencies(user_id))
+
+    assert asyncio.run(transaction_service.get_user_currencies(user_id)) == {"EUR"}
+    assert asyncio.run(transaction_service.in_single_currency(user_id, "EUR"))
+
+
+def test_budget_counts_expenses_in_its_currency(client, auth_headers, rates):
+    response = client.post(
+        "/budgets/",
+        json={"category": "food", "period": "month", "limit": 100},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    budget = response.json()
+    assert budget["currency"] == "USD"
+
+    today = datetime.now(timezone.utc).isoformat()
+    for amount, currency in ((10, "EUR"), (5, "USD")):
+        response = client.post(
+            "/transactions/",
+            json={
+                "type": "expense",
+                "amount": amount,
+                "currency": currency,
+                "category": "food",
+                "date": today,
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 201, response.text
+
+    # No CHF rate: rejected rather than counted at a wrong value
+    response = client.post(
+        "/transactions/",
+        json={
+            "type": "expense",
+            "amount": 1,
+            "currency": "CHF",
+            "category": "food",
+            "date": today,
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+    response = client.get(f"/budgets/{budget['id']}", headers=auth_headers)
+    assert response.json()["spent"] == pytest.approx(17)
+    assert response.json()["count"] == 2
+
+
+def test_balance_series_converts_mixed_currencies(user_id, rates):
+    create(
+        user_id,
+        ("income", 100, "USD", 1, 3),
+        ("expense", 10, "EUR", 1, 20),
+        ("expense", 10, "EUR", 2, 10),
+    )
+
+    series = asyncio.run(
+        balance_service.get_balance_series(
+            user_id,
+            "month",
+            datetime(2024, 1, 1, tzinfo=timezone.utc),
+            datetime(2024, 2, 29, 23, 59, 59, tzinfo=timezone.utc),
+        )
+    )
+
+    assert series.currency == "USD"
+    assert series.opening_balance == 0
+    assert [(point.period, point.balance, point.net) for point in series.points] == [
+        ("2024-01", 89.0, 89.0),
+        ("2024-02", 77.0, -12.0),
+    ]
+
+
+def test_write_responses_carry_the_converted_amount(client, auth_headers, rates):
+    response = client.post(
+        "/transactions/",
+        json={
+            "type": "expense",
+            "amount": 10,
+            "currency": "EUR",
+            "category": "food",
+            "date": "2024-01-05T12:00:00Z",
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    assert response.json()["converted_amount"] == 11.0
+
+    response = client.put(
+        f"/transactions/{response.json()['id']}",
+        json={"amount": 20},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["converted_amount"] == 22.0
+
+
+def test_batch_create_responses_carry_the_converted_amount(user_id, rates):
+    responses = create(
+        user_id, ("expense", 10, "EUR", 1, 5), ("expense", 10, "EUR", 2, 5)
+    )
+
+    assert [response.converted_amount for response in responses] == [11.0, 12.0]
@@ -0,0 +1,48 @@
+"""Conditional GETs"""
+
+import pytest
+
+from benchmarks.local_tokens import sign_token
+
+ANY_ETAG = {"If-None-Match": "*"}
+
+
+def test_single_transaction_is_checked_before_the_etag(client, auth_headers):
+    created = client.post(
+        "/transactions/",
+        json={
+            "type": "income",
+            "amount": 10,
+            "category": "salary",
+            "date": "2024-03-05T10:00:00Z",
+        },
+        headers=auth_headers,
+    )
+    transaction_id = created.json()["id"]
+    other = {"Authorization": f"Bearer {sign_token('etag-other-user')}"}
+
+    missing = client.get(
+        "/transactions/missing-id", headers={**auth_headers, **ANY_ETAG}
+    )
+    foreign = client.get(
+        f"/transactions/{transaction_id}", headers={**other, **ANY_ETAG}
+    )
+    own = client.get(f"/transactions/{transaction_id}", headers=auth_headers)
+    cached = client.get(
+        f"/transactions/{transaction_id}",
+        headers={**auth_headers, "If-None-Match": own.headers["ETag"]},
+    )
+
+    assert (missing.status_code, foreign.status_code) == (404, 403)
+    assert (own.status_code, cached.status_code) == (200, 304)
+
+
+@pytest.mark.parametrize(
+    "query", ["min_amount=5&max_amount=1", "limit=10&page_token=not-a-token"]
+)
+def test_invalid_list_request_is_rejected_before_the_etag(client, auth_headers, query):
+    response = client.get(
+        f"/transactions/?{query}", headers={**auth_headers, **ANY_ETAG}
+    )
+
+    assert response.status_code == 400
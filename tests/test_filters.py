@@ -0,0 +1,74 @@
+"""The transaction list, export and summary accept the same filters"""
+
+import asyncio
+import json
+
+import pytest
+
+from services import rollup_service
+
+ROWS = [
+    ("expense", 12.5, "groceries", "2024-01-10T10:00:00Z"),
+    ("expense", 60, "groceries", "2024-01-20T10:00:00Z"),
+    ("expense", 75, "dining", "2024-02-03T10:00:00Z"),
+    ("expense", 30, "dining", "2024-02-14T10:00:00Z"),
+    ("expense", 90, "rent", "2024-02-01T10:00:00Z"),
+    ("income", 55, "groceries", "2024-02-05T10:00:00Z"),
+]
+
+
+@pytest.fixture
+def seeded(client, auth_headers, user_id):
+    for transaction_type, amount, category, date in ROWS:
+        response = client.post(
+            "/transactions/",
+            json={
+                "type": transaction_type,
+                "amount": amount,
+                "category": category,
+                "date": date,
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 201, response.text
+    return user_id
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "category=groceries,dining&min_amount=50",
+        "category=groceries&category=dining&max_amount=40",
+        "category=dining,rent",
+        "min_amount=50&max_amount=80&transaction_type=expense",
+    ],
+)
+@pytest.mark.parametrize("rollups", [False, True])
+def test_same_transactions_in_list_export_and_summary(
+    client, auth_headers, seeded, query, rollups
+):
+    if rollups:
+        asyncio.run(rollup_service.rebuild_user_rollups(seeded))
+
+    listed = client.get(f"/transactions/?{query}", headers=auth_headers).json()
+    exported = client.get(
+        f"/transactions/export?format=ndjson&{query}", headers=auth_headers
+    )
+    summary = client.get(f"/transactions/summary?{query}", headers=auth_headers).json()
+
+    ids = sorted(row["id"] for row in listed)
+    assert ids
+    assert sorted(json.loads(line)["id"] for line in exported.text.splitlines()) == ids
+    for transaction_type in ("income", "expense"):
+        assert summary[f"total_{transaction_type}"] == sum(
+            row["amount"] for row in listed if row["type"] == transaction_type
+        )
+
+
+@pytest.mark.parametrize("endpoint", ["/transactions/export", "/transactions/summary"])
+def test_empty_amount_range_is_rejected(client, auth_headers, endpoint):
+    response = client.get(
+        f"{endpoint}?min_amount=10&max_amount=5", headers=auth_headers
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,52 @@
+"""Bulk imports"""
+
+import asyncio
+
+from services import import_service, rollup_service, transaction_service
+
+ROWS = 40
+
+
+async def rows():
+    for row_number in range(1, ROWS + 1):
+        # Yield to the event loop so concurrent imports interleave
+        await asyncio.sleep(0)
+        yield row_number, {
+            "type": "expense",
+            "amount": 2.5,
+            "category": "food",
+            "date": "2024-03-05T10:00:00Z",
+        }
+
+
+def test_concurrent_retries_with_one_key_count_rows_once(monkeypatch, user_id):
+    # Several commits per import, so the two attempts overlap
+    monkeypatch.setattr(import_service, "MAX_BATCH_WRITES", 8)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                import_service.import_transactions(user_id, rows(), "same-key")
+                for _ in range(2)
+            )
+        )
+
+    results = asyncio.run(run())
+
+    assert [result.imported for result in results] == [ROWS, ROWS]
+    assert sorted(result.replayed for result in results) == [False, True]
+
+    transactions = asyncio.run(transaction_service.get_user_transactions(user_id))
+    assert len(transactions) == ROWS
+
+    (rollup,) = asyncio.run(rollup_service.get_monthly_rollups(user_id))
+    assert rollup["totals"]["expense"]["count"] == ROWS
+    assert rollup["totals"]["expense"]["total_minor"] == ROWS * 250
+
+
+def test_retry_after_completion_replays_result(user_id):
+    first = asyncio.run(import_service.import_transactions(user_id, rows(), "key"))
+    again = asyncio.run(import_service.import_transactions(user_id, rows(), "key"))
+
+    assert (first.imported, first.replayed) == (ROWS, False)
+    assert (again.imported, again.replayed) == (ROWS, True)
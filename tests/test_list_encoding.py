@@ -0,0 +1,33 @@
+"""Both encodings of the transaction list send the same body"""
+
+import pytest
+
+from routers import transaction as transaction_router
+from utils import fast_json
+
+
+@pytest.mark.skipif(not fast_json.available(), reason="orjson is not installed")
+def test_fast_json_body_matches_the_default(client, auth_headers, monkeypatch):
+    for index, description in enumerate(("lunch", None)):
+        response = client.post(
+            "/transactions/",
+            json={
+                "type": "expense",
+                "amount": 12.5 + index,
+                "category": "food",
+                "date": f"2024-03-0{index + 1}T10:00:00.123456Z",
+                "description": description,
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 201, response.text
+
+    bodies = []
+    for fast in (False, True):
+        monkeypatch.setattr(transaction_router, "FAST_JSON_RESPONSES", fast)
+        response = client.get("/transactions/", headers=auth_headers)
+        assert response.status_code == 200
+        bodies.append(response.content)
+
+    assert bodies[0] == bodies[1]
+    assert len(response.json()) == 2
@@ -0,0 +1,54 @@
+"""Per-user token buckets on the routes listed in RATE_LIMITS"""
+
+import pytest
+
+from benchmarks.local_tokens import sign_token
+from middleware import rate_limit
+from utils.rate_limit import LocalRateLimiter, parse_limits
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(
+        rate_limit,
+        "route_limits",
+        parse_limits(
+            "GET /transactions/=0.01/2,GET /transactions/{transaction_id}=0.01/1"
+        ),
+    )
+    monkeypatch.setattr(rate_limit, "rate_limiter", LocalRateLimiter())
+
+
+def test_requests_past_the_burst_get_429_with_retry_after(client, auth_headers, limits):
+    for _ in range(2):
+        assert client.get("/transactions/", headers=auth_headers).status_code == 200
+
+    response = client.get("/transactions/", headers=auth_headers)
+    assert response.status_code == 429
+    # One token every 100 seconds
+    assert 1 <= int(response.headers["Retry-After"]) <= 100
+
+    other_user = {"Authorization": f"Bearer {sign_token('rate-limit-other')}"}
+    assert client.get("/transactions/", headers=other_user).status_code == 200
+
+    # Routes without a limit are not counted
+    assert client.get("/budgets/", headers=auth_headers).status_code == 200
+
+
+def test_buckets_are_per_route_template(client, auth_headers, limits):
+    assert client.get("/transactions/first", headers=auth_headers).status_code == 404
+    response = client.get("/transactions/second", headers=auth_headers)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_rejected_requests_are_counted(client, auth_headers, limits):
+    before = rate_limit.rate_limited_requests.collect()
+    client.get("/transactions/missing", headers=auth_headers)
+    client.get("/transactions/missing", headers=auth_headers)
+
+    assert rate_limit.rate_limited_requests.collect() != before
+    assert any(
+        'route="GET /transactions/{transaction_id}"' in line
+        for line in rate_limit.rate_limited_requests.collect()
+    )
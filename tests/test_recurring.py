@@ -0,0 +1,99 @@
+"""The scheduler posts each occurrence of a recurring rule exactly once"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from services import recurring_service
+
+
+def create_rule(client, auth_headers, **schedule) -> str:
+    response = client.post(
+        "/recurring/",
+        json={"type": "expense", "amount": 12.5, "category": "rent", **schedule},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def posted(client, auth_headers) -> list:
+    response = client.get(
+        "/transactions/", params={"order": "asc"}, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    return [(row["id"], row["date"][:10]) for row in response.json()]
+
+
+def test_occurrences_get_deterministic_ids_and_reruns_post_nothing(
+    client, auth_headers
+):
+    rule_id = create_rule(
+        client,
+        auth_headers,
+        frequency="monthly",
+        day_of_month=31,
+        start_date="2024-01-31T09:00:00Z",
+    )
+    now = datetime(2024, 4, 15, tzinfo=timezone.utc)
+
+    assert asyncio.run(recurring_service.process_due_rules(now)) >= 3
+    expected = [
+        (recurring_service._occurrence_id(rule_id, index), date)
+        for index, date in enumerate(["2024-01-31", "2024-02-29", "2024-03-31"])
+    ]
+    assert posted(client, auth_headers) == expected
+
+    rule = client.get(f"/recurring/{rule_id}", headers=auth_headers).json()
+    assert rule["occurrences"] == 3
+    assert rule["next_run"].startswith("2024-04-30")
+
+    asyncio.run(recurring_service.process_due_rules(now))
+    assert posted(client, auth_headers) == expected
+
+
+def test_concurrent_runs_do_not_duplicate_occurrences(client, auth_headers):
+    rule_id = create_rule(
+        client, auth_headers, frequency="weekly", start_date="2024-03-01T09:00:00Z"
+    )
+    now = datetime(2024, 3, 20, tzinfo=timezone.utc)
+
+    async def two_workers():
+        return await asyncio.gather(
+            recurring_service.process_due_rules(now),
+            recurring_service.process_due_rules(now),
+        )
+
+    asyncio.run(two_workers())
+
+    assert [transaction_id for transaction_id, _ in posted(client, auth_headers)] == [
+        recurring_service._occurrence_id(rule_id, index) for index in range(3)
+    ]
+
+
+def test_rules_far_behind_catch_up_over_several_commits(
+    client, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(recurring_service, "MAX_OCCURRENCES_PER_COMMIT", 2)
+    rule_id = create_rule(
+        client,
+        auth_headers,
+        frequency="daily",
+        interval=2,
+        start_date="2024-05-01T09:00:00Z",
+        end_date="2024-05-09T09:00:00Z",
+    )
+
+    asyncio.run(
+        recurring_service.process_due_rules(datetime(2024, 6, 1, tzinfo=timezone.utc))
+    )
+
+    assert [date for _, date in posted(client, auth_headers)] == [
+        "2024-05-01",
+        "2024-05-03",
+        "2024-05-05",
+        "2024-05-07",
+        "2024-05-09",
+    ]
+    rule = client.get(f"/recurring/{rule_id}", headers=auth_headers).json()
+    assert rule["occurrences"] == 5
+    assert rule["next_run"] is None
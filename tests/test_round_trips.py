@@ -0,0 +1,80 @@
+"""Storage work per request, counted by the instrumented store"""
+
+import pytest
+
+from benchmarks.local_tokens import sign_token
+from middleware import metrics as metrics_middleware
+from utils.metrics import RequestStats
+
+
+@pytest.fixture
+def request_stats(monkeypatch):
+    """Storage stats of each request handled, in order"""
+    recorded = []
+
+    class RecordedStats(RequestStats):
+        __slots__ = ()
+
+        def __init__(self):
+            super().__init__()
+            recorded.append(self)
+
+    monkeypatch.setattr(metrics_middleware, "RequestStats", RecordedStats)
+    return recorded
+
+
+def counts(stats: RequestStats) -> tuple:
+    return stats.round_trips, stats.reads, stats.writes
+
+
+def create(client, headers) -> str:
+    response = client.post(
+        "/transactions/",
+        json={
+            "type": "expense",
+            "amount": 12.5,
+            "category": "food",
+            "date": "2024-03-05T10:00:00Z",
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_update(client, auth_headers, request_stats):
+    transaction_id = create(client, auth_headers)
+
+    response = client.put(
+        f"/transactions/{transaction_id}", json={"amount": 20}, headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["amount"] == 20
+    # Transaction begin and commit, the document read, the budgets query and
+    # the reporting currency (a profile cache hit for users with a profile);
+    # writes: the document, both rollup deltas and the change counter
+    assert counts(request_stats[-1]) == (5, 2, 4)
+
+
+def test_delete(client, auth_headers, request_stats):
+    transaction_id = create(client, auth_headers)
+
+    response = client.delete(f"/transactions/{transaction_id}", headers=auth_headers)
+
+    assert response.status_code == 204
+    # Writes: the delete, the rollup delta and the change counter
+    assert counts(request_stats[-1]) == (4, 1, 3)
+
+
+def test_update_of_another_users_transaction(client, auth_headers, request_stats):
+    transaction_id = create(client, auth_headers)
+    other = {"Authorization": f"Bearer {sign_token('round-trips-other-user')}"}
+
+    response = client.put(
+        f"/transactions/{transaction_id}", json={"amount": 20}, headers=other
+    )
+
+    assert response.status_code == 403
+    # Rejected after the transactional read, before anything is staged
+    assert counts(request_stats[-1]) == (3, 1, 0)
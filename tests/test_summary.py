@@ -0,0 +1,63 @@
+"""Transaction summaries"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from models.transaction import Transaction
+from services import rollup_service, summary_service, transaction_service
+
+PLUS_FIVE = timezone(timedelta(hours=5))
+
+
+def seed(user_id: str) -> None:
+    """A January expense of 100 and February expenses totalling 7"""
+    asyncio.run(
+        transaction_service.create_transactions(
+            [
+                Transaction(
+                    user_id=user_id,
+                    type="expense",
+                    amount=amount,
+                    category="food",
+                    date=datetime(2024, month, day, 12, tzinfo=timezone.utc),
+                )
+                for month, day, amount in ((1, 15, 100), (2, 10, 3), (2, 20, 4))
+            ]
+        )
+    )
+
+
+def test_month_alignment_is_checked_in_utc():
+    assert summary_service._is_month_aligned(
+        datetime(2024, 2, 1, 5, tzinfo=PLUS_FIVE),
+        datetime(2024, 3, 1, 4, 59, 59, tzinfo=PLUS_FIVE),
+    )
+    assert not summary_service._is_month_aligned(
+        datetime(2024, 2, 1, tzinfo=PLUS_FIVE),
+        datetime(2024, 2, 29, 23, 59, 59, tzinfo=PLUS_FIVE),
+    )
+
+
+def test_non_utc_range_matches_with_and_without_rollups():
+    with_rollups, without_rollups = (f"test-{uuid.uuid4().hex[:12]}" for _ in "ab")
+    for user_id in (with_rollups, without_rollups):
+        seed(user_id)
+    asyncio.run(rollup_service.rebuild_user_rollups(with_rollups))
+
+    summaries = [
+        asyncio.run(
+            summary_service.get_transaction_summary(
+                user_id,
+                period="month",
+                start_date=datetime(2024, 2, 1, tzinfo=PLUS_FIVE),
+                end_date=datetime(2024, 2, 29, 23, 59, 59, tzinfo=PLUS_FIVE),
+            )
+        )
+        for user_id in (with_rollups, without_rollups)
+    ]
+
+    for summary in summaries:
+        assert summary.total_expense == 7
+        assert "2024-01" not in {bucket.period for bucket in summary.buckets}
+    assert summaries[0].buckets == summaries[1].buckets
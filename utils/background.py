@@ -0,0 +1,25 @@
+"""Periodic background jobs run inside the API process"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(
+    name: str, interval: float, job: Callable[[], Awaitable[object]]
+) -> None:
+    """Run ``job`` every ``interval`` seconds until cancelled
+
+    A failing run is logged and the next one still happens on schedule.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await job()
+            logger.info("%s finished: %s", name, result)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("%s failed", name)
@@ -0,0 +1,184 @@
+"""Caching helpers: in-process LRU/TTL and an optional shared Redis backend"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Union
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # the shared cache backend is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a time-to-live
+
+    Safe to share between the event loop and the thread pool FastAPI uses for
+    sync dependencies. Hit and miss counts are kept for metrics.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+class LocalCache:
+    """Async read-through cache kept in this process only"""
+
+    backend = "local"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.invalidate(key)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self._cache.stats()}
+
+
+class RedisCache:
+    """Async cache in a Redis-protocol store shared by every worker
+
+    Store errors are logged and treated as misses, so an unavailable cache
+    only costs the underlying read.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, namespace: str, ttl: float):
+        self._client = redis.from_url(url, decode_responses=True)
+        self._namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self._namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self._client.get(self._key(key))
+        except (redis.RedisError, OSError) as exc:
+            self.errors += 1
+            logger.warning("Cache read failed: %s", exc)
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        try:
+            await self._client.set(self._key(key), value, px=int(ttl * 1000))
+        except (redis.RedisError, OSError) as exc:
+            self.errors += 1
+            logger.warning("Cache write failed: %s", exc)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._client.delete(self._key(key))
+        except (redis.RedisError, OSError) as exc:
+            self.errors += 1
+            logger.warning("Cache invalidation failed: %s", exc)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "errors": self.errors,
+        }
+
+
+def create_cache(
+    namespace: str, maxsize: int, ttl: float, redis_url: Optional[str] = None
+) -> Union[LocalCache, RedisCache]:
+    """Shared Redis cache when configured and installed, else in-process"""
+    if redis_url:
+        if redis is not None:
+            return RedisCache(redis_url, namespace, ttl)
+        logger.warning(
+            "redis package not installed, using in-process %s cache", namespace
+        )
+
+    return LocalCache(maxsize=maxsize, ttl=ttl)
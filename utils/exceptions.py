@@ -6,6 +6,7 @@ from fastapi.responses import JSONResponse
 
 logger = logging.getLogger(__name__)
 
+
 async def auth_exception_handler(request: Request, exc: HTTPException):
     """Handle authentication exceptions"""
     logger.error("Authentication error: %s", exc.detail)
@@ -14,10 +15,11 @@ async def auth_exception_handler(request: Request, exc: HTTPException):
         content={
             "error": "Authentication failed",
             "message": exc.detail,
-            "type": "auth_error"
-        }
+            "type": "auth_error",
+        },
     )
 
+
 async def validation_exception_handler(request: Request, exc: HTTPException):
     """Handle validation exceptions"""
     logger.error("Validation error: %s", exc.detail)
@@ -26,10 +28,11 @@ async def validation_exception_handler(request: Request, exc: HTTPException):
         content={
             "error": "Validation failed",
             "message": exc.detail,
-            "type": "validation_error"
-        }
+            "type": "validation_error",
+        },
     )
 
+
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions"""
     logger.error("Unexpected error: %s", str(exc))
@@ -38,6 +41,6 @@ async def general_exception_handler(request: Request, exc: Exception):
         content={
             "error": "Internal server error",
             "message": "An unexpected error occurred",
-            "type": "server_error"
-        }
+            "type": "server_error",
+        },
     )
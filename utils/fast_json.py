@@ -0,0 +1,35 @@
+"""orjson encoding for large JSON responses (optional dependency)"""
+
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # the fast JSON path is optional
+    orjson = None
+
+
+def available() -> bool:
+    """Whether the optional orjson dependency is installed"""
+    return orjson is not None
+
+
+def _default(value: Any) -> Any:
+    # Firestore returns a datetime subclass, which orjson does not accept
+    if isinstance(value, datetime):
+        return datetime(
+            value.year,
+            value.month,
+            value.day,
+            value.hour,
+            value.minute,
+            value.second,
+            value.microsecond,
+            value.tzinfo,
+        )
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode like FastAPI's default JSON responses (UTC datetimes end in Z)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
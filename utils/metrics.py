@@ -0,0 +1,249 @@
+"""Minimal Prometheus-format metrics and per-request storage accounting"""
+
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts, sum, count]
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+
+        lines = []
+        for key, (counts, total, count) in items:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(labels + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+# (metric, type, help, stats key, extra labels)
+CACHE_FAMILIES = (
+    ("cache_hits_total", "counter", "Lookups served from the cache", "hits", ()),
+    ("cache_misses_total", "counter", "Lookups that missed the cache", "misses", ()),
+    (
+        "cache_hit_ratio",
+        "gauge",
+        "Share of lookups served from the cache",
+        "hit_ratio",
+        (),
+    ),
+    ("cache_entries", "gauge", "Entries currently cached", "size", ()),
+    (
+        "cache_lookup_latency_ms",
+        "gauge",
+        "Mean lookup latency by outcome",
+        "hit_latency_ms",
+        (("outcome", "hit"),),
+    ),
+    (
+        "cache_lookup_latency_ms",
+        "gauge",
+        "Mean lookup latency by outcome",
+        "miss_latency_ms",
+        (("outcome", "miss"),),
+    ),
+)
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._caches: Dict[str, Callable[[], dict]] = {}
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, cache_name: str, stats: Callable[[], dict]) -> None:
+        """Expose a cache's ``stats()`` (hits, misses, hit ratio, ...)"""
+        self._caches[cache_name] = stats
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+
+        snapshots = {name: stats() for name, stats in self._caches.items()}
+        described = set()
+        for name, kind, documentation, key, extra_labels in CACHE_FAMILIES:
+            samples = [
+                (cache_name, stats[key])
+                for cache_name, stats in snapshots.items()
+                if stats.get(key) is not None
+            ]
+            if not samples:
+                continue
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+            for cache_name, value in samples:
+                labels = _format_labels((("cache", cache_name),) + extra_labels)
+                lines.append(f"{name}{labels} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+http_request_storage_round_trips = REGISTRY.histogram(
+    "http_request_storage_round_trips",
+    "Storage round trips issued per HTTP request",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 4, 5, 10, 25, 50, 100),
+)
+storage_operations = REGISTRY.counter(
+    "storage_operations_total",
+    "Storage calls by operation",
+    ("operation",),
+)
+storage_documents = REGISTRY.counter(
+    "storage_documents_total",
+    "Documents read or written",
+    ("kind",),
+)
+storage_call_duration = REGISTRY.histogram(
+    "storage_call_duration_seconds",
+    "Storage call latency by operation",
+    ("operation",),
+)
+
+
+class RequestStats:
+    """Storage work attributed to the current request"""
+
+    __slots__ = ("reads", "writes", "round_trips", "storage_seconds")
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.round_trips = 0
+        self.storage_seconds = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def record_storage_call(
+    operation: str,
+    seconds: float,
+    reads: int = 0,
+    writes: int = 0,
+    round_trips: int = 1,
+) -> None:
+    """Account one storage call globally and against the current request"""
+    storage_operations.inc(operation=operation)
+    storage_call_duration.observe(seconds, operation=operation)
+    if reads:
+        storage_documents.inc(reads, kind="read")
+    if writes:
+        storage_documents.inc(writes, kind="write")
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.reads += reads
+        stats.writes += writes
+        stats.round_trips += round_trips
+        stats.storage_seconds += seconds
@@ -0,0 +1,79 @@
+"""Currency codes and amounts in integer minor units (cents, pence, yen)"""
+
+from decimal import ROUND_HALF_EVEN, Decimal
+from config.settings import DEFAULT_CURRENCY
+
+CURRENCY_PATTERN = "^[A-Z]{3}$"
+
+# ISO 4217 currencies whose minor unit is not a hundredth
+_EXPONENTS = {
+    **dict.fromkeys(
+        ["BHD", "IQD", "JOD", "KWD", "LYD", "OMR", "TND"],
+        3,
+    ),
+    **dict.fromkeys(
+        [
+            "BIF",
+            "CLP",
+            "DJF",
+            "GNF",
+            "ISK",
+            "JPY",
+            "KMF",
+            "KRW",
+            "PYG",
+            "RWF",
+            "UGX",
+            "VND",
+            "VUV",
+            "XAF",
+            "XOF",
+            "XPF",
+        ],
+        0,
+    ),
+}
+
+
+def exponent(currency: str) -> int:
+    """Number of decimal places of a currency's minor unit"""
+    return _EXPONENTS.get(currency, 2)
+
+
+def to_minor_units(amount: float, currency: str) -> int:
+    """Exact amount in minor units; raises ValueError for finer amounts
+
+    Goes through the decimal string of the float, so 0.1 + 0.2 style
+    binary noise never leaks into the stored integer.
+    """
+    scaled = Decimal(str(amount)).scaleb(exponent(currency))
+    if scaled != scaled.to_integral_value():
+        raise ValueError(
+            f"{currency} amounts have at most {exponent(currency)} decimal places"
+        )
+    return int(scaled)
+
+
+def from_minor_units(minor: int, currency: str) -> float:
+    """Amount as a float from minor units"""
+    return float(Decimal(minor).scaleb(-exponent(currency)))
+
+
+def round_amount(amount: float, currency: str) -> float:
+    """Amount rounded half-even to the currency's minor unit"""
+    quantum = Decimal(1).scaleb(-exponent(currency))
+    return float(Decimal(str(amount)).quantize(quantum, rounding=ROUND_HALF_EVEN))
+
+
+def currency_of(transaction_data: dict) -> str:
+    """Currency of a stored transaction; older documents have none"""
+    return transaction_data.get("currency") or DEFAULT_CURRENCY
+
+
+def minor_units_of(transaction_data: dict) -> int:
+    """Stored amount in minor units, derived for documents written before them"""
+    minor = transaction_data.get("amount_minor")
+    if minor is not None:
+        return minor
+    currency = currency_of(transaction_data)
+    return to_minor_units(round_amount(transaction_data["amount"], currency), currency)
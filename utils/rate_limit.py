@@ -0,0 +1,142 @@
+"""Token-bucket rate limiters: in-process and on a shared Redis store"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # the shared limiter backend is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# (tokens per second, bucket size)
+Limit = Tuple[float, float]
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """Parse ``"GET /transactions/=5/20,GET /analytics/trends=1/5"``
+
+    Each entry maps a route (method and path template) to its refill rate in
+    requests per second and its burst size. Raises ValueError when malformed.
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        route, separator, values = entry.rpartition("=")
+        rate, _, burst = values.partition("/")
+        try:
+            limit = (float(rate), float(burst or rate))
+        except ValueError:
+            limit = None
+        if not separator or not route.strip() or limit is None or min(limit) <= 0:
+            raise ValueError(
+                f"Invalid rate limit {entry!r}, expected METHOD /path=rate/burst"
+            )
+        method, _, path = route.strip().partition(" ")
+        limits[f"{method.upper()} {path.strip()}"] = limit
+    return limits
+
+
+class LocalRateLimiter:
+    """Token buckets kept in this process only
+
+    Idle buckets are evicted least recently used first beyond ``maxsize``;
+    an evicted key starts again with a full bucket.
+    """
+
+    backend = "local"
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def acquire(self, key: str, rate: float, burst: float) -> float:
+        """Take a token; return 0 when granted, else seconds until one is"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "size": len(self._buckets)}
+
+
+# Refill and take a token atomically, on the store's clock so every worker
+# agrees; returns the wait in microseconds (0 when granted)
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate / 1000000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return wait
+"""
+
+
+class RedisRateLimiter:
+    """Token buckets in a Redis-protocol store shared by every worker
+
+    Store errors are logged and the request is let through, so an
+    unavailable store disables limiting rather than the API.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, namespace: str):
+        self._client = redis.from_url(url, decode_responses=True)
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+        self._namespace = namespace
+        self.errors = 0
+
+    async def acquire(self, key: str, rate: float, burst: float) -> float:
+        """Take a token; return 0 when granted, else seconds until one is"""
+        try:
+            wait = await self._script(
+                keys=[f"{self._namespace}:{key}"], args=[rate, burst]
+            )
+        except (redis.RedisError, OSError) as exc:
+            self.errors += 1
+            logger.warning("Rate limiter unavailable: %s", exc)
+            return 0.0
+        return int(wait) / 1_000_000
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "errors": self.errors}
+
+
+def create_rate_limiter(
+    namespace: str, redis_url: Optional[str] = None
+) -> Union[LocalRateLimiter, RedisRateLimiter]:
+    """Shared Redis limiter when configured and installed, else in-process"""
+    if redis_url:
+        if redis is not None:
+            return RedisRateLimiter(redis_url, namespace)
+        logger.warning(
+            "redis package not installed, using in-process %s limiter", namespace
+        )
+
+    return LocalRateLimiter()
@@ -0,0 +1,181 @@
+"""Single-flight: concurrent identical calls share one execution
+
+A call is identified by a key; while one is running, later calls with the
+same key wait for its result instead of starting their own. The in-process
+version shares the running task between coroutines of this worker. The
+Redis version adds a short-lived lock and result in a shared store, so the
+workers behind a load balancer also run a duplicate call only once. Results
+are ``bytes`` so they can cross processes.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # the shared backend is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+Call = Callable[[], Awaitable[bytes]]
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    """Mark a failure as seen when every waiter went away before it"""
+    if not task.cancelled():
+        task.exception()
+
+
+class LocalSingleFlight:
+    """Coalesces identical calls between the coroutines of this process"""
+
+    backend = "local"
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: str, function: Call) -> bytes:
+        """Result of ``function``, run once for all concurrent callers of ``key``
+
+        The call runs as its own task, so a caller that disconnects does not
+        cancel it for the others; its exception is raised to every caller.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.shared += 1
+            return await asyncio.shield(task)
+
+        self.executed += 1
+        task = asyncio.ensure_future(function())
+        self._calls[key] = task
+        task.add_done_callback(_consume_exception)
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "executed": self.executed,
+            "shared": self.shared,
+            "in_flight": len(self._calls),
+        }
+
+
+class RedisSingleFlight:
+    """Coalesces identical calls between workers through a shared store
+
+    Calls are first coalesced within the worker. The first worker then takes
+    a lock (``SET NX``) and publishes its result for ``result_ttl`` seconds;
+    the others poll for that result while the lock is held and run the call
+    themselves when it fails, times out or the store is unavailable.
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        url: str,
+        namespace: str,
+        timeout: float,
+        result_ttl: float = 1.0,
+        poll_interval: float = 0.02,
+    ):
+        self._client = redis.from_url(url)
+        self._namespace = namespace
+        self._local = LocalSingleFlight()
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.shared = 0
+        self.errors = 0
+
+    async def do(self, key: str, function: Call) -> bytes:
+        """Result of ``function``, run once for all concurrent callers of ``key``"""
+        return await self._local.do(key, lambda: self._do_shared(key, function))
+
+    async def _do_shared(self, key: str, function: Call) -> bytes:
+        result_key = f"{self._namespace}:result:{key}"
+        lock_key = f"{self._namespace}:lock:{key}"
+
+        try:
+            result = await self._client.get(result_key)
+            if result is not None:
+                self.shared += 1
+                return result
+
+            leader = await self._client.set(
+                lock_key, b"1", nx=True, px=int(self.timeout * 1000)
+            )
+            if not leader:
+                result = await self._wait_for(result_key, lock_key)
+                if result is not None:
+                    self.shared += 1
+                    return result
+        except (redis.RedisError, OSError) as exc:
+            self.errors += 1
+            logger.warning("Single-flight store unavailable: %s", exc)
+            return await function()
+
+        if not leader:
+            return await function()
+
+        try:
+            result = await function()
+            await self._client.set(result_key, result, px=int(self.result_ttl * 1000))
+            return result
+        except (redis.RedisError, OSError) as exc:
+            self.errors += 1
+            logger.warning("Single-flight result not shared: %s", exc)
+            return result
+        finally:
+            try:
+                await self._client.delete(lock_key)
+            except (redis.RedisError, OSError):
+                self.errors += 1
+
+    async def _wait_for(self, result_key: str, lock_key: str) -> Optional[bytes]:
+        """The leader's result, None when it gave up or ran out of time"""
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await self._client.get(result_key)
+            if result is not None:
+                return result
+            if not await self._client.exists(lock_key):
+                # Released without a result: the leader failed
+                return await self._client.get(result_key)
+        return None
+
+    def stats(self) -> dict:
+        local = self._local.stats()
+        return {
+            "backend": self.backend,
+            "executed": local["executed"] - self.shared,
+            "shared": local["shared"] + self.shared,
+            "in_flight": local["in_flight"],
+            "errors": self.errors,
+        }
+
+
+def create_single_flight(
+    namespace: str, timeout: float, redis_url: Optional[str] = None
+) -> Union[LocalSingleFlight, RedisSingleFlight]:
+    """Shared Redis single-flight when configured and installed, else in-process"""
+    if redis_url:
+        if redis is not None:
+            return RedisSingleFlight(redis_url, namespace, timeout)
+        logger.warning(
+            "redis package not installed, using in-process %s single-flight",
+            namespace,
+        )
+
+    return LocalSingleFlight()